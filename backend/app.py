@@ -1,20 +1,37 @@
 from flask import Flask, request, jsonify
 from flask_cors import CORS
 import os
-from src.database import init_db
+from src.database import LazyDatabase
 from src.routes import register_routes
 
-# Initialize Flask app
-app = Flask(__name__)
-CORS(app)  # Enable CORS for all routes
+def create_app(db=None):
+    """
+    Create the Flask app with its API routes
+
+    Parameters:
+    - db: MongoDB database (defaults to a LazyDatabase, which connects on
+      first use in each server process)
+
+    Returns:
+    - Flask app
+    """
+    app = Flask(__name__)
+    CORS(app)  # Enable CORS for all routes
 
-# Initialize database connection
-db = init_db()
+    # Database connection, opened lazily so the app can be preloaded before fork
+    if db is None:
+        db = LazyDatabase()
+    app.extensions["db"] = db
 
-# Register API routes
-register_routes(app, db)
+    # Register API routes
+    register_routes(app, db)
+
+    return app
+
+# Initialize Flask app
+app = create_app()
 
 if __name__ == "__main__":
-    # Get port from environment or default to 5000
+    # Development server; use wsgi.py with gunicorn in production
     port = int(os.environ.get("PORT", 5000))
-    app.run(host="0.0.0.0", port=port, debug=True)
+    app.run(host="0.0.0.0", port=port, debug=os.environ.get("FLASK_DEBUG", "1") == "1")
@@ -0,0 +1,72 @@
+import argparse
+import json
+import shutil
+import tempfile
+from benchmarks.synthetic import synthetic_ohlcv, synthetic_provider, flaky_provider
+from src.bulk_loader import run_bulk_load
+from src.data_fetcher import resolve_ticker
+from src.price_store import PriceStore
+
+def run_case(frames, symbols, workers, args):
+    """
+    Bulk load the stubbed symbols into a fresh price store
+
+    Parameters:
+    - frames: Dict of ticker to DataFrame served by the stubbed provider
+    - symbols: Symbols to load
+    - workers: Number of download threads
+    - args: Parsed command-line arguments (latency, failure rate, rate, retries)
+
+    Returns:
+    - Dict with the workers, elapsed seconds, series per second, outcome
+      counts and provider requests made
+    """
+    provider = flaky_provider(synthetic_provider(frames), latency=args.latency,
+                              failure_rate=args.failure_rate, seed=args.seed)
+    cache_dir = tempfile.mkdtemp(prefix="grid_bulk_load_")
+    try:
+        summary = run_bulk_load(symbols, max_workers=workers, rate=args.rate or None, retries=args.retries,
+                                backoff=args.backoff, store=PriceStore(cache_dir, provider))
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+    return {
+        "workers": workers,
+        "seconds": summary["seconds"],
+        "series_per_second": summary["requested"] / summary["seconds"],
+        "loaded": summary["loaded"],
+        "failed": summary["failed"],
+        "requests": provider.calls
+    }
+
+def main():
+    """Measure bulk load throughput against a stubbed provider from the command line"""
+    parser = argparse.ArgumentParser(description="Measure bulk history loading against a stubbed provider")
+    parser.add_argument("--symbols", type=int, default=100, help="Number of stubbed symbols")
+    parser.add_argument("--bars", type=int, default=2520, help="Daily bars per symbol")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 8, 32], help="Worker counts to compare")
+    parser.add_argument("--latency", type=float, default=0.05, help="Seconds each provider request takes")
+    parser.add_argument("--failure-rate", type=float, default=0.1, help="Fraction of requests that fail")
+    parser.add_argument("--rate", type=float, default=0.0, help="Requests per second (0 for no limit)")
+    parser.add_argument("--retries", type=int, default=3, help="Retries of a failed request")
+    parser.add_argument("--backoff", type=float, default=0.05, help="Seconds before the first retry")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed of the simulated failures")
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    args = parser.parse_args()
+
+    symbols = [f"SYN{index}" for index in range(args.symbols)]
+    frames = {resolve_ticker(symbol): synthetic_ohlcv(args.bars, seed=index) for index, symbol in enumerate(symbols)}
+
+    results = []
+    for workers in args.workers:
+        result = run_case(frames, symbols, workers, args)
+        results.append(result)
+        print(f"{workers:>4} workers {result['seconds']:>8.2f} s {result['series_per_second']:>9.1f} series/s  "
+              f"loaded {result['loaded']}  failed {result['failed']}  requests {result['requests']}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"config": vars(args), "results": results}, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+# Modules whose cold import is measured (the server entry point and the
+# modules command-line tools and worker processes start from)
+TARGET_MODULES = (
+    "app",
+    "src.routes",
+    "src.backtest",
+    "src.grid_trading",
+    "src.data_fetcher",
+    "src.sweep",
+    "src.walk_forward",
+    "src.live_engine"
+)
+
+# Exit status when there is no baseline to compare against
+NO_BASELINE_STATUS = 2
+
+# Default location of the stored baseline
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "import_baseline.json")
+
+# Baseline import times below this many seconds are too noisy to compare
+MIN_COMPARE_SECONDS = 0.01
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def parse_importtime(output):
+    """
+    Parse the report written by python -X importtime
+
+    Parameters:
+    - output: stderr of the interpreter
+
+    Returns:
+    - Dict mapping each imported module to (self seconds, cumulative seconds)
+    """
+    imports = {}
+    for line in output.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        imports[name.strip()] = (int(self_us) / 1e6, int(cumulative_us) / 1e6)
+    return imports
+
+def measure_import(module, repeat=5):
+    """
+    Time importing a module in fresh interpreters
+
+    Parameters:
+    - module: Module name, importable from the backend directory
+    - repeat: Number of interpreters started
+
+    Returns:
+    - Dict with the module, its median import time, the median time to start
+      an interpreter and import it, and the median cumulative time of each
+      top-level package it pulled in
+    """
+    import_seconds = []
+    process_seconds = []
+    packages = {}
+    for _ in range(repeat):
+        started = time.perf_counter()
+        completed = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                                   cwd=BACKEND_DIR, capture_output=True, text=True)
+        process_seconds.append(time.perf_counter() - started)
+        if completed.returncode != 0:
+            raise RuntimeError(f"Importing {module} failed:\n{completed.stderr[-2000:]}")
+
+        imports = parse_importtime(completed.stderr)
+        import_seconds.append(imports[module][1])
+        for name, (_, cumulative) in imports.items():
+            # Submodules are counted in their package's cumulative time
+            if "." not in name and name != module:
+                packages.setdefault(name, []).append(cumulative)
+
+    return {
+        "module": module,
+        "import_seconds": statistics.median(import_seconds),
+        "process_seconds": statistics.median(process_seconds),
+        "packages": {name: statistics.median(times) for name, times in packages.items()}
+    }
+
+def compare_to_baseline(results, baseline, threshold):
+    """
+    Find modules slower to import than in the baseline
+
+    Parameters:
+    - results: List of result dicts from measure_import
+    - baseline: Results document previously written by this script
+    - threshold: Allowed relative increase (e.g., 0.2 for 20%)
+
+    Returns:
+    - List of regression dicts (module, baseline, current, ratio)
+    """
+    previous = {result["module"]: result for result in baseline["results"]}
+    regressions = []
+
+    for result in results:
+        base = previous.get(result["module"])
+        if base is None or base["import_seconds"] < MIN_COMPARE_SECONDS:
+            continue
+        ratio = result["import_seconds"] / base["import_seconds"]
+        if ratio > 1 + threshold:
+            regressions.append({
+                "module": result["module"],
+                "baseline": base["import_seconds"],
+                "current": result["import_seconds"],
+                "ratio": ratio
+            })
+
+    return regressions
+
+def format_result(result, top):
+    """Format a result as a line of the report followed by its heaviest packages"""
+    lines = [f"{result['module']:<20}{result['import_seconds'] * 1000:>10.1f} ms import"
+             f"{result['process_seconds'] * 1000:>10.1f} ms process"]
+    heaviest = sorted(result["packages"].items(), key=lambda item: item[1], reverse=True)[:top]
+    for name, seconds in heaviest:
+        lines.append(f"    {name:<24}{seconds * 1000:>10.1f} ms")
+    return "\n".join(lines)
+
+def main():
+    """Measure import times from the command line"""
+    parser = argparse.ArgumentParser(description="Measure the cold import time of the backend modules")
+    parser.add_argument("--modules", nargs="+", default=list(TARGET_MODULES), help="Modules to import")
+    parser.add_argument("--repeat", type=int, default=5, help="Fresh interpreters per module")
+    parser.add_argument("--top", type=int, default=5, help="Heaviest packages listed per module")
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="Baseline results to compare against")
+    parser.add_argument("--save-baseline", action="store_true", help="Store these results as the new baseline")
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="Allowed relative slowdown before failing")
+    args = parser.parse_args()
+
+    results = []
+    for module in args.modules:
+        result = measure_import(module, repeat=args.repeat)
+        print(format_result(result, args.top), flush=True)
+        results.append(result)
+
+    document = {
+        "created_at": datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "machine": platform.platform(),
+        "config": {"modules": args.modules, "repeat": args.repeat},
+        "results": results
+    }
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(document, f, indent=2)
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(document, f, indent=2)
+        print(f"Saved baseline to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        # A missing baseline must not pass as a clean comparison
+        print(f"ERROR: no baseline at {args.baseline}; nothing was compared. "
+              f"Run with --save-baseline to create one", file=sys.stderr)
+        return NO_BASELINE_STATUS
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    known = {result["module"] for result in baseline["results"]}
+    unmatched = [result for result in results if result["module"] not in known]
+    if len(unmatched) == len(results):
+        print(f"ERROR: none of these results are in the baseline at {args.baseline}; nothing was compared",
+              file=sys.stderr)
+        return NO_BASELINE_STATUS
+    if unmatched:
+        print(f"WARNING: {len(unmatched)} result(s) not in the baseline were not compared", file=sys.stderr)
+    regressions = compare_to_baseline(results, baseline, args.threshold)
+    for regression in regressions:
+        print(f"REGRESSION {regression['module']}: import {regression['baseline'] * 1000:.1f} ms -> "
+              f"{regression['current'] * 1000:.1f} ms ({regression['ratio']:.2f}x)")
+    print(f"{len(regressions)} regression(s) beyond {args.threshold:.0%}")
+    return 1 if regressions else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
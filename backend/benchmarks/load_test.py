@@ -0,0 +1,295 @@
+import argparse
+import http.client
+import json
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from urllib.parse import urlsplit
+import numpy as np
+from benchmarks.synthetic import synthetic_ohlcv, synthetic_provider
+
+# Symbol served by the stubbed price provider
+LOAD_SYMBOL = "LOAD"
+
+# Daily bars generated for the stubbed symbol
+DEFAULT_LOAD_BARS = 2520
+
+# Database used by a server started by the load test, unless DB_NAME is set
+LOAD_TEST_DB_NAME = "grid_trading_load_test"
+
+# Seconds to wait for a started server to answer
+SERVER_START_TIMEOUT = 60
+
+# Endpoints exercised, as (method, path, JSON body); {strategy_id},
+# {start_date} and {end_date} are filled in after setup
+ENDPOINTS = {
+    "stock": ("GET", f"/api/stock/{LOAD_SYMBOL}?period=1y", None),
+    "stock_columnar": ("GET", f"/api/stock/{LOAD_SYMBOL}?period=1y&format=columnar", None),
+    "grid": ("POST", "/api/grid/calculate",
+             {"symbol": LOAD_SYMBOL, "upper_price": 150, "lower_price": 50, "num_grids": 50}),
+    "strategy": ("GET", "/api/strategy/{strategy_id}", None),
+    "strategies": ("GET", "/api/strategies?limit=100", None),
+    "backtest_cached": ("POST", "/api/backtest",
+                        {"strategy_id": "{strategy_id}", "start_date": "{start_date}",
+                         "end_date": "{end_date}", "engine": "vectorized"}),
+    "backtest": ("POST", "/api/backtest",
+                 {"strategy_id": "{strategy_id}", "start_date": "{start_date}",
+                  "end_date": "{end_date}", "engine": "vectorized", "cache": False}),
+    "metrics": ("GET", "/api/metrics", None)
+}
+
+def create_stub_app(db=None):
+    """
+    Build the app with a synthetic price provider and fixed quotes
+
+    Used as the gunicorn app factory of a server started by the load test
+    ("benchmarks.load_test:create_stub_app()"). LOAD_TEST_BARS sets the
+    number of daily bars of the stubbed symbol.
+
+    Parameters:
+    - db: MongoDB database (defaults to the app's lazily connected one)
+
+    Returns:
+    - Flask app
+    """
+    from src.data_fetcher import resolve_ticker, set_price_store, set_quote_service
+    from src.price_store import PriceStore
+    from src.quotes import QuoteService
+    from app import create_app
+
+    frame = synthetic_ohlcv(int(os.environ.get("LOAD_TEST_BARS", DEFAULT_LOAD_BARS)))
+    ticker = resolve_ticker(LOAD_SYMBOL)
+    cache_dir = tempfile.mkdtemp(prefix="grid_load_test_")
+    set_price_store(PriceStore(cache_dir, synthetic_provider({ticker: frame}), max_age=float("inf")))
+
+    last_close = float(frame["Close"].iloc[-1])
+    set_quote_service(QuoteService(lambda symbols: {symbol: last_close for symbol in symbols}))
+    return create_app(db)
+
+def start_server(port, workers, threads):
+    """
+    Start gunicorn serving the stubbed app
+
+    Parameters:
+    - port: Local port to listen on
+    - workers: Number of worker processes
+    - threads: Threads per worker
+
+    Returns:
+    - Popen of the server process
+    """
+    backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ)
+    env.setdefault("DB_NAME", LOAD_TEST_DB_NAME)
+    env.setdefault("GUNICORN_ACCESS_LOG", "")
+    command = [
+        sys.executable, "-m", "gunicorn",
+        "-c", "gunicorn.conf.py",
+        "--bind", f"127.0.0.1:{port}",
+        "--workers", str(workers),
+        "--threads", str(threads),
+        "benchmarks.load_test:create_stub_app()"
+    ]
+    return subprocess.Popen(command, cwd=backend_dir, env=env)
+
+def wait_for_server(url, timeout=SERVER_START_TIMEOUT):
+    """
+    Wait until a server answers /api/metrics
+
+    Parameters:
+    - url: Base URL of the server
+    - timeout: Seconds to wait
+    """
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            status, _ = request(url, "GET", "/api/metrics")
+            if status == 200:
+                return
+        except OSError:
+            pass
+        if time.monotonic() >= deadline:
+            raise RuntimeError(f"Server at {url} did not start within {timeout}s")
+        time.sleep(0.5)
+
+def request(url, method, path, body=None, connection=None):
+    """
+    Send one request
+
+    Parameters:
+    - url: Base URL of the server
+    - method: HTTP method
+    - path: Request path with query string
+    - body: JSON body or None
+    - connection: Open HTTPConnection to reuse (keep-alive), or None
+
+    Returns:
+    - Tuple of (status code, response body bytes)
+    """
+    own_connection = connection is None
+    if own_connection:
+        parts = urlsplit(url)
+        connection = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=60)
+    headers = {}
+    payload = None
+    if body is not None:
+        payload = json.dumps(body)
+        headers["Content-Type"] = "application/json"
+    try:
+        connection.request(method, path, body=payload, headers=headers)
+        response = connection.getresponse()
+        return response.status, response.read()
+    finally:
+        if own_connection:
+            connection.close()
+
+def setup(url):
+    """
+    Create the strategy used by the per-strategy endpoints
+
+    Parameters:
+    - url: Base URL of the server
+
+    Returns:
+    - Dict of values substituted into ENDPOINTS
+    """
+    status, body = request(url, "GET", f"/api/stock/{LOAD_SYMBOL}?period=max&format=columnar")
+    if status != 200:
+        raise RuntimeError(f"Stock request failed with status {status}: {body[:200]!r}")
+    stock = json.loads(body)["data"]
+    dates = stock["data"][stock["columns"].index("Date")]
+
+    status, body = request(url, "POST", "/api/strategy", {
+        "symbol": LOAD_SYMBOL, "upper_price": 150, "lower_price": 50,
+        "num_grids": 50, "investment_amount": 10000
+    })
+    if status != 200:
+        raise RuntimeError(f"Strategy creation failed with status {status}: {body[:200]!r}")
+    return {
+        "strategy_id": json.loads(body)["strategy_id"],
+        "start_date": dates[-252][:10],
+        "end_date": dates[-1][:10]
+    }
+
+def fill(template, values):
+    """
+    Substitute setup values into an endpoint's path or body
+
+    Parameters:
+    - template: String, dict or None
+    - values: Dict from setup
+
+    Returns:
+    - Template with {name} placeholders replaced
+    """
+    if isinstance(template, str):
+        return template.format(**values)
+    if isinstance(template, dict):
+        return {key: fill(value, values) for key, value in template.items()}
+    return template
+
+def run_endpoint(url, method, path, body, duration, concurrency):
+    """
+    Send requests to one endpoint from several keep-alive connections
+
+    Parameters:
+    - url: Base URL of the server
+    - method: HTTP method
+    - path: Request path
+    - body: JSON body or None
+    - duration: Seconds to run
+    - concurrency: Number of connections sending requests back to back
+
+    Returns:
+    - Dict with requests, errors, requests_per_second and latency percentiles (ms)
+    """
+    parts = urlsplit(url)
+    latencies = [[] for _ in range(concurrency)]
+    errors = [0] * concurrency
+    deadline = time.monotonic() + duration
+
+    def client(index):
+        connection = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=60)
+        try:
+            while time.monotonic() < deadline:
+                started = time.perf_counter()
+                try:
+                    status, _ = request(url, method, path, body, connection)
+                except (OSError, http.client.HTTPException):
+                    connection.close()
+                    status = None
+                latencies[index].append(time.perf_counter() - started)
+                if status is None or status >= 400:
+                    errors[index] += 1
+        finally:
+            connection.close()
+
+    started = time.monotonic()
+    clients = [threading.Thread(target=client, args=(index,)) for index in range(concurrency)]
+    for thread in clients:
+        thread.start()
+    for thread in clients:
+        thread.join()
+    elapsed = time.monotonic() - started
+
+    samples = np.array([latency for thread_latencies in latencies for latency in thread_latencies]) * 1000
+    result = {
+        "requests": len(samples),
+        "errors": sum(errors),
+        "requests_per_second": len(samples) / elapsed
+    }
+    for percentile in (50, 95, 99):
+        result[f"p{percentile}_ms"] = float(np.percentile(samples, percentile)) if len(samples) else None
+    return result
+
+def main():
+    """Run the load test from the command line"""
+    parser = argparse.ArgumentParser(description="Measure requests per second of the main API endpoints")
+    parser.add_argument("--url", help="Base URL of a running server (default: start gunicorn with the stubbed app)")
+    parser.add_argument("--port", type=int, default=5050, help="Port of the started server")
+    parser.add_argument("--workers", type=int, default=2, help="Worker processes of the started server")
+    parser.add_argument("--threads", type=int, default=4, help="Threads per worker of the started server")
+    parser.add_argument("--endpoints", nargs="+", choices=sorted(ENDPOINTS), default=sorted(ENDPOINTS),
+                        help="Endpoints to load")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds per endpoint")
+    parser.add_argument("--concurrency", type=int, default=8, help="Concurrent connections")
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    args = parser.parse_args()
+
+    server = None
+    url = args.url
+    if url is None:
+        url = f"http://127.0.0.1:{args.port}"
+        server = start_server(args.port, args.workers, args.threads)
+
+    try:
+        wait_for_server(url)
+        values = setup(url)
+
+        results = []
+        for name in args.endpoints:
+            method, path, body = ENDPOINTS[name]
+            result = {"endpoint": name}
+            result.update(run_endpoint(url, method, fill(path, values), fill(body, values),
+                                       args.duration, args.concurrency))
+            results.append(result)
+            print(f"{name:<16} {result['requests_per_second']:>9.1f} req/s  "
+                  f"p50 {result['p50_ms'] or 0:>8.2f} ms  p99 {result['p99_ms'] or 0:>8.2f} ms  "
+                  f"errors {result['errors']}")
+    finally:
+        if server is not None:
+            # SIGTERM lets gunicorn finish in-flight requests before exiting
+            server.send_signal(signal.SIGTERM)
+            server.wait(timeout=60)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"url": url, "concurrency": args.concurrency, "duration": args.duration,
+                       "results": results}, f, indent=2)
+
+if __name__ == "__main__":
+    main()
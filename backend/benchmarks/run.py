@@ -0,0 +1,272 @@
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+import numpy as np
+import pandas as pd
+from benchmarks.synthetic import synthetic_ohlcv, synthetic_provider
+from src.backtest import load_backtest_data, simulate_loop, simulate_vectorized, calculate_performance_metrics
+from src.data_fetcher import resolve_ticker, set_price_store, get_stock_data
+from src.grid_trading import create_grid_strategy
+from src.price_store import PriceStore
+
+# Symbol the synthetic series is served under
+BENCH_SYMBOL = "BENCH"
+
+# Simulation engines that can be benchmarked
+SIMULATORS = {
+    "loop": simulate_loop,
+    "vectorized": simulate_vectorized
+}
+
+# Exit status when there is no baseline to compare against
+NO_BASELINE_STATUS = 2
+
+# Default location of the stored baseline
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+# Baseline timings below this many seconds are too noisy to compare
+MIN_COMPARE_SECONDS = 0.005
+
+# Baseline peaks below this many bytes are too small to compare
+MIN_COMPARE_BYTES = 1 << 20
+
+def measure(func, repeat):
+    """
+    Time a stage and measure its memory use
+
+    The stage is timed repeat times without tracing, then run once more under
+    tracemalloc to record peak memory and the memory it leaves allocated.
+
+    Parameters:
+    - func: Callable running the stage and returning its output
+    - repeat: Number of timed runs
+
+    Returns:
+    - Tuple of (measurement dict, output of the last run)
+    """
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        output = func()
+        timings.append(time.perf_counter() - started)
+        del output
+
+    tracemalloc.start()
+    try:
+        before = tracemalloc.take_snapshot()
+        baseline_bytes = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        output = func()
+        current_bytes, peak_bytes = tracemalloc.get_traced_memory()
+        after = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+
+    retained_blocks = sum(max(stat.count_diff, 0) for stat in after.compare_to(before, "lineno"))
+
+    return {
+        "wall_seconds": statistics.median(timings),
+        "wall_seconds_min": min(timings),
+        "peak_bytes": peak_bytes - baseline_bytes,
+        "retained_bytes": current_bytes - baseline_bytes,
+        "retained_blocks": retained_blocks
+    }, output
+
+def run_suite(bar_counts, grid_counts, engines, repeat=3, seed=0, log=None):
+    """
+    Benchmark every stage of a backtest on synthetic data
+
+    Stages are load (fetching and caching the full series), filter (reading
+    the backtest range from the cache), grid (building the strategy),
+    simulate and metrics (per engine; metrics computes every metric from
+    the simulated daily values and trades rather than snapshotting the
+    accumulator the simulation kept), and serialize (get_stock_data plus
+    JSON encoding).
+
+    Parameters:
+    - bar_counts: List of series lengths
+    - grid_counts: List of grid level counts
+    - engines: List of simulation engines
+    - repeat: Timed runs per stage
+    - seed: Random seed for the synthetic data
+    - log: Optional callable receiving each result as it is measured
+
+    Returns:
+    - List of result dicts (stage, bars, grids, engine and measurements)
+    """
+    results = []
+
+    def record(stage, bars, grids, engine, func):
+        measurement, output = measure(func, repeat)
+        result = {"stage": stage, "bars": bars, "grids": grids, "engine": engine}
+        result.update(measurement)
+        results.append(result)
+        if log is not None:
+            log(result)
+        return output
+
+    for bars in bar_counts:
+        frame = synthetic_ohlcv(bars, seed=seed)
+        ticker = resolve_ticker(BENCH_SYMBOL)
+
+        with tempfile.TemporaryDirectory() as cache_dir:
+            store = PriceStore(cache_dir, synthetic_provider({ticker: frame}), max_age=float("inf"))
+            set_price_store(store)
+
+            def load():
+                store.invalidate(ticker, "1d")
+                return store.get_history(ticker, "1d")
+            record("load", bars, None, None, load)
+
+            start_date = frame.index[0].strftime("%Y-%m-%d")
+            end_date = frame.index[-1].strftime("%Y-%m-%d")
+            backtest_data = record("filter", bars, None, None,
+                                   lambda: load_backtest_data(BENCH_SYMBOL, start_date, end_date))
+
+            low, high = float(frame["Low"].min()), float(frame["High"].max())
+            for grids in grid_counts:
+                params = {
+                    "symbol": BENCH_SYMBOL,
+                    "upper_price": high,
+                    "lower_price": low,
+                    "num_grids": grids,
+                    "investment_amount": 10000
+                }
+                quote = {"price": float(frame["Close"].iloc[0]), "source": "fallback"}
+                strategy = record("grid", bars, grids, None, lambda: create_grid_strategy(params, quote))
+
+                for engine in engines:
+                    simulate = SIMULATORS[engine]
+                    portfolio = record("simulate", bars, grids, engine, lambda: simulate(
+                        backtest_data, strategy["grid_levels"], strategy["investment_amount"]
+                    ))
+                    # Without the accumulator the simulation fed, every metric is
+                    # computed from the daily values and trades
+                    simulated = {key: value for key, value in portfolio.items() if key != "accumulator"}
+                    record("metrics", bars, grids, engine,
+                           lambda: calculate_performance_metrics(simulated, backtest_data))
+
+            record("serialize", bars, None, None,
+                   lambda: json.dumps(get_stock_data(BENCH_SYMBOL, "max", "1d")))
+
+    set_price_store(None)
+    return results
+
+def result_key(result):
+    """Identify a result by stage, size and engine"""
+    return (result["stage"], result["bars"], result["grids"], result["engine"])
+
+def compare_to_baseline(results, baseline, threshold):
+    """
+    Find results slower or more memory-hungry than the baseline
+
+    Parameters:
+    - results: List of result dicts from run_suite
+    - baseline: Results document previously written by this script
+    - threshold: Allowed relative increase (e.g., 0.2 for 20%)
+
+    Returns:
+    - List of regression dicts (key, metric, baseline, current, ratio)
+    """
+    previous = {result_key(result): result for result in baseline["results"]}
+    regressions = []
+
+    for result in results:
+        base = previous.get(result_key(result))
+        if base is None:
+            continue
+        for metric, floor in (("wall_seconds", MIN_COMPARE_SECONDS), ("peak_bytes", MIN_COMPARE_BYTES)):
+            if base[metric] < floor:
+                continue
+            ratio = result[metric] / base[metric]
+            if ratio > 1 + threshold:
+                regressions.append({
+                    "key": result_key(result),
+                    "metric": metric,
+                    "baseline": base[metric],
+                    "current": result[metric],
+                    "ratio": ratio
+                })
+
+    return regressions
+
+def format_result(result):
+    """Format a result as one line of the progress table"""
+    label = f"{result['stage']:<10}{result['bars']:>10}{result['grids'] or '':>7} {result['engine'] or '':<11}"
+    return (f"{label}{result['wall_seconds'] * 1000:>12.2f} ms"
+            f"{result['peak_bytes'] / 1e6:>10.1f} MB peak{result['retained_blocks']:>10} blocks")
+
+def main():
+    """Run the benchmark suite from the command line"""
+    parser = argparse.ArgumentParser(description="Benchmark backtest, grid and data paths on synthetic data")
+    parser.add_argument("--bars", type=int, nargs="+", default=[1000, 100000], help="Series lengths")
+    parser.add_argument("--grids", type=int, nargs="+", default=[10, 1000], help="Grid level counts")
+    parser.add_argument("--engines", nargs="+", default=list(SIMULATORS), choices=list(SIMULATORS),
+                        help="Simulation engines")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per stage")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed for the synthetic data")
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="Baseline results to compare against")
+    parser.add_argument("--save-baseline", action="store_true", help="Store these results as the new baseline")
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="Allowed relative slowdown or memory growth before failing")
+    args = parser.parse_args()
+
+    results = run_suite(args.bars, args.grids, args.engines, repeat=args.repeat, seed=args.seed,
+                        log=lambda result: print(format_result(result), flush=True))
+
+    document = {
+        "created_at": datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "machine": platform.platform(),
+        "config": {"bars": args.bars, "grids": args.grids, "engines": args.engines,
+                   "repeat": args.repeat, "seed": args.seed},
+        "results": results
+    }
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(document, f, indent=2)
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(document, f, indent=2)
+        print(f"Saved baseline to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        # A missing baseline must not pass as a clean comparison
+        print(f"ERROR: no baseline at {args.baseline}; nothing was compared. "
+              f"Run with --save-baseline to create one", file=sys.stderr)
+        return NO_BASELINE_STATUS
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    known = {result_key(result) for result in baseline["results"]}
+    unmatched = [result for result in results if result_key(result) not in known]
+    if len(unmatched) == len(results):
+        print(f"ERROR: none of these results are in the baseline at {args.baseline}; nothing was compared",
+              file=sys.stderr)
+        return NO_BASELINE_STATUS
+    if unmatched:
+        print(f"WARNING: {len(unmatched)} result(s) not in the baseline were not compared", file=sys.stderr)
+    regressions = compare_to_baseline(results, baseline, args.threshold)
+    for regression in regressions:
+        stage, bars, grids, engine = regression["key"]
+        print(f"REGRESSION {stage} bars={bars} grids={grids} engine={engine}: "
+              f"{regression['metric']} {regression['baseline']:.4g} -> {regression['current']:.4g} "
+              f"({regression['ratio']:.2f}x)")
+    print(f"{len(regressions)} regression(s) beyond {args.threshold:.0%}")
+    return 1 if regressions else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,91 @@
+import threading
+import time
+import numpy as np
+import pandas as pd
+
+# Largest series generated as business-day bars; longer ones use minute bars
+# so their timestamps stay within the datetime64[ns] range
+MAX_DAILY_BARS = 50000
+
+def synthetic_ohlcv(num_bars, seed=0, start_price=100.0, volatility=0.02):
+    """
+    Generate a reproducible random-walk OHLCV series
+
+    Parameters:
+    - num_bars: Number of bars
+    - seed: Random seed
+    - start_price: First close price
+    - volatility: Standard deviation of the log return per bar
+
+    Returns:
+    - DataFrame indexed by Date with Open, High, Low, Close, Adj Close and
+      Volume columns, shaped like yf.download output
+    """
+    rng = np.random.default_rng(seed)
+    close = start_price * np.exp(np.cumsum(rng.normal(0, volatility, num_bars)))
+    open_ = np.concatenate(([start_price], close[:-1]))
+    spread = np.abs(rng.normal(0, volatility / 2, (2, num_bars)))
+    high = np.maximum(open_, close) * (1 + spread[0])
+    low = np.minimum(open_, close) * (1 - spread[1])
+
+    if num_bars <= MAX_DAILY_BARS:
+        dates = pd.bdate_range("1970-01-01", periods=num_bars)
+    else:
+        dates = pd.date_range("2000-01-03", periods=num_bars, freq="min")
+
+    return pd.DataFrame({
+        "Open": open_,
+        "High": high,
+        "Low": low,
+        "Close": close,
+        "Adj Close": close,
+        "Volume": rng.integers(1000, 1000000, num_bars)
+    }, index=pd.Index(dates, name="Date"))
+
+def synthetic_provider(frames):
+    """
+    Build a price store provider serving pre-generated frames
+
+    Parameters:
+    - frames: Dict of ticker to DataFrame from synthetic_ohlcv
+
+    Returns:
+    - Callable with the provider(ticker, interval, period=None, start=None) signature
+    """
+    def provider(ticker, interval, period=None, start=None):
+        frame = frames[ticker]
+        if start is not None:
+            return frame[frame.index >= pd.Timestamp(start)]
+        return frame
+
+    return provider
+
+def flaky_provider(provider, latency=0.0, failure_rate=0.0, seed=0, failing=()):
+    """
+    Wrap a provider with simulated network latency and failures
+
+    Parameters:
+    - provider: Provider to wrap
+    - latency: Seconds every request takes
+    - failure_rate: Fraction of requests raising ConnectionError
+    - seed: Random seed of the failures
+    - failing: Tickers whose requests always fail
+
+    Returns:
+    - Callable with the provider signature; its calls attribute counts the
+      requests made
+    """
+    rng = np.random.default_rng(seed)
+    lock = threading.Lock()
+
+    def wrapped(ticker, interval, period=None, start=None):
+        with lock:
+            wrapped.calls += 1
+            fails = ticker in failing or rng.random() < failure_rate
+        time.sleep(latency)
+        if fails:
+            raise ConnectionError(f"Simulated failure fetching {ticker} ({interval})")
+        return provider(ticker, interval, period=period, start=start)
+
+    wrapped.calls = 0
+    return wrapped
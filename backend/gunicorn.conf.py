@@ -0,0 +1,68 @@
+"""
+Gunicorn settings for the backend
+
+    cd backend
+    gunicorn -c gunicorn.conf.py wsgi:application
+
+Every setting can be overridden from the environment (see the README).
+"""
+import multiprocessing
+import os
+
+# Listen address
+bind = os.environ.get("BIND", f"0.0.0.0:{os.environ.get('PORT', 5000)}")
+
+# Worker processes, each serving requests on a pool of threads (the
+# simulation code releases the GIL in NumPy, and requests mostly wait on
+# MongoDB or the price store)
+workers = int(os.environ.get("WEB_CONCURRENCY", multiprocessing.cpu_count() * 2 + 1))
+worker_class = "gthread"
+threads = int(os.environ.get("GUNICORN_THREADS", 4))
+
+# Sweep, walk-forward, portfolio and Monte Carlo requests start their own
+# process pools, up to POOL_MAX_WORKERS processes each. Every thread of
+# every worker can serve one at the same time, so with the app's default
+# of one process per CPU the server could start workers x threads x CPUs
+# processes ((2 x CPUs + 1) x 4 x CPUs by default). Unless it is set,
+# share the CPUs between the workers instead (read by the app when it is
+# preloaded below)
+os.environ.setdefault("POOL_MAX_WORKERS", str(max(1, multiprocessing.cpu_count() // workers)))
+
+# Import the app once in the master so pandas, NumPy and yfinance are
+# loaded before fork and shared copy-on-write by the workers
+preload_app = True
+
+# Seconds a request may run (synchronous backtests can be long) and
+# seconds workers get to finish in-flight requests on shutdown
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 120))
+graceful_timeout = int(os.environ.get("GUNICORN_GRACEFUL_TIMEOUT", 30))
+keepalive = 5
+
+# Recycle workers periodically to bound memory growth
+max_requests = int(os.environ.get("GUNICORN_MAX_REQUESTS", 10000))
+max_requests_jitter = max_requests // 10
+
+accesslog = os.environ.get("GUNICORN_ACCESS_LOG")
+errorlog = "-"
+
+def pre_fork(server, worker):
+    # A client opened while preloading must not be inherited by workers.
+    # server.app.wsgi() is the app gunicorn preloaded (whatever app or
+    # factory it serves), not necessarily wsgi.application
+    if server.cfg.preload_app:
+        db = server.app.wsgi().extensions.get("db")
+        if db is not None:
+            db.close()
+
+def worker_exit(server, worker):
+    # Graceful stop: cancel this worker's backtest jobs and close its client
+    # on the app this worker actually served
+    app = getattr(worker, "wsgi", None)
+    if app is None:
+        return
+    jobs = app.extensions.get("backtest_jobs")
+    if jobs is not None:
+        jobs.shutdown(wait=True)
+    db = app.extensions.get("db")
+    if db is not None:
+        db.close()
@@ -1,10 +1,21 @@
-import pandas as pd
 import numpy as np
+from bisect import bisect_left, bisect_right
 from datetime import datetime
-from src.data_fetcher import get_stock_data
+from src.data_fetcher import get_price_history, iter_price_history
 from src.grid_trading import calculate_grid_levels
+from src.vectorized_backtest import simulate_grid_vectorized, columns_to_records
+from src.intrabar import iter_bars, simulate_intrabar, intraday_end
+from src.metrics import PerformanceAccumulator
+from src.telemetry import span, count
 
-def run_backtest(strategy, start_date, end_date):
+# Simulation engines selectable per backtest request
+BACKTEST_ENGINES = ("loop", "vectorized", "intrabar")
+
+# Bars simulated between calls to a progress callback
+PROGRESS_INTERVAL = 250
+
+def run_backtest(strategy, start_date, end_date, engine="loop", backtest_data=None, interval="1m",
+                 progress=None, fill_model=None):
     """
     Run a backtest for a grid trading strategy
     
@@ -12,10 +23,22 @@ def run_backtest(strategy, start_date, end_date):
     - strategy: Grid strategy dict
     - start_date: Start date for backtest (YYYY-MM-DD)
     - end_date: End date for backtest (YYYY-MM-DD)
+    - engine: Simulation engine, "loop" (row by row), "vectorized" (NumPy arrays)
+      or "intrabar" (streamed intraday bars, crossings processed in order)
+    - backtest_data: Price DataFrame already loaded for the period (optional)
+    - interval: Bar interval for the intrabar engine (e.g., '1m', '5m')
+    - progress: Callable progress(bars_done, bars_total) called as bars are
+      simulated (bars_total is None for the intrabar engine); an exception
+      raised from it aborts the backtest
+    - fill_model: FillModel with the fees, slippage and fill rules to apply
+      (None fills every order at its grid price without costs)
     
     Returns:
     - Backtest results dict
     """
+    if engine not in BACKTEST_ENGINES:
+        raise ValueError(f"Unknown backtest engine: {engine}")
+    
     symbol = strategy["symbol"]
     upper_price = strategy["upper_price"]
     lower_price = strategy["lower_price"]
@@ -23,40 +46,124 @@ def run_backtest(strategy, start_date, end_date):
     investment_amount = strategy["investment_amount"]
     grid_levels = strategy["grid_levels"]
     
-    # Fetch historical data
-    period_data = get_stock_data(symbol, period="max", interval="1d")
-    df = pd.DataFrame(period_data["data"])
+    if engine == "intrabar":
+        # Intraday bars are streamed from the price store, never materialized
+        bars = iter_bars(iter_price_history(symbol, interval, start=start_date, end=intraday_end(end_date)))
+        with span("backtest.simulate"):
+            portfolio = simulate_intrabar(bars, grid_levels, investment_amount, progress=progress,
+                                          fill_model=fill_model)
+        if len(portfolio["daily_values"]) == 0:
+            raise ValueError("No data available for the specified date range")
+    else:
+        if backtest_data is None:
+            with span("backtest.load"):
+                backtest_data = load_backtest_data(symbol, start_date, end_date)
+        
+        with span("backtest.simulate"):
+            if engine == "vectorized":
+                portfolio = simulate_vectorized(backtest_data, grid_levels, investment_amount, progress=progress,
+                                                fill_model=fill_model)
+            else:
+                portfolio = simulate_loop(backtest_data, grid_levels, investment_amount, progress=progress,
+                                          fill_model=fill_model)
     
-    # Convert Date to datetime
-    df["Date"] = pd.to_datetime(df["Date"])
+    count("bars_simulated_total", portfolio.get("bars", len(portfolio["daily_values"])), engine=engine)
+    count("trades_emitted_total", len(portfolio["trades"]), engine=engine)
     
-    # Filter data for backtest period
-    mask = (df["Date"] >= start_date) & (df["Date"] <= end_date)
-    backtest_data = df.loc[mask].copy()
+    # Calculate performance metrics
+    with span("backtest.metrics"):
+        metrics = calculate_performance_metrics(portfolio, backtest_data)
+    
+    # Prepare result
+    result = {
+        "strategy": {
+            "symbol": symbol,
+            "upper_price": upper_price,
+            "lower_price": lower_price,
+            "num_grids": num_grids,
+            "investment_amount": investment_amount,
+            "grid_levels": grid_levels
+        },
+        "backtest_period": {
+            "start_date": start_date,
+            "end_date": end_date,
+            "days": len(portfolio["daily_values"]),
+            "bars": portfolio.get("bars", len(portfolio["daily_values"]))
+        },
+        "engine": engine,
+        "trades": portfolio["trades"],
+        "daily_values": portfolio["daily_values"],
+        "metrics": metrics,
+        "created_at": datetime.now().isoformat()
+    }
+    if fill_model is not None:
+        result["fill_model"] = fill_model.to_dict()
+    
+    return result
+
+def load_backtest_data(symbol, start_date, end_date):
+    """
+    Load daily price data for a backtest period
+    
+    Parameters:
+    - symbol: Stock symbol
+    - start_date: Start date for backtest (YYYY-MM-DD)
+    - end_date: End date for backtest (YYYY-MM-DD)
+    
+    Returns:
+    - DataFrame with Date, High, Low and Close columns for the period
+    """
+    # Read only the backtest period from the local price store
+    backtest_data = get_price_history(symbol, interval="1d", start=start_date, end=end_date)
     
     if len(backtest_data) == 0:
         raise ValueError("No data available for the specified date range")
     
+    return backtest_data
+
+def simulate_loop(backtest_data, grid_levels, investment_amount, progress=None, fill_model=None):
+    """
+    Simulate a grid strategy day by day with process_price_movements
+    
+    Parameters:
+    - backtest_data: DataFrame with Date, High, Low and Close columns
+    - grid_levels: List of grid price levels
+    - investment_amount: Total investment amount
+    - progress: Optional callable progress(bars_done, bars_total)
+    - fill_model: Optional FillModel applied to every order
+    
+    Returns:
+    - Portfolio dict with trades and daily values
+    """
     # Initialize portfolio
     portfolio = {
+        "investment_amount": investment_amount,
         "cash": investment_amount,
         "shares": 0,
         "trades": [],
-        "daily_values": []
+        "daily_values": [],
+        "accumulator": PerformanceAccumulator(investment_amount)
     }
     
+    total_bars = len(backtest_data)
+    
     # Run backtest
-    for i, row in backtest_data.iterrows():
+    for bars_done, (i, row) in enumerate(backtest_data.iterrows()):
+        if progress is not None and bars_done % PROGRESS_INTERVAL == 0:
+            progress(bars_done, total_bars)
+        
         date = row["Date"]
         high = row["High"]
         low = row["Low"]
         close = row["Close"]
         
         # Check for each grid level if price crossed it during the day
-        trades_today = process_price_movements(date, low, high, grid_levels, portfolio)
+        trades_today = process_price_movements(date, low, high, grid_levels, portfolio, fill_model)
         
         # Calculate portfolio value at end of day
         portfolio_value = portfolio["cash"] + portfolio["shares"] * close
+        portfolio["accumulator"].add_trades(trades_today)
+        portfolio["accumulator"].add_value(portfolio_value)
         
         # Add daily value to tracking
         portfolio["daily_values"].append({
@@ -67,33 +174,52 @@ def run_backtest(strategy, start_date, end_date):
             "value": portfolio_value
         })
     
-    # Calculate performance metrics
-    metrics = calculate_performance_metrics(portfolio, backtest_data)
+    if progress is not None:
+        progress(total_bars, total_bars)
     
-    # Prepare result
-    result = {
-        "strategy": {
-            "symbol": symbol,
-            "upper_price": upper_price,
-            "lower_price": lower_price,
-            "num_grids": num_grids,
-            "investment_amount": investment_amount,
-            "grid_levels": grid_levels
-        },
-        "backtest_period": {
-            "start_date": start_date,
-            "end_date": end_date,
-            "days": len(backtest_data)
-        },
-        "trades": portfolio["trades"],
-        "daily_values": portfolio["daily_values"],
-        "metrics": metrics,
-        "created_at": datetime.now().isoformat()
-    }
+    return portfolio
+
+def simulate_vectorized(backtest_data, grid_levels, investment_amount, progress=None, fill_model=None):
+    """
+    Simulate a grid strategy with the vectorized NumPy engine
     
-    return result
+    Parameters:
+    - backtest_data: DataFrame with Date, High, Low and Close columns
+    - grid_levels: List of grid price levels
+    - investment_amount: Total investment amount
+    - progress: Optional callable progress(bars_done, bars_total)
+    - fill_model: Optional FillModel applied to every order
+    
+    Returns:
+    - Portfolio dict with trades and daily values, same shape as simulate_loop
+    """
+    simulation = simulate_grid_vectorized(
+        backtest_data["Date"].dt.strftime('%Y-%m-%d').to_numpy(),
+        backtest_data["High"].to_numpy(dtype=np.float64),
+        backtest_data["Low"].to_numpy(dtype=np.float64),
+        backtest_data["Close"].to_numpy(dtype=np.float64),
+        grid_levels,
+        investment_amount,
+        progress=progress,
+        fill_model=fill_model
+    )
+    
+    trades = columns_to_records(simulation["trades"])
+    
+    accumulator = PerformanceAccumulator(investment_amount)
+    accumulator.add_values(simulation["daily_values"]["value"])
+    accumulator.add_trades(trades)
+    
+    return {
+        "investment_amount": investment_amount,
+        "cash": simulation["cash"],
+        "shares": simulation["shares"],
+        "trades": trades,
+        "daily_values": columns_to_records(simulation["daily_values"]),
+        "accumulator": accumulator
+    }
 
-def process_price_movements(date, low, high, grid_levels, portfolio):
+def process_price_movements(date, low, high, grid_levels, portfolio, fill_model=None):
     """
     Process price movements within a day and execute trades
     
@@ -103,14 +229,22 @@ def process_price_movements(date, low, high, grid_levels, portfolio):
     - high: Day's high price
     - grid_levels: List of grid price levels
     - portfolio: Current portfolio state
+    - fill_model: Optional FillModel; without one orders fill at the grid
+      price with no fees and buys the cash cannot cover are skipped
     
     Returns:
     - List of trades executed
     """
     trades = []
+    if fill_model is not None:
+        slippage = fill_model.slippage(high, low)
+    
+    # Only the levels inside the day's range can trade
+    first = bisect_left(grid_levels, low)
+    end = bisect_right(grid_levels, high)
     
     # Check each grid level
-    for level in range(1, len(grid_levels)):
+    for level in range(max(first, 1), end):
         grid_price = grid_levels[level]
         
         # If price crossed above this grid level, check for sell opportunity
@@ -122,24 +256,31 @@ def process_price_movements(date, low, high, grid_levels, portfolio):
             
             if shares_to_sell > 0:
                 # Execute sell
-                sell_amount = shares_to_sell * grid_price
+                price = grid_price
+                if fill_model is None:
+                    sell_amount = shares_to_sell * grid_price
+                else:
+                    price = fill_model.fill_price(grid_price, slippage, "sell")
+                    sell_amount = fill_model.sell_proceeds(shares_to_sell, grid_price, slippage)
                 portfolio["cash"] += sell_amount
                 portfolio["shares"] -= shares_to_sell
                 
                 trade = {
                     "date": date.strftime('%Y-%m-%d'),
                     "type": "sell",
-                    "price": grid_price,
+                    "price": price,
                     "shares": shares_to_sell,
                     "amount": sell_amount,
                     "grid_level": level
                 }
+                if fill_model is not None:
+                    trade["fee"] = fill_model.fee(shares_to_sell, price)
                 
                 portfolio["trades"].append(trade)
                 trades.append(trade)
     
     # Now check for buy opportunities (in reverse order to prioritize lower prices)
-    for level in range(len(grid_levels) - 1, 0, -1):
+    for level in range(min(end, len(grid_levels) - 1), first, -1):
         grid_price = grid_levels[level - 1]
         
         # If price crossed below this grid level, check for buy opportunity
@@ -147,7 +288,17 @@ def process_price_movements(date, low, high, grid_levels, portfolio):
             # Calculate how many shares to buy at this level
             grid_allocation = portfolio["investment_amount"] / (len(grid_levels) - 1)
             shares_to_buy = grid_allocation / grid_price
-            cost = shares_to_buy * grid_price
+            price = grid_price
+            if fill_model is None:
+                cost = shares_to_buy * grid_price
+            else:
+                price = fill_model.fill_price(grid_price, slippage, "buy")
+                cost = fill_model.buy_cost(shares_to_buy, grid_price, slippage)
+                
+                # Buy what the cash covers when partial fills are allowed
+                if cost > portfolio["cash"] and fill_model.partial_fills and portfolio["cash"] > 0:
+                    shares_to_buy = fill_model.affordable_shares(portfolio["cash"], grid_price, slippage)
+                    cost = portfolio["cash"]
             
             # Make sure we have enough cash
             if cost <= portfolio["cash"]:
@@ -158,11 +309,13 @@ def process_price_movements(date, low, high, grid_levels, portfolio):
                 trade = {
                     "date": date.strftime('%Y-%m-%d'),
                     "type": "buy",
-                    "price": grid_price,
+                    "price": price,
                     "shares": shares_to_buy,
                     "amount": cost,
                     "grid_level": level - 1
                 }
+                if fill_model is not None:
+                    trade["fee"] = fill_model.fee(shares_to_buy, price)
                 
                 portfolio["trades"].append(trade)
                 trades.append(trade)
@@ -174,53 +327,18 @@ def calculate_performance_metrics(portfolio, backtest_data):
     Calculate performance metrics for the backtest
     
     Parameters:
-    - portfolio: Portfolio state after backtest
+    - portfolio: Portfolio state after backtest (its PerformanceAccumulator
+      under "accumulator" is used when the simulation kept one)
     - backtest_data: DataFrame with price data
     
     Returns:
     - Dict with performance metrics
     """
-    daily_values = pd.DataFrame(portfolio["daily_values"])
-    
-    # Calculate metrics
-    initial_value = portfolio["investment_amount"]
-    final_value = daily_values.iloc[-1]["value"]
-    
-    # Calculate returns
-    total_return = (final_value - initial_value) / initial_value
-    annualized_return = (1 + total_return) ** (365 / len(daily_values)) - 1
-    
-    # Calculate drawdown
-    daily_values["drawdown"] = 1 - daily_values["value"] / daily_values["value"].cummax()
-    max_drawdown = daily_values["drawdown"].max()
+    # Simulations that fed an accumulator bar by bar only need a snapshot
+    accumulator = portfolio.get("accumulator")
+    if accumulator is None:
+        accumulator = PerformanceAccumulator(portfolio["investment_amount"])
+        accumulator.add_values([day["value"] for day in portfolio["daily_values"]])
+        accumulator.add_trades(portfolio["trades"])
     
-    # Calculate Sharpe ratio (assuming risk-free rate of 0)
-    daily_returns = daily_values["value"].pct_change().dropna()
-    sharpe_ratio = 0
-    if len(daily_returns) > 0:
-        sharpe_ratio = np.sqrt(252) * daily_returns.mean() / daily_returns.std()
-    
-    # Count trades
-    num_trades = len(portfolio["trades"])
-    buy_trades = sum(1 for trade in portfolio["trades"] if trade["type"] == "buy")
-    sell_trades = sum(1 for trade in portfolio["trades"] if trade["type"] == "sell")
-    
-    # Calculate profit from trades
-    trade_profit = sum(trade["amount"] for trade in portfolio["trades"] if trade["type"] == "sell") - \
-                  sum(trade["amount"] for trade in portfolio["trades"] if trade["type"] == "buy")
-    
-    return {
-        "initial_value": initial_value,
-        "final_value": final_value,
-        "total_return": total_return,
-        "total_return_pct": total_return * 100,
-        "annualized_return": annualized_return,
-        "annualized_return_pct": annualized_return * 100,
-        "max_drawdown": max_drawdown,
-        "max_drawdown_pct": max_drawdown * 100,
-        "sharpe_ratio": sharpe_ratio,
-        "num_trades": num_trades,
-        "buy_trades": buy_trades,
-        "sell_trades": sell_trades,
-        "trade_profit": trade_profit
-    }
+    return accumulator.snapshot()
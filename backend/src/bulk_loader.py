@@ -0,0 +1,345 @@
+import argparse
+import json
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from src.data_fetcher import get_price_store, resolve_ticker
+from src.telemetry import count
+
+# Concurrent downloads of a bulk load
+DEFAULT_LOADER_WORKERS = 8
+
+# Provider requests per second across all workers of a bulk load
+DEFAULT_LOADER_RATE = 5.0
+
+# Retries of a failed provider request before its series is reported as failed
+DEFAULT_LOADER_RETRIES = 3
+
+# Most retries a bulk load request may ask for
+MAX_LOADER_RETRIES = 5
+
+# Seconds before the first retry; each further retry waits twice as long
+DEFAULT_LOADER_BACKOFF = 1.0
+
+# Longest wait in seconds between two attempts
+MAX_LOADER_BACKOFF = 60.0
+
+# Most (symbol, interval) series one bulk load may request
+MAX_BULK_LOAD_SERIES = 5000
+
+# HTTP statuses worth retrying: rate limited or a server-side failure
+TRANSIENT_HTTP_STATUSES = (429, 500, 502, 503, 504)
+
+# Exception class names (anywhere in an error's class hierarchy) of
+# transient failures raised by HTTP clients such as requests and curl_cffi,
+# and by yfinance when rate limited; matched by name so none of them has to
+# be imported
+TRANSIENT_ERROR_NAMES = ("ConnectionError", "Timeout", "YFRateLimitError")
+
+class TokenBucket:
+    """
+    Thread-safe token bucket limiting how often an action may happen
+
+    Tokens are added at rate per second up to burst; acquire() takes one,
+    sleeping until one is available. A rate of None (or 0) never waits.
+    """
+
+    def __init__(self, rate, burst=None, clock=time.monotonic, sleep=time.sleep):
+        """
+        Parameters:
+        - rate: Tokens added per second, or None for no limit
+        - burst: Most tokens held at once (defaults to max(rate, 1))
+        - clock: Callable returning the current time in seconds
+        - sleep: Callable sleeping for a number of seconds
+        """
+        if rate is not None and rate < 0:
+            raise ValueError("Rate must not be negative")
+        self.rate = rate or None
+        self.burst = burst if burst is not None else max(self.rate or 1, 1)
+        self.clock = clock
+        self.sleep = sleep
+        self._tokens = self.burst
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """
+        Take a token, waiting for one if none is available
+
+        Returns:
+        - Seconds spent waiting
+        """
+        if self.rate is None:
+            return 0.0
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = self.clock()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return waited
+                wait = (1 - self._tokens) / self.rate
+            self.sleep(wait)
+            waited += wait
+
+def backoff_delay(attempt, backoff, jitter=random.random):
+    """
+    Get the wait before retrying a failed attempt
+
+    Exponential backoff with full jitter: a random wait of up to
+    backoff * 2 ** (attempt - 1) seconds, capped at MAX_LOADER_BACKOFF.
+
+    Parameters:
+    - attempt: Number of the attempt that failed (1 for the first)
+    - backoff: Seconds of the first retry's longest wait
+    - jitter: Callable returning a random fraction in [0, 1)
+
+    Returns:
+    - Seconds to wait
+    """
+    return min(backoff * 2 ** (attempt - 1), MAX_LOADER_BACKOFF) * jitter()
+
+def is_transient_error(error):
+    """
+    Check whether a failed provider request is worth retrying
+
+    Connection failures, timeouts, rate limiting (HTTP 429) and server
+    errors (HTTP 5xx) are transient. Anything else, such as an unknown
+    ticker or an HTTP 404, fails the same way on every attempt.
+
+    Parameters:
+    - error: Exception raised by the provider
+
+    Returns:
+    - True if the request should be retried
+    """
+    if isinstance(error, (ConnectionError, TimeoutError)):
+        return True
+    response = getattr(error, "response", None)
+    status = getattr(response, "status_code", None) or getattr(error, "status_code", None)
+    if status is not None:
+        return status in TRANSIENT_HTTP_STATUSES
+    return any(cls.__name__ in TRANSIENT_ERROR_NAMES for cls in type(error).__mro__)
+
+def load_series(store, symbol, interval, period=None, start=None, limiter=None, retries=DEFAULT_LOADER_RETRIES,
+                backoff=DEFAULT_LOADER_BACKOFF, sleep=time.sleep):
+    """
+    Load one symbol's bars into the price store, retrying failed requests
+
+    Every provider request takes a token from the limiter first. A request
+    failing with a transient error (see is_transient_error) is retried after
+    an exponential backoff; other provider errors and errors raised by the
+    store itself (such as no data for the symbol) fail the series at once.
+
+    Parameters:
+    - store: PriceStore the bars are written to
+    - symbol: Stock symbol (e.g., 'AAPL')
+    - interval: Bar interval (e.g., '1d')
+    - period: Data period to cover (e.g., 'max')
+    - start: First bar date to cover (overrides period)
+    - limiter: TokenBucket shared by all requests of the bulk load, or None
+    - retries: Retries of a failed request
+    - backoff: Seconds of the first retry's longest wait
+    - sleep: Callable sleeping between retries
+
+    Returns:
+    - Result dict with the symbol, interval, status ('loaded' or 'failed'),
+      attempts, seconds, and either the cached rows and bar range or the error
+    """
+    attempts = 0
+
+    def provider(*args, **kwargs):
+        nonlocal attempts
+        while True:
+            if limiter is not None:
+                limiter.acquire()
+            attempts += 1
+            try:
+                return store.provider(*args, **kwargs)
+            except Exception as e:
+                transient = is_transient_error(e)
+                count("bulk_load_request_errors_total", transient=str(transient).lower())
+                if not transient or attempts > retries:
+                    raise
+            sleep(backoff_delay(attempts, backoff))
+
+    result = {"symbol": symbol, "interval": interval}
+    started = time.perf_counter()
+    try:
+        loaded = store.load(resolve_ticker(symbol), interval, period=period, start=start, provider=provider)
+        result.update(status="loaded", rows=loaded["rows"], first_bar=loaded["first_bar"],
+                      last_bar=loaded["last_bar"], fetched=loaded["fetched"])
+    except Exception as e:
+        result.update(status="failed", error=str(e), error_type=type(e).__name__)
+    result["attempts"] = attempts
+    result["seconds"] = time.perf_counter() - started
+    count("bulk_load_series_total", status=result["status"])
+    return result
+
+def iter_bulk_load(symbols, intervals=("1d",), period="max", start=None, max_workers=DEFAULT_LOADER_WORKERS,
+                   rate=DEFAULT_LOADER_RATE, burst=None, retries=DEFAULT_LOADER_RETRIES,
+                   backoff=DEFAULT_LOADER_BACKOFF, store=None, sleep=time.sleep):
+    """
+    Load many symbols and intervals into the price store concurrently
+
+    Series are downloaded by a bounded pool of threads; provider requests of
+    all threads share one token bucket, so the provider sees at most rate
+    requests per second however many workers run. Failures are reported per
+    series and never stop the others.
+
+    Parameters:
+    - symbols: List of stock symbols
+    - intervals: Bar intervals to load for every symbol
+    - period: Data period to cover (e.g., 'max')
+    - start: First bar date to cover (overrides period)
+    - max_workers: Number of download threads
+    - rate: Provider requests per second, or None for no limit
+    - burst: Requests allowed at once before the rate applies
+    - retries: Retries of a failed request
+    - backoff: Seconds of the first retry's longest wait
+    - store: PriceStore to write to (defaults to the process-wide store)
+    - sleep: Callable sleeping between retries
+
+    Returns:
+    - Generator of result dicts from load_series, in the order they finish
+    """
+    series = [(symbol, interval) for symbol in dict.fromkeys(symbols) for interval in dict.fromkeys(intervals)]
+    if len(series) == 0:
+        raise ValueError("No symbols to load")
+    if len(series) > MAX_BULK_LOAD_SERIES:
+        raise ValueError(f"Bulk load has {len(series)} series, the limit is {MAX_BULK_LOAD_SERIES}")
+    if max_workers < 1:
+        raise ValueError("Bulk load needs at least 1 worker")
+
+    store = store if store is not None else get_price_store()
+    limiter = TokenBucket(rate, burst)
+
+    # Arguments are checked above, before the first result is asked for
+    def generate():
+        executor = ThreadPoolExecutor(max_workers=min(max_workers, len(series)), thread_name_prefix="bulk-load")
+        try:
+            futures = [
+                executor.submit(load_series, store, symbol, interval, period=period, start=start,
+                                limiter=limiter, retries=retries, backoff=backoff, sleep=sleep)
+                for symbol, interval in series
+            ]
+            for future in as_completed(futures):
+                yield future.result()
+        finally:
+            # Stop queued downloads when the caller stops early
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    return generate()
+
+def run_bulk_load(symbols, intervals=("1d",), period="max", start=None, max_workers=DEFAULT_LOADER_WORKERS,
+                  rate=DEFAULT_LOADER_RATE, burst=None, retries=DEFAULT_LOADER_RETRIES,
+                  backoff=DEFAULT_LOADER_BACKOFF, store=None, sleep=time.sleep):
+    """
+    Load many symbols and intervals into the price store and summarize the outcome
+
+    Parameters:
+    - symbols: List of stock symbols
+    - intervals: Bar intervals to load for every symbol
+    - period: Data period to cover (e.g., 'max')
+    - start: First bar date to cover (overrides period)
+    - max_workers: Number of download threads
+    - rate: Provider requests per second, or None for no limit
+    - burst: Requests allowed at once before the rate applies
+    - retries: Retries of a failed request
+    - backoff: Seconds of the first retry's longest wait
+    - store: PriceStore to write to (defaults to the process-wide store)
+    - sleep: Callable sleeping between retries
+
+    Returns:
+    - Dict with the number of series requested, loaded and failed, the
+      elapsed seconds and the results in request order
+    """
+    started = time.perf_counter()
+    results = list(iter_bulk_load(symbols, intervals, period=period, start=start, max_workers=max_workers,
+                                  rate=rate, burst=burst, retries=retries, backoff=backoff, store=store,
+                                  sleep=sleep))
+
+    order = {symbol: index for index, symbol in enumerate(dict.fromkeys(symbols))}
+    interval_order = {interval: index for index, interval in enumerate(dict.fromkeys(intervals))}
+    results.sort(key=lambda result: (order[result["symbol"]], interval_order[result["interval"]]))
+
+    loaded = sum(1 for result in results if result["status"] == "loaded")
+    return {
+        "requested": len(results),
+        "loaded": loaded,
+        "failed": len(results) - loaded,
+        "seconds": time.perf_counter() - started,
+        "results": results
+    }
+
+def read_symbols(path):
+    """
+    Read symbols from a file with one symbol per line
+
+    Blank lines and lines starting with '#' are skipped; only the first
+    comma-separated field of a line is used, so a CSV with the symbol in its
+    first column works too.
+
+    Parameters:
+    - path: File path
+
+    Returns:
+    - List of symbols
+    """
+    symbols = []
+    with open(path) as f:
+        for line in f:
+            symbol = line.split(",")[0].strip()
+            if symbol and not symbol.startswith("#"):
+                symbols.append(symbol)
+    return symbols
+
+def main():
+    """Load price history for a symbol universe from the command line"""
+    parser = argparse.ArgumentParser(description="Download price history for many symbols into the local price store")
+    parser.add_argument("--symbols", nargs="+", default=[], help="Symbols to load")
+    parser.add_argument("--symbols-file", help="File with one symbol per line")
+    parser.add_argument("--intervals", nargs="+", default=["1d"], help="Bar intervals to load")
+    parser.add_argument("--period", default="max", help="Data period to cover")
+    parser.add_argument("--start", help="First bar date to cover (overrides --period)")
+    parser.add_argument("--workers", type=int, default=DEFAULT_LOADER_WORKERS, help="Concurrent downloads")
+    parser.add_argument("--rate", type=float, default=DEFAULT_LOADER_RATE,
+                        help="Provider requests per second (0 for no limit)")
+    parser.add_argument("--burst", type=float, help="Requests allowed at once before the rate applies")
+    parser.add_argument("--retries", type=int, default=DEFAULT_LOADER_RETRIES, help="Retries of a failed request")
+    parser.add_argument("--backoff", type=float, default=DEFAULT_LOADER_BACKOFF,
+                        help="Seconds before the first retry, doubled for each further retry")
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    args = parser.parse_args()
+
+    symbols = list(args.symbols)
+    if args.symbols_file:
+        symbols.extend(read_symbols(args.symbols_file))
+
+    started = time.perf_counter()
+    results = []
+    for result in iter_bulk_load(symbols, args.intervals, period=args.period, start=args.start,
+                                 max_workers=args.workers, rate=args.rate, burst=args.burst,
+                                 retries=args.retries, backoff=args.backoff):
+        results.append(result)
+        if result["status"] == "loaded":
+            detail = f"{result['rows']} rows to {result['last_bar'][:10]}"
+        else:
+            detail = f"{result['error_type']}: {result['error']}"
+        print(f"{len(results):>5}  {result['symbol']:<12}{result['interval']:<6}{result['status']:<8}"
+              f"{result['attempts']} attempt(s)  {detail}", flush=True)
+
+    failed = [result for result in results if result["status"] == "failed"]
+    print(f"Loaded {len(results) - len(failed)} of {len(results)} series in {time.perf_counter() - started:.1f}s")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
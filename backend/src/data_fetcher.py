@@ -1,6 +1,197 @@
-import yfinance as yf
-import pandas as pd
 import json
+import os
+import threading
+from src.price_store import PriceStore
+from src.quotes import QuoteService, DEFAULT_QUOTE_TTL
+from src.telemetry import span, count
+from src.serialization import frame_to_records
+from src.lazy import lazy_import
+
+yf = lazy_import("yfinance")
+pd = lazy_import("pandas")
+
+# Directory for the local OHLCV cache (override with PRICE_CACHE_DIR)
+DEFAULT_PRICE_CACHE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "prices")
+
+_price_store = None
+_price_store_lock = threading.Lock()
+
+_quote_service = None
+_quote_service_lock = threading.Lock()
+
+def yfinance_provider(ticker, interval, period=None, start=None):
+    """
+    Download bars from yfinance for the local price store
+    
+    Parameters:
+    - ticker: yfinance ticker symbol
+    - interval: Bar interval
+    - period: Data period to download (used when start is not given)
+    - start: First bar date to download
+    
+    Returns:
+    - DataFrame indexed by bar timestamp
+    """
+    with span("yfinance.download"):
+        if start is not None:
+            return yf.download(ticker, start=start, interval=interval, progress=False)
+        return yf.download(ticker, period=period, interval=interval, progress=False)
+
+def get_price_store():
+    """Get the process-wide price store, creating it on first use"""
+    global _price_store
+    with _price_store_lock:
+        if _price_store is None:
+            cache_dir = os.environ.get("PRICE_CACHE_DIR", DEFAULT_PRICE_CACHE_DIR)
+            _price_store = PriceStore(cache_dir, yfinance_provider)
+        return _price_store
+
+def set_price_store(store):
+    """Replace the process-wide price store (e.g. with one using a fake provider)"""
+    global _price_store
+    with _price_store_lock:
+        _price_store = store
+
+def resolve_ticker(symbol):
+    """
+    Map a symbol to its provider ticker
+    
+    Parameters:
+    - symbol: Stock symbol (e.g., 'AAPL')
+    
+    Returns:
+    - Ticker symbol (e.g., 'AAPL.US')
+    """
+    # Add .US suffix if not present
+    if '.US' not in symbol and '.' not in symbol:
+        return f"{symbol}.US"
+    return symbol
+
+def yfinance_quotes(symbols):
+    """
+    Download the latest close of several stocks in one yfinance request
+    
+    Parameters:
+    - symbols: List of stock symbols (e.g., ['AAPL', 'MSFT'])
+    
+    Returns:
+    - Dict of symbol to price, leaving out symbols without data
+    """
+    tickers = {resolve_ticker(symbol): symbol for symbol in symbols}
+    with span("yfinance.quotes"):
+        data = yf.download(list(tickers), period='5d', interval='1d', group_by='ticker', progress=False)
+    
+    prices = {}
+    for ticker, symbol in tickers.items():
+        # Columns are grouped by ticker, except in older yfinance for a single ticker
+        if isinstance(data.columns, pd.MultiIndex):
+            if ticker not in data.columns.get_level_values(0):
+                continue
+            closes = data[ticker]['Close']
+        else:
+            closes = data['Close']
+        closes = closes.dropna()
+        if len(closes) > 0:
+            prices[symbol] = float(closes.iloc[-1])
+    return prices
+
+def get_quote_service():
+    """Get the process-wide quote service, creating it on first use"""
+    global _quote_service
+    with _quote_service_lock:
+        if _quote_service is None:
+            ttl = float(os.environ.get("QUOTE_CACHE_TTL", DEFAULT_QUOTE_TTL))
+            _quote_service = QuoteService(yfinance_quotes, ttl=ttl)
+        return _quote_service
+
+def set_quote_service(service):
+    """Replace the process-wide quote service (e.g. with one using a fake fetcher)"""
+    global _quote_service
+    with _quote_service_lock:
+        _quote_service = service
+
+def get_quotes(symbols):
+    """
+    Get current prices of several stocks, batched and cached for a few seconds
+    
+    Parameters:
+    - symbols: List of stock symbols
+    
+    Returns:
+    - Dict of symbol to quote dict (price, source, as_of); symbols without a
+      price are left out
+    
+    Raises:
+    - QuoteProviderError: If the price provider failed
+    """
+    quotes = get_quote_service().get_quotes(symbols)
+    for quote in quotes.values():
+        count("quotes_total", source=quote["source"])
+    return quotes
+
+def get_price_history(symbol, interval='1d', period=None, start=None, end=None):
+    """
+    Get stock bars as a DataFrame from the local price store
+    
+    Parameters:
+    - symbol: Stock symbol (e.g., 'AAPL')
+    - interval: Data interval (e.g., '1m', '1d', '1wk')
+    - period: Data period (e.g., '1y', 'max'), ignored when start is given
+    - start: First date to include (YYYY-MM-DD)
+    - end: Last date to include (YYYY-MM-DD)
+    
+    Returns:
+    - DataFrame with Date, Open, High, Low, Close, Adj Close and Volume columns
+    """
+    return get_price_store().get_history(resolve_ticker(symbol), interval, period=period, start=start, end=end)
+
+def iter_price_history(symbol, interval='1m', start=None, end=None, chunk_rows=65536, period=None):
+    """
+    Get stock bars from the local price store as a stream of DataFrame chunks
+    
+    Parameters:
+    - symbol: Stock symbol (e.g., 'AAPL')
+    - interval: Data interval (e.g., '1m', '5m', '1d')
+    - start: First date to include (YYYY-MM-DD, overrides period)
+    - end: Last date to include (YYYY-MM-DD)
+    - chunk_rows: Number of bars per chunk
+    - period: Data period (e.g., '1y', 'max'), counted back from the latest bar
+    
+    Returns:
+    - Generator of DataFrames with Date, Open, High, Low and Close columns
+    """
+    return get_price_store().iter_history(resolve_ticker(symbol), interval, period=period, start=start, end=end,
+                                          chunk_rows=chunk_rows)
+
+def get_price_fingerprint(symbol, interval='1d', start=None, end=None):
+    """
+    Get a version hash of the stock bars in a date range
+    
+    Parameters:
+    - symbol: Stock symbol (e.g., 'AAPL')
+    - interval: Data interval (e.g., '1m', '1d')
+    - start: First date to include (YYYY-MM-DD)
+    - end: Last date to include (YYYY-MM-DD or timestamp)
+    
+    Returns:
+    - Hex digest that changes when any bar in the range changes
+    """
+    return get_price_store().fingerprint(resolve_ticker(symbol), interval, start=start, end=end)
+
+def get_price_version(symbol, interval='1d', period=None, start=None):
+    """
+    Get the version of the cached stock bars of a symbol
+    
+    Parameters:
+    - symbol: Stock symbol (e.g., 'AAPL')
+    - interval: Data interval (e.g., '1m', '1d')
+    - period: Data period that will be read (e.g., '1y')
+    - start: First date that will be read (YYYY-MM-DD, overrides period)
+    
+    Returns:
+    - Version string that changes whenever the cached bars are written
+    """
+    return get_price_store().version(resolve_ticker(symbol), interval, period=period, start=start)
 
 def get_stock_data(symbol, period='1y', interval='1d'):
     """
@@ -15,26 +206,14 @@ def get_stock_data(symbol, period='1y', interval='1d'):
     - JSON-serializable dict with stock data
     """
     try:
-        # Add .US suffix if not present
-        if '.US' not in symbol and '.' not in symbol:
-            ticker = f"{symbol}.US"
-        else:
-            ticker = symbol
-            
-        # Fetch data
-        data = yf.download(ticker, period=period, interval=interval, progress=False)
-        
-        # Reset index to make Date a column
-        data = data.reset_index()
-        
-        # Convert dates to string for JSON serialization
-        data['Date'] = data['Date'].dt.strftime('%Y-%m-%d %H:%M:%S')
+        # Read from the local store, fetching missing bars from yfinance
+        with span("stock.read"):
+            data = get_price_history(symbol, interval, period=period)
         
-        # Convert NaN values to None for JSON serialization
-        data = data.where(pd.notnull(data), None)
-        
-        # Convert DataFrame to list of dictionaries
-        data_list = data.to_dict('records')
+        with span("stock.convert"):
+            # Convert to row dicts column by column, with dates as strings
+            # and NaN values as None for JSON serialization
+            data_list = frame_to_records(data)
         
         return {
             "symbol": symbol,
@@ -54,16 +233,11 @@ def get_current_price(symbol):
     
     Returns:
     - Current price as float
+    
+    Raises:
+    - QuoteProviderError: If the price provider failed
     """
-    try:
-        # Add .US suffix if not present
-        if '.US' not in symbol and '.' not in symbol:
-            ticker = f"{symbol}.US"
-        else:
-            ticker = symbol
-            
-        ticker_obj = yf.Ticker(ticker)
-        current_price = ticker_obj.history(period='1d')['Close'].iloc[-1]
-        return float(current_price)
-    except Exception as e:
-        raise Exception(f"Failed to get current price: {str(e)}")
+    quote = get_quotes([symbol]).get(symbol)
+    if quote is None:
+        raise Exception(f"Failed to get current price: no price for {symbol}")
+    return quote["price"]
@@ -1,28 +1,214 @@
-from pymongo import MongoClient
+from pymongo import MongoClient, IndexModel, ASCENDING, DESCENDING
+from pymongo.errors import BulkWriteError
 import os
+import threading
 from dotenv import load_dotenv
 
 # Load environment variables
 load_dotenv()
 
-def init_db():
-    """Initialize database connection"""
+# Collections created at startup
+COLLECTIONS = ("strategies", "trades", "backtests", "backtest_series", "backtest_cache", "backtest_jobs")
+
+# Indexes declared per collection and created by ensure_indexes (default
+# names, so indexes created earlier with create_index are recognised)
+INDEXES = {
+    "strategies": [
+        IndexModel([("symbol", ASCENDING)])
+    ],
+    "trades": [
+        IndexModel([("symbol", ASCENDING), ("date", ASCENDING)]),
+        IndexModel([("strategy_id", ASCENDING), ("timestamp", ASCENDING)])
+    ],
+    "backtests": [
+        IndexModel([("strategy_id", ASCENDING), ("created_at", DESCENDING)])
+    ],
+    "backtest_series": [
+        IndexModel([("backtest_id", ASCENDING), ("kind", ASCENDING), ("seq", ASCENDING)], unique=True)
+    ],
+    "backtest_cache": [
+        IndexModel([("key", ASCENDING)], unique=True),
+        # Cached artifacts are removed by MongoDB once expires_at has passed
+        IndexModel([("expires_at", ASCENDING)], expireAfterSeconds=0)
+    ],
+    "backtest_jobs": [
+        IndexModel([("key", ASCENDING), ("created_at", DESCENDING)]),
+        # At most one queued or running job per backtest across processes
+        IndexModel([("active_key", ASCENDING)], unique=True, sparse=True)
+    ]
+}
+
+# Client settings read from the environment, with their defaults
+CLIENT_OPTIONS = {
+    "maxPoolSize": ("MONGO_MAX_POOL_SIZE", 100),
+    "minPoolSize": ("MONGO_MIN_POOL_SIZE", 0),
+    "maxIdleTimeMS": ("MONGO_MAX_IDLE_TIME_MS", None),
+    "waitQueueTimeoutMS": ("MONGO_WAIT_QUEUE_TIMEOUT_MS", None),
+    "serverSelectionTimeoutMS": ("MONGO_SERVER_SELECTION_TIMEOUT_MS", 5000),
+    "connectTimeoutMS": ("MONGO_CONNECT_TIMEOUT_MS", 5000),
+    "socketTimeoutMS": ("MONGO_SOCKET_TIMEOUT_MS", None)
+}
+
+# Documents sent per insert_many by bulk_insert
+DEFAULT_BULK_BATCH_SIZE = 1000
+
+# MongoDB error code for a duplicate key
+DUPLICATE_KEY_ERROR = 11000
+
+def get_client_options():
+    """
+    Read MongoClient pool and timeout settings from the environment
+    
+    Returns:
+    - Dict of MongoClient keyword arguments (unset options are left out)
+    """
+    options = {}
+    for option, (variable, default) in CLIENT_OPTIONS.items():
+        value = os.environ.get(variable)
+        value = int(value) if value else default
+        if value is not None:
+            options[option] = value
+    return options
+
+def ensure_indexes(db, collections=None):
+    """
+    Create the declared indexes (existing identical indexes are left alone)
+    
+    Parameters:
+    - db: MongoDB database
+    - collections: Names of the collections to index (defaults to all in INDEXES)
+    """
+    for name in collections or INDEXES:
+        db[name].create_indexes(INDEXES[name])
+
+def init_db(client=None):
+    """
+    Initialize database connection
+    
+    Parameters:
+    - client: MongoClient to use (e.g. a mongomock client); by default one is
+      created from MONGO_URI with the pool and timeout settings from the environment
+    
+    Returns:
+    - MongoDB database with its collections and indexes in place
+    """
     # Get MongoDB URI from environment variable or use default
     mongo_uri = os.environ.get("MONGO_URI", "mongodb://localhost:27017/")
     db_name = os.environ.get("DB_NAME", "grid_trading")
     
     # Connect to MongoDB
-    client = MongoClient(mongo_uri)
+    if client is None:
+        client = MongoClient(mongo_uri, **get_client_options())
     db = client[db_name]
     
     # Create collections if they don't exist
-    if "strategies" not in db.list_collection_names():
-        db.create_collection("strategies")
-    
-    if "trades" not in db.list_collection_names():
-        db.create_collection("trades")
+    existing = set(db.list_collection_names())
+    for name in COLLECTIONS:
+        if name not in existing:
+            db.create_collection(name)
     
-    if "backtests" not in db.list_collection_names():
-        db.create_collection("backtests")
+    ensure_indexes(db)
     
     return db
+
+class LazyDatabase:
+    """
+    MongoDB database handle that connects on first use in each process
+    
+    MongoClient is not fork-safe: a client created before a server forks its
+    workers must not be used in them. The handle remembers the process that
+    created its client and connects again (running init_db) the first time
+    it is used in a new process, so the app can be imported once in a
+    preforking server's master and shared by every worker.
+    """
+    
+    def __init__(self, client_factory=None):
+        """
+        Parameters:
+        - client_factory: Callable returning a MongoClient (defaults to one
+          built from MONGO_URI and the environment settings)
+        """
+        self._client_factory = client_factory
+        self._db = None
+        self._pid = None
+        self._lock = threading.Lock()
+    
+    def get(self):
+        """
+        Get the database for the current process, connecting if needed
+        
+        Returns:
+        - MongoDB database
+        """
+        pid = os.getpid()
+        if self._db is None or self._pid != pid:
+            with self._lock:
+                if self._db is None or self._pid != pid:
+                    client = self._client_factory() if self._client_factory is not None else None
+                    self._db = init_db(client)
+                    self._pid = pid
+        return self._db
+    
+    def close(self):
+        """Close this process's client; the next use connects again"""
+        with self._lock:
+            if self._db is not None and self._pid == os.getpid():
+                self._db.client.close()
+            self._db = None
+            self._pid = None
+    
+    def __getattr__(self, name):
+        return getattr(self.get(), name)
+    
+    def __getitem__(self, name):
+        return self.get()[name]
+
+def bulk_insert(collection, documents, batch_size=DEFAULT_BULK_BATCH_SIZE, ignore_duplicates=False):
+    """
+    Insert documents in unordered insert_many batches
+    
+    Unordered batches let the server apply a batch's writes in parallel and
+    keep going past a failed document.
+    
+    Parameters:
+    - collection: MongoDB collection
+    - documents: Iterable of documents (each gets an _id if it has none)
+    - batch_size: Documents per insert_many
+    - ignore_duplicates: Skip documents that violate a unique index instead
+      of raising
+    
+    Returns:
+    - Number of documents inserted
+    
+    Raises:
+    - BulkWriteError: If a batch fails; its writeErrors indexes count from
+      the first document and nInserted includes the earlier batches. Batches
+      after the failed one are not written
+    """
+    inserted = 0
+    offset = 0
+    batch = []
+    try:
+        for document in documents:
+            batch.append(document)
+            if len(batch) >= batch_size:
+                inserted += _insert_batch(collection, batch, ignore_duplicates)
+                offset += len(batch)
+                batch = []
+        if batch:
+            inserted += _insert_batch(collection, batch, ignore_duplicates)
+    except BulkWriteError as e:
+        for error in e.details.get("writeErrors", []):
+            error["index"] += offset
+        e.details["nInserted"] = inserted + e.details.get("nInserted", 0)
+        raise
+    return inserted
+
+def _insert_batch(collection, batch, ignore_duplicates):
+    try:
+        return len(collection.insert_many(batch, ordered=False).inserted_ids)
+    except BulkWriteError as e:
+        errors = e.details.get("writeErrors", [])
+        if ignore_duplicates and all(error.get("code") == DUPLICATE_KEY_ERROR for error in errors):
+            return e.details.get("nInserted", len(batch) - len(errors))
+        raise
@@ -0,0 +1,282 @@
+import threading
+from collections import OrderedDict
+import numpy as np
+from src.telemetry import count
+from src.lazy import lazy_import
+
+pd = lazy_import("pandas")
+
+# Ways a chart series can be reduced to a point count
+DOWNSAMPLE_METHODS = ("lttb", "minmax", "ohlc")
+
+# Points returned when a chart request does not ask for a count
+DEFAULT_CHART_POINTS = 1000
+
+# Most points a chart request may ask for
+MAX_CHART_POINTS = 20000
+
+# Downsampled series kept in the in-process cache
+DEFAULT_CHART_CACHE_SIZE = 256
+
+# Columns aggregated per bucket by the OHLC method (other columns keep their
+# last value in the bucket)
+OHLC_AGGREGATES = {
+    "Open": "first",
+    "High": "max",
+    "Low": "min",
+    "Volume": "sum"
+}
+
+def bucket_edges(length, buckets):
+    """
+    Split rows into consecutive buckets of (almost) equal size
+
+    Parameters:
+    - length: Number of rows
+    - buckets: Number of buckets
+
+    Returns:
+    - Array of bucket start rows followed by length
+    """
+    return np.unique(np.linspace(0, length, min(buckets, length) + 1).round().astype(np.int64))
+
+def lttb_indices(y, points, x=None):
+    """
+    Pick the rows that keep a line's shape with Largest-Triangle-Three-Buckets
+
+    The first and last rows are always kept. The rows in between are split
+    into points - 2 buckets, and from each bucket the row forming the
+    largest triangle with the row kept from the previous bucket and the
+    average of the next bucket is kept.
+
+    Parameters:
+    - y: Array of values
+    - points: Number of rows to keep (at least 3)
+    - x: Array of positions (defaults to the row numbers)
+
+    Returns:
+    - Array of row indexes in ascending order
+    """
+    length = len(y)
+    if points >= length:
+        return np.arange(length)
+    if points < 3:
+        raise ValueError("LTTB needs at least 3 points")
+
+    y = np.asarray(y, dtype=np.float64)
+    x = np.arange(length, dtype=np.float64) if x is None else np.asarray(x, dtype=np.float64)
+
+    # Buckets over rows 1..length-2; the last row closes the series
+    edges = 1 + bucket_edges(length - 2, points - 2)
+    sizes = np.diff(edges)
+    bucket = np.repeat(np.arange(len(sizes)), sizes)
+    mean_x = np.append(np.add.reduceat(x[:-1], edges[:-1]) / sizes, x[-1])
+    mean_y = np.append(np.add.reduceat(y[:-1], edges[:-1]) / sizes, y[-1])
+
+    # Twice the area of the triangle of kept row a, row b and the next
+    # bucket's mean (mx, my) is |xa * (yb - my) + ya * (mx - xb) + xb * my - mx * yb|;
+    # the terms not depending on a are computed for every row at once
+    rows = slice(1, length - 1)
+    next_x = mean_x[bucket + 1]
+    next_y = mean_y[bucket + 1]
+    a_terms = np.concatenate(([0.0], y[rows] - next_y, [0.0]))
+    b_terms = np.concatenate(([0.0], next_x - x[rows], [0.0]))
+    c_terms = np.concatenate(([0.0], x[rows] * next_y - next_x * y[rows], [0.0]))
+
+    # Rows with missing values get no area, so they are only kept from
+    # buckets without any other row
+    missing = np.isnan(a_terms) | np.isnan(b_terms) | np.isnan(c_terms)
+    a_terms[missing] = 0.0
+    b_terms[missing] = 0.0
+    c_terms[missing] = 0.0
+
+    selected = np.empty(len(edges) + 1, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = length - 1
+    kept_x = 0.0
+    kept_y = 0.0
+    present = np.flatnonzero(~(np.isnan(x) | np.isnan(y)))
+    if len(present) > 0:
+        kept_x = float(x[present[0]])
+        kept_y = float(y[present[0]])
+    for number, (start, end) in enumerate(zip(edges[:-1].tolist(), edges[1:].tolist()), 1):
+        area = np.abs(kept_x * a_terms[start:end] + kept_y * b_terms[start:end] + c_terms[start:end])
+        kept = start + int(area.argmax())
+        selected[number] = kept
+        if not missing[kept]:
+            kept_x = float(x[kept])
+            kept_y = float(y[kept])
+    return selected
+
+def minmax_indices(y, points):
+    """
+    Pick the lowest and highest row of each bucket
+
+    Keeps every peak and trough of a series at the cost of two rows per
+    bucket. The first and last rows are always kept.
+
+    Parameters:
+    - y: Array of values
+    - points: Maximum number of rows to keep (at least 4)
+
+    Returns:
+    - Array of row indexes in ascending order
+    """
+    length = len(y)
+    if points >= length:
+        return np.arange(length)
+    if points < 4:
+        raise ValueError("Min/max downsampling needs at least 4 points")
+
+    # Two rows per bucket, plus the first and last rows
+    y = np.asarray(y, dtype=np.float64)
+    edges = bucket_edges(length, (points - 2) // 2)
+    sizes = np.diff(edges)
+    bucket = np.repeat(np.arange(len(sizes)), sizes)
+
+    kept = [[0], [length - 1]]
+    for reduce in (np.fmin, np.fmax):
+        # First row of each bucket equal to the bucket's extreme (buckets
+        # with only missing values have none)
+        extreme = np.repeat(reduce.reduceat(y, edges[:-1]), sizes)
+        rows = np.flatnonzero(y == extreme)
+        first = np.ones(len(rows), dtype=bool)
+        first[1:] = bucket[rows[1:]] != bucket[rows[:-1]]
+        kept.append(rows[first])
+    return np.unique(np.concatenate(kept))
+
+def aggregate_ohlc(columns, points):
+    """
+    Resample bars into at most points bars of consecutive rows
+
+    Each bucket becomes one bar with the first Open, highest High, lowest
+    Low, summed Volume and the last value of every other column (such as
+    Close); its Date is the date of the bucket's first bar. Aggregation uses
+    ufunc.reduceat over the bucket starts, so every column is resampled in
+    one pass.
+
+    Parameters:
+    - columns: Dict of column name to array (rows in date order)
+    - points: Maximum number of bars
+
+    Returns:
+    - Dict of column name to array
+    """
+    length = len(next(iter(columns.values()))) if columns else 0
+    if points >= length:
+        return columns
+    if points < 1:
+        raise ValueError("OHLC downsampling needs at least 1 point")
+
+    edges = bucket_edges(length, points)
+    starts = edges[:-1]
+    ends = edges[1:] - 1
+    resampled = {}
+    for name, values in columns.items():
+        values = np.asarray(values)
+        aggregate = OHLC_AGGREGATES.get(name)
+        if name == "Date" or aggregate == "first":
+            resampled[name] = values[starts]
+        elif aggregate == "max":
+            resampled[name] = np.fmax.reduceat(values, starts)
+        elif aggregate == "min":
+            resampled[name] = np.fmin.reduceat(values, starts)
+        elif aggregate == "sum":
+            resampled[name] = np.add.reduceat(np.nan_to_num(values), starts)
+        else:
+            resampled[name] = values[ends]
+    return resampled
+
+def downsample_series(columns, points, method, value_column):
+    """
+    Reduce a series to a point count for charting
+
+    Parameters:
+    - columns: Dict of column name to array (rows in date order)
+    - points: Maximum number of rows to return
+    - method: 'lttb', 'minmax' or 'ohlc' (see DOWNSAMPLE_METHODS)
+    - value_column: Column whose shape lttb and minmax preserve
+
+    Returns:
+    - Dict of column name to array
+    """
+    if method not in DOWNSAMPLE_METHODS:
+        raise ValueError(f"Unknown downsampling method: {method}")
+    if not 1 <= points <= MAX_CHART_POINTS:
+        raise ValueError(f"Points must be between 1 and {MAX_CHART_POINTS}")
+    if method == "ohlc":
+        return aggregate_ohlc(columns, points)
+
+    if method == "lttb":
+        index = lttb_indices(columns[value_column], points)
+    else:
+        index = minmax_indices(columns[value_column], points)
+    return {name: np.asarray(values)[index] for name, values in columns.items()}
+
+def downsample_frame(frame, points, method, value_column):
+    """
+    Reduce a DataFrame of bars to a point count for charting
+
+    Parameters:
+    - frame: DataFrame with rows in date order
+    - points: Maximum number of rows to return
+    - method: 'lttb', 'minmax' or 'ohlc'
+    - value_column: Column whose shape lttb and minmax preserve
+
+    Returns:
+    - DataFrame with the same columns
+    """
+    columns = {name: frame[name].to_numpy() for name in frame.columns}
+    return pd.DataFrame(downsample_series(columns, points, method, value_column), columns=frame.columns)
+
+class ChartCache:
+    """
+    In-process LRU of downsampled chart series
+
+    Keys identify the series, the visible range, the point count and the
+    method; callers include a version of the underlying data in the key
+    when it can change, so zooming back to a range already seen is served
+    without reading or reducing the series again.
+    """
+
+    def __init__(self, max_entries=DEFAULT_CHART_CACHE_SIZE):
+        """
+        Parameters:
+        - max_entries: Series kept in the cache
+        """
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_compute(self, key, compute):
+        """
+        Get a cached series, computing and caching it on a miss
+
+        Parameters:
+        - key: Hashable cache key
+        - compute: Callable returning the series payload
+
+        Returns:
+        - Series payload (None payloads, such as a missing series, are not cached)
+        """
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                count("chart_cache_lookups_total", result="hit")
+                return self._entries[key]
+
+        count("chart_cache_lookups_total", result="miss")
+        payload = compute()
+        if payload is None:
+            return None
+        with self._lock:
+            self._entries[key] = payload
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return payload
+
+    def clear(self):
+        """Drop every cached series"""
+        with self._lock:
+            self._entries.clear()
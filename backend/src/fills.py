@@ -0,0 +1,170 @@
+# Settings of a fill model and their defaults (a frictionless fill)
+FILL_MODEL_FIELDS = {
+    "fee_per_share": 0.0,
+    "fee_pct": 0.0,
+    "slippage_pct": 0.0,
+    "slippage_range": 0.0,
+    "partial_fills": False
+}
+
+class FillModel:
+    """
+    Trading costs and fill rules applied to grid orders
+
+    Orders fill at the grid price moved against the trade by the slippage
+    (a fixed fraction plus a fraction of the bar's relative range) and pay a
+    fee per share plus a percentage of the filled amount. Buys the cash
+    cannot cover are skipped, or filled for as many shares as the cash buys
+    when partial_fills is set. Sells are always capped at the shares held.
+
+    Every method is plain arithmetic, so it works on floats in the loop
+    engines and on NumPy arrays (one value per bar or per path) in the
+    vectorized ones.
+    """
+
+    def __init__(self, fee_per_share=0.0, fee_pct=0.0, slippage_pct=0.0, slippage_range=0.0, partial_fills=False):
+        """
+        Parameters:
+        - fee_per_share: Fee per share traded
+        - fee_pct: Fee as a fraction of the filled amount (e.g., 0.001 for 0.1%)
+        - slippage_pct: Fixed slippage as a fraction of the price
+        - slippage_range: Slippage as a fraction of the bar's range relative
+          to its mid price
+        - partial_fills: Fill buys the cash cannot cover for the shares it can buy
+        """
+        for name, value in (("fee_per_share", fee_per_share), ("fee_pct", fee_pct),
+                            ("slippage_pct", slippage_pct), ("slippage_range", slippage_range)):
+            if not value >= 0:
+                raise ValueError(f"{name} must not be negative")
+        if fee_pct >= 1 or slippage_pct >= 1:
+            raise ValueError("Fees and slippage must be fractions below 1")
+        # A bar's relative range 2 * (high - low) / (high + low) is below 2,
+        # so this keeps the slippage of every bar below 1
+        if slippage_pct + 2 * slippage_range >= 1:
+            raise ValueError("slippage_pct + 2 * slippage_range must be below 1")
+        self.fee_per_share = float(fee_per_share)
+        self.fee_pct = float(fee_pct)
+        self.slippage_pct = float(slippage_pct)
+        self.slippage_range = float(slippage_range)
+        self.partial_fills = bool(partial_fills)
+
+    @classmethod
+    def from_dict(cls, params):
+        """
+        Build a fill model from request parameters
+
+        Parameters:
+        - params: Dict with any of the FILL_MODEL_FIELDS, or None
+
+        Returns:
+        - FillModel, or None when params is None
+        """
+        if params is None:
+            return None
+        unknown = set(params) - set(FILL_MODEL_FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown fill model settings: {', '.join(sorted(unknown))}")
+        return cls(**params)
+
+    def to_dict(self):
+        """
+        Returns:
+        - Dict of the model's settings
+        """
+        return {name: getattr(self, name) for name in FILL_MODEL_FIELDS}
+
+    def slippage(self, high, low):
+        """
+        Slippage of orders filled during a bar
+
+        Parameters:
+        - high: Bar high (float or array)
+        - low: Bar low (float or array)
+
+        Returns:
+        - Fraction of the price lost to slippage
+        """
+        return self.slippage_pct + self.slippage_range * 2 * (high - low) / (high + low)
+
+    def fill_price(self, price, slippage, side):
+        """
+        Price an order fills at
+
+        Parameters:
+        - price: Grid price of the order
+        - slippage: Slippage from slippage()
+        - side: 'buy' or 'sell'
+
+        Returns:
+        - Fill price
+        """
+        if side == "buy":
+            return price * (1 + slippage)
+        return price * (1 - slippage)
+
+    def fee(self, shares, price):
+        """
+        Fee paid on a fill
+
+        Parameters:
+        - shares: Shares filled
+        - price: Fill price
+
+        Returns:
+        - Fee amount
+        """
+        return shares * self.fee_per_share + shares * price * self.fee_pct
+
+    def buy_cost(self, shares, price, slippage):
+        """
+        Cash paid for a buy, fees included
+
+        Computed as (shares * price * (1 + fee_pct)) * (1 + slippage) +
+        shares * fee_per_share, so engines can precompute the per-level
+        parts and apply the per-bar slippage with one multiplication.
+
+        Parameters:
+        - shares: Shares bought
+        - price: Grid price of the order
+        - slippage: Slippage from slippage()
+
+        Returns:
+        - Cash amount
+        """
+        return shares * price * (1 + self.fee_pct) * (1 + slippage) + shares * self.fee_per_share
+
+    def sell_proceeds(self, shares, price, slippage):
+        """
+        Cash received for a sell, net of fees
+
+        Computed as shares * (price * (1 - fee_pct) * (1 - slippage) -
+        fee_per_share), so engines can precompute the per-level part. The
+        per-share amount is floored at 0: a fee per share larger than a
+        cheap share's price takes the whole proceeds, but a sell never
+        costs cash.
+
+        Parameters:
+        - shares: Shares sold
+        - price: Grid price of the order
+        - slippage: Slippage from slippage()
+
+        Returns:
+        - Cash amount
+        """
+        net_price = price * (1 - self.fee_pct) * (1 - slippage) - self.fee_per_share
+        # max(net_price, 0) for floats and arrays alike
+        return shares * ((net_price + abs(net_price)) / 2)
+
+    def affordable_shares(self, cash, price, slippage):
+        """
+        Shares a buy can fill for with the given cash, fees included
+
+        Parameters:
+        - cash: Available cash
+        - price: Grid price of the order
+        - slippage: Slippage from slippage()
+
+        Returns:
+        - Number of shares
+        """
+        return cash / (price * (1 + self.fee_pct) * (1 + slippage) + self.fee_per_share)
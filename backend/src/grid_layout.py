@@ -0,0 +1,219 @@
+from bisect import bisect_left
+import numpy as np
+
+# Ways of spacing grid levels between the lower and upper price
+GRID_SPACINGS = ("arithmetic", "geometric", "adaptive")
+
+# Price buckets used to measure local volatility for adaptive spacing
+ADAPTIVE_BINS = 256
+
+# Days of daily bars used to measure volatility for adaptive spacing
+ADAPTIVE_LOOKBACK_DAYS = 365
+
+class GridLayout:
+    """
+    Grid price levels with their spacing and a fast price-to-grid lookup
+
+    Levels are kept as a NumPy array for vectorized lookups and as a list
+    for scalar ones, which use the C bisect (measured faster in CPython than
+    computing the index from the spacing formula and correcting it).
+    """
+
+    def __init__(self, levels, spacing="arithmetic"):
+        """
+        Parameters:
+        - levels: Grid price levels, sorted ascending
+        - spacing: 'arithmetic', 'geometric' or 'adaptive'
+        """
+        if spacing not in GRID_SPACINGS:
+            raise ValueError(f"Unknown grid spacing: {spacing}")
+        self.levels = np.asarray(levels, dtype=np.float64)
+        self.spacing = spacing
+        self._levels = self.levels.tolist()
+
+    @classmethod
+    def arithmetic(cls, upper_price, lower_price, num_grids):
+        """
+        Evenly spaced levels (the same price step between levels)
+
+        Parameters:
+        - upper_price: Upper price boundary of the grid
+        - lower_price: Lower price boundary of the grid
+        - num_grids: Number of grid levels
+
+        Returns:
+        - GridLayout
+
+        Raises:
+        - ValueError: If the bounds are invalid, or levels rounded to cents
+          would repeat (more grids than cents in the range)
+        """
+        _check_bounds(upper_price, lower_price, num_grids)
+        return cls(_rounded_levels(np.linspace(lower_price, upper_price, num_grids)), "arithmetic")
+
+    @classmethod
+    def geometric(cls, upper_price, lower_price, num_grids):
+        """
+        Levels spaced by a constant percentage
+
+        Parameters:
+        - upper_price: Upper price boundary of the grid
+        - lower_price: Lower price boundary of the grid (must be positive)
+        - num_grids: Number of grid levels
+
+        Returns:
+        - GridLayout
+
+        Raises:
+        - ValueError: If the bounds are invalid, or levels rounded to cents
+          would repeat (too many grids for a narrow or low-priced range)
+        """
+        _check_bounds(upper_price, lower_price, num_grids)
+        if lower_price <= 0:
+            raise ValueError("Lower price must be positive for geometric spacing")
+        return cls(_rounded_levels(np.geomspace(lower_price, upper_price, num_grids)), "geometric")
+
+    @classmethod
+    def adaptive(cls, upper_price, lower_price, num_grids, high, low, close):
+        """
+        Levels spaced in proportion to the typical bar range near each price
+
+        The price range is split into buckets and each bucket's volatility is
+        the median high-low range of the bars that closed in it (buckets
+        without bars use the overall median). Levels are placed with a
+        density inversely proportional to that range, so they are further
+        apart where the price moves a lot and closer where it is calm.
+
+        Parameters:
+        - upper_price: Upper price boundary of the grid
+        - lower_price: Lower price boundary of the grid
+        - num_grids: Number of grid levels
+        - high: Array of historical bar highs
+        - low: Array of historical bar lows
+        - close: Array of historical bar closes
+
+        Returns:
+        - GridLayout
+
+        Raises:
+        - ValueError: If the bounds are invalid, there is no history, or
+          levels rounded to cents would repeat
+        """
+        _check_bounds(upper_price, lower_price, num_grids)
+        ranges = np.asarray(high, dtype=np.float64) - np.asarray(low, dtype=np.float64)
+        close = np.asarray(close, dtype=np.float64)
+        valid = ~(np.isnan(ranges) | np.isnan(close)) & (ranges > 0)
+        if not valid.any():
+            raise ValueError("No price history to measure volatility for adaptive spacing")
+        ranges, close = ranges[valid], close[valid]
+
+        edges = np.linspace(lower_price, upper_price, ADAPTIVE_BINS + 1)
+        buckets = np.searchsorted(edges, close, side="right") - 1
+        bucket_range = np.full(ADAPTIVE_BINS, np.median(ranges))
+        inside = (buckets >= 0) & (buckets < ADAPTIVE_BINS)
+        order = np.argsort(buckets[inside], kind="stable")
+        sorted_buckets = buckets[inside][order]
+        sorted_ranges = ranges[inside][order]
+        for bucket, start, end in _runs(sorted_buckets):
+            bucket_range[bucket] = np.median(sorted_ranges[start:end])
+
+        # Levels at equal steps of the cumulative density 1 / range
+        cumulative = np.concatenate(([0.0], np.cumsum(1 / bucket_range)))
+        cumulative /= cumulative[-1]
+        levels = np.interp(np.linspace(0, 1, num_grids), cumulative, edges)
+        return cls(_rounded_levels(levels), "adaptive")
+
+    @classmethod
+    def from_strategy(cls, strategy):
+        """
+        Build the layout of a strategy document
+
+        Parameters:
+        - strategy: Strategy dict with grid_levels (and grid_layout for
+          strategies created with a spacing)
+
+        Returns:
+        - GridLayout
+        """
+        spacing = strategy.get("grid_layout", {}).get("spacing", "arithmetic")
+        return cls(strategy["grid_levels"], spacing)
+
+    def __len__(self):
+        return len(self._levels)
+
+    def tolist(self):
+        """
+        Returns:
+        - Grid levels as a list of floats
+        """
+        return list(self._levels)
+
+    def to_document(self):
+        """
+        Compact description of the layout stored in a strategy document
+
+        Returns:
+        - Dict with the spacing, bounds and number of levels
+        """
+        return {
+            "spacing": self.spacing,
+            "lower_price": self._levels[0],
+            "upper_price": self._levels[-1],
+            "num_grids": len(self._levels)
+        }
+
+    def find_grid(self, price):
+        """
+        Find the grid a price falls into
+
+        Parameters:
+        - price: Price to look up
+
+        Returns:
+        - Index i of the grid with levels[i] <= price <= levels[i + 1] (the
+          lower grid when price is exactly on a level), or None if the price
+          is outside the grid range
+        """
+        levels = self._levels
+        if price < levels[0] or price > levels[-1]:
+            return None
+        return max(bisect_left(levels, price) - 1, 0)
+
+    def find_grids(self, prices):
+        """
+        Find the grids of many prices at once
+
+        Parameters:
+        - prices: Array of prices
+
+        Returns:
+        - Array of grid indexes, -1 for prices outside the grid range
+        """
+        prices = np.asarray(prices, dtype=np.float64)
+        grids = np.maximum(np.searchsorted(self.levels, prices, side="left") - 1, 0)
+        outside = (prices < self.levels[0]) | (prices > self.levels[-1]) | np.isnan(prices)
+        grids[outside] = -1
+        return grids
+
+def _check_bounds(upper_price, lower_price, num_grids):
+    if upper_price <= lower_price:
+        raise ValueError("Upper price must be greater than lower price")
+    if num_grids < 2:
+        raise ValueError("Number of grids must be at least 2")
+
+def _rounded_levels(levels):
+    # Levels rounded to cents, which must stay strictly increasing for the
+    # grid lookups to find every level
+    rounded = np.round(levels, 2)
+    if np.any(np.diff(rounded) <= 0):
+        raise ValueError("Grid levels collapse when rounded to cents; use fewer grids or a wider range")
+    return rounded
+
+def _runs(values):
+    # (value, start, end) for each run of equal values in a sorted array
+    if len(values) == 0:
+        return []
+    breaks = np.flatnonzero(np.diff(values)) + 1
+    starts = np.concatenate(([0], breaks))
+    ends = np.concatenate((breaks, [len(values)]))
+    return zip(values[starts].tolist(), starts.tolist(), ends.tolist())
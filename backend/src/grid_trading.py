@@ -1,34 +1,64 @@
-import numpy as np
-from datetime import datetime
-from src.data_fetcher import get_current_price
+from datetime import datetime, timedelta
+from src.data_fetcher import get_quotes, get_price_history
+from src.grid_layout import GridLayout, ADAPTIVE_LOOKBACK_DAYS
+from src.telemetry import span, timed
 
-def calculate_grid_levels(upper_price, lower_price, num_grids):
+# Largest grid stored with its per-level "grids" breakdown; bigger grids
+# keep only grid_levels and grid_layout, and order sizes are derived from them
+MAX_EXPANDED_GRIDS = 1000
+
+def build_grid_layout(upper_price, lower_price, num_grids, spacing="arithmetic", symbol=None):
     """
-    Calculate grid price levels
+    Build a grid layout with the requested spacing
     
     Parameters:
     - upper_price: Upper price boundary of the grid
     - lower_price: Lower price boundary of the grid
     - num_grids: Number of grid levels
+    - spacing: 'arithmetic', 'geometric' or 'adaptive'
+    - symbol: Stock symbol whose recent daily bars set the adaptive spacing
     
     Returns:
-    - List of grid price levels
+    - GridLayout
     """
-    if upper_price <= lower_price:
-        raise ValueError("Upper price must be greater than lower price")
+    if spacing == "geometric":
+        return GridLayout.geometric(upper_price, lower_price, num_grids)
     
-    if num_grids < 2:
-        raise ValueError("Number of grids must be at least 2")
+    if spacing == "adaptive":
+        if symbol is None:
+            raise ValueError("Adaptive spacing needs a symbol")
+        start = (datetime.now() - timedelta(days=ADAPTIVE_LOOKBACK_DAYS)).strftime('%Y-%m-%d')
+        with span("grid.adaptive_history"):
+            history = get_price_history(symbol, interval="1d", start=start)
+        return GridLayout.adaptive(upper_price, lower_price, num_grids,
+                                   history["High"].to_numpy(), history["Low"].to_numpy(), history["Close"].to_numpy())
     
-    # Calculate grid levels
-    grid_levels = np.linspace(lower_price, upper_price, num_grids)
+    if spacing != "arithmetic":
+        raise ValueError(f"Unknown grid spacing: {spacing}")
+    return GridLayout.arithmetic(upper_price, lower_price, num_grids)
+
+def calculate_grid_levels(upper_price, lower_price, num_grids, spacing="arithmetic", symbol=None):
+    """
+    Calculate grid price levels
     
-    # Round to 2 decimal places for readability
-    grid_levels = [round(level, 2) for level in grid_levels]
+    Parameters:
+    - upper_price: Upper price boundary of the grid
+    - lower_price: Lower price boundary of the grid
+    - num_grids: Number of grid levels
+    - spacing: 'arithmetic' (default), 'geometric' or 'adaptive'
+    - symbol: Stock symbol (needed for adaptive spacing)
     
-    return grid_levels
+    Returns:
+    - List of grid price levels, rounded to 2 decimal places
+
+    Raises:
+    - ValueError: If the bounds or spacing are invalid, or levels rounded to
+      2 decimal places would not be strictly increasing
+    """
+    return build_grid_layout(upper_price, lower_price, num_grids, spacing, symbol).tolist()
 
-def create_grid_strategy(params):
+@timed("grid.create_strategy")
+def create_grid_strategy(params, quote=None):
     """
     Create a grid trading strategy
     
@@ -39,46 +69,60 @@ def create_grid_strategy(params):
         - lower_price: Lower price boundary
         - num_grids: Number of grid levels
         - investment_amount: Total investment amount
+        - spacing: Level spacing, 'arithmetic' (default), 'geometric' or 'adaptive'
+    - quote: Quote dict (price, source) already fetched for the symbol, or None
+      to look it up
     
     Returns:
-    - Strategy dict with grid levels and allocation
+    - Strategy dict with grid levels and allocation; without a price for the
+      symbol, the initial position is taken at the mid-price (price_source
+      'fallback')
+    
+    Raises:
+    - QuoteProviderError: If the price provider failed while looking up the quote
     """
     symbol = params["symbol"]
     upper_price = float(params["upper_price"])
     lower_price = float(params["lower_price"])
     num_grids = int(params["num_grids"])
     investment_amount = float(params["investment_amount"])
+    spacing = params.get("spacing", "arithmetic")
     
     # Calculate grid levels
-    grid_levels = calculate_grid_levels(upper_price, lower_price, num_grids)
+    layout = build_grid_layout(upper_price, lower_price, num_grids, spacing, symbol)
+    grid_levels = layout.tolist()
     
     # Calculate amount to allocate per grid
     grid_allocation = investment_amount / (num_grids - 1)
     
     # Create grid with buy/sell orders
-    grids = []
-    for i in range(len(grid_levels) - 1):
-        buy_price = grid_levels[i]
-        sell_price = grid_levels[i + 1]
-        
-        # Calculate number of shares to buy at this level
-        shares = round(grid_allocation / buy_price, 2)
-        
-        grids.append({
-            "level": i,
-            "buy_price": buy_price,
-            "sell_price": sell_price,
-            "shares": shares,
-            "allocation": round(grid_allocation, 2),
-            "profit_potential": round((sell_price - buy_price) * shares, 2)
-        })
+    grids = None
+    if num_grids <= MAX_EXPANDED_GRIDS:
+        grids = []
+        for i in range(len(grid_levels) - 1):
+            buy_price = grid_levels[i]
+            sell_price = grid_levels[i + 1]
+            
+            # Calculate number of shares to buy at this level
+            shares = round(grid_allocation / buy_price, 2)
+            
+            grids.append({
+                "level": i,
+                "buy_price": buy_price,
+                "sell_price": sell_price,
+                "shares": shares,
+                "allocation": round(grid_allocation, 2),
+                "profit_potential": round((sell_price - buy_price) * shares, 2)
+            })
     
     # Get current price to determine initial position
-    try:
-        current_price = get_current_price(symbol)
-    except:
+    if quote is None:
+        with span("grid.quote"):
+            quote = get_quotes([symbol]).get(symbol)
+    if quote is None:
         # Use mid-price if current price cannot be fetched
-        current_price = (upper_price + lower_price) / 2
+        quote = {"price": (upper_price + lower_price) / 2, "source": "fallback"}
+    current_price = quote["price"]
     
     # Calculate initial position
     initial_position = calculate_initial_position(current_price, grid_levels, investment_amount)
@@ -91,10 +135,14 @@ def create_grid_strategy(params):
         "num_grids": num_grids,
         "investment_amount": investment_amount,
         "grid_levels": grid_levels,
-        "grids": grids,
+        "grid_layout": layout.to_document(),
         "initial_position": initial_position,
+        "initial_price": current_price,
+        "price_source": quote["source"],
         "created_at": datetime.now().isoformat()
     }
+    if grids is not None:
+        strategy["grids"] = grids
     
     return strategy
 
@@ -111,11 +159,7 @@ def calculate_initial_position(current_price, grid_levels, investment_amount):
     - Initial position dict
     """
     # Find which grid level the current price falls into
-    current_grid = None
-    for i in range(len(grid_levels) - 1):
-        if grid_levels[i] <= current_price <= grid_levels[i + 1]:
-            current_grid = i
-            break
+    current_grid = GridLayout(grid_levels).find_grid(current_price)
     
     # If current price is outside the grid range, use the closest grid
     if current_grid is None:
@@ -144,6 +188,57 @@ def calculate_initial_position(current_price, grid_levels, investment_amount):
         "shares": initial_shares
     }
 
+def orders_between_grids(strategy, previous_grid, current_grid):
+    """
+    Generate the orders for every grid level crossed between two grids
+    
+    Parameters:
+    - strategy: Grid strategy dict
+    - previous_grid: Grid index before the price move
+    - current_grid: Grid index after the price move
+    
+    Returns:
+    - List of orders in the order the levels were crossed
+    """
+    grid_levels = strategy["grid_levels"]
+    
+    # Price moved up: sell at each level passed on the way
+    if current_grid > previous_grid:
+        return [{
+            "type": "sell",
+            "price": grid_levels[level],
+            "grid_level": level,
+            "shares": grid_shares(strategy, level - 1)
+        } for level in range(previous_grid + 1, current_grid + 1)]
+    
+    # Price moved down: buy at each level passed on the way
+    if current_grid < previous_grid:
+        return [{
+            "type": "buy",
+            "price": grid_levels[level],
+            "grid_level": level,
+            "shares": grid_shares(strategy, level)
+        } for level in range(previous_grid - 1, current_grid - 1, -1)]
+    
+    return []
+
+def grid_shares(strategy, grid):
+    """
+    Shares traded at one grid of a strategy
+    
+    Parameters:
+    - strategy: Grid strategy dict
+    - grid: Grid index
+    
+    Returns:
+    - Share count from the strategy's grids, or derived from its levels for
+      grids stored without the per-level breakdown
+    """
+    if "grids" in strategy:
+        return strategy["grids"][grid]["shares"]
+    grid_allocation = strategy["investment_amount"] / (len(strategy["grid_levels"]) - 1)
+    return round(grid_allocation / strategy["grid_levels"][grid], 2)
+
 def generate_grid_orders(strategy, current_price):
     """
     Generate buy/sell orders based on current price and strategy
@@ -153,16 +248,11 @@ def generate_grid_orders(strategy, current_price):
     - current_price: Current stock price
     
     Returns:
-    - List of orders to execute
+    - List of orders to execute, one for each grid level crossed since
+      strategy["current_grid"]
     """
-    grid_levels = strategy["grid_levels"]
-    current_grid = None
-    
     # Find which grid level the current price falls into
-    for i in range(len(grid_levels) - 1):
-        if grid_levels[i] <= current_price <= grid_levels[i + 1]:
-            current_grid = i
-            break
+    current_grid = GridLayout.from_strategy(strategy).find_grid(current_price)
     
     # If current price is outside the grid range, no orders
     if current_grid is None:
@@ -171,23 +261,4 @@ def generate_grid_orders(strategy, current_price):
     # Get previous grid from strategy
     previous_grid = strategy.get("current_grid", current_grid)
     
-    # If price moved up, generate sell orders
-    if current_grid > previous_grid:
-        return [{
-            "type": "sell",
-            "price": grid_levels[current_grid],
-            "grid_level": current_grid,
-            "shares": strategy["grids"][current_grid - 1]["shares"]
-        }]
-    
-    # If price moved down, generate buy orders
-    elif current_grid < previous_grid:
-        return [{
-            "type": "buy",
-            "price": grid_levels[current_grid],
-            "grid_level": current_grid,
-            "shares": strategy["grids"][current_grid]["shares"]
-        }]
-    
-    # No grid change, no orders
-    return []
+    return orders_between_grids(strategy, previous_grid, current_grid)
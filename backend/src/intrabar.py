@@ -0,0 +1,235 @@
+from bisect import bisect_left, bisect_right
+import numpy as np
+from src.metrics import PerformanceAccumulator
+from src.lazy import lazy_import
+
+pd = lazy_import("pandas")
+
+NANOS_PER_DAY = 86400 * 10**9
+
+# Bars simulated between calls to a progress callback
+PROGRESS_INTERVAL = 10000
+
+def iter_bars(chunks):
+    """
+    Flatten DataFrame chunks into (timestamp_ns, open, high, low, close) tuples
+
+    Bars with a missing price are skipped.
+
+    Parameters:
+    - chunks: Iterable of DataFrames with Date, Open, High, Low and Close columns
+
+    Returns:
+    - Generator of bar tuples
+    """
+    for chunk in chunks:
+        timestamps = chunk["Date"].to_numpy(dtype="datetime64[ns]").view(np.int64)
+        columns = [chunk[name].to_numpy(dtype=np.float64) for name in ("Open", "High", "Low", "Close")]
+        valid = ~np.isnan(np.column_stack(columns)).any(axis=1)
+        for bar in zip(timestamps[valid].tolist(), *(column[valid].tolist() for column in columns)):
+            yield bar
+
+def bar_price_path(open_price, high, low, close):
+    """
+    Approximate the order in which a bar visited its prices
+
+    The price is assumed to go from the open to whichever extreme is nearer
+    first, then to the other extreme, then to the close.
+
+    Parameters:
+    - open_price: Bar open
+    - high: Bar high
+    - low: Bar low
+    - close: Bar close
+
+    Returns:
+    - Tuple of prices visited after the open
+    """
+    if open_price - low <= high - open_price:
+        return (low, high, close)
+    return (high, low, close)
+
+def iter_grid_events(bars, grid_levels, investment_amount, fill_model=None):
+    """
+    Run a grid strategy over a stream of bars, processing level crossings in order
+
+    The nearest buy level below and sell level above the current price are
+    found with bisect on every move, so each move costs O(log n) plus the
+    number of levels crossed. As in the strategy's grids, each level below the
+    top has a resting buy; once it fills, a sell for the same shares rests one
+    level up, and the buy is re-armed when that sell fills. Order sizes match
+    backtest.process_price_movements, and so do fills under a fill model
+    (a partial buy rests a sell for the shares it bought).
+
+    Each bar starts with the move from the previous close to its open, so
+    orders resting inside an overnight or intraday gap fill before the
+    bar's own path is walked.
+
+    Parameters:
+    - bars: Iterable of (timestamp_ns, open, high, low, close) tuples
+    - grid_levels: Grid price levels, sorted ascending
+    - investment_amount: Total investment amount (initial cash)
+    - fill_model: Optional FillModel applied to every order
+
+    Returns:
+    - Generator of ("trade", trade dict) and ("bar", (timestamp_ns, close, cash, shares)) events
+    """
+    levels = [float(level) for level in grid_levels]
+    num_levels = len(levels)
+    grid_allocation = investment_amount / (num_levels - 1)
+    cash = investment_amount
+    shares = 0
+    # Shares bought at each level and waiting to be sold one level up
+    holdings = [0.0] * num_levels
+    # Last price walked to; the first bar starts at its open
+    price = None
+
+    for timestamp, open_price, high, low, close in bars:
+        if fill_model is not None:
+            slippage = fill_model.slippage(high, low)
+        path = bar_price_path(open_price, high, low, close)
+        if price is None:
+            price = open_price
+        else:
+            path = (open_price,) + path
+        for target in path:
+            if target < price:
+                # Walk down through every level in [target, price)
+                level = bisect_left(levels, price) - 1
+                while level >= 0 and levels[level] >= target:
+                    if level < num_levels - 1 and holdings[level] == 0:
+                        grid_price = levels[level]
+                        shares_to_buy = grid_allocation / grid_price
+                        if fill_model is None:
+                            fill_price, fee = grid_price, None
+                            cost = shares_to_buy * grid_price
+                        else:
+                            fill_price = fill_model.fill_price(grid_price, slippage, "buy")
+                            cost = fill_model.buy_cost(shares_to_buy, grid_price, slippage)
+                            # Buy what the cash covers when partial fills are allowed
+                            if cost > cash and fill_model.partial_fills and cash > 0:
+                                shares_to_buy = fill_model.affordable_shares(cash, grid_price, slippage)
+                                cost = cash
+                            fee = fill_model.fee(shares_to_buy, fill_price)
+                        if cost <= cash:
+                            cash -= cost
+                            shares += shares_to_buy
+                            holdings[level] = shares_to_buy
+                            yield "trade", _trade(timestamp, "buy", fill_price, shares_to_buy, cost, level, fee)
+                    level -= 1
+            elif target > price:
+                # Walk up through every level in (price, target]
+                level = bisect_right(levels, price)
+                while level < num_levels and levels[level] <= target:
+                    if level > 0 and holdings[level - 1] > 0:
+                        grid_price = levels[level]
+                        shares_to_sell = holdings[level - 1]
+                        if fill_model is None:
+                            fill_price, fee = grid_price, None
+                            sell_amount = shares_to_sell * grid_price
+                        else:
+                            fill_price = fill_model.fill_price(grid_price, slippage, "sell")
+                            fee = fill_model.fee(shares_to_sell, fill_price)
+                            sell_amount = fill_model.sell_proceeds(shares_to_sell, grid_price, slippage)
+                        cash += sell_amount
+                        shares -= shares_to_sell
+                        holdings[level - 1] = 0.0
+                        yield "trade", _trade(timestamp, "sell", fill_price, shares_to_sell, sell_amount, level, fee)
+                    level += 1
+            price = target
+
+        yield "bar", (timestamp, close, cash, shares)
+
+def simulate_intrabar(bars, grid_levels, investment_amount, progress=None, fill_model=None):
+    """
+    Simulate a grid strategy over intraday bars, keeping one value per day
+
+    Memory use does not depend on the number of bars: the bars are consumed
+    as a stream and only trades and end-of-day values are kept.
+
+    Parameters:
+    - bars: Iterable of (timestamp_ns, open, high, low, close) tuples
+    - grid_levels: Grid price levels, sorted ascending
+    - investment_amount: Total investment amount
+    - progress: Optional callable progress(bars_done, None)
+    - fill_model: Optional FillModel applied to every order
+
+    Returns:
+    - Portfolio dict with trades, daily values and the number of bars processed
+    """
+    portfolio = {
+        "investment_amount": investment_amount,
+        "cash": investment_amount,
+        "shares": 0,
+        "trades": [],
+        "daily_values": [],
+        "bars": 0,
+        "accumulator": PerformanceAccumulator(investment_amount)
+    }
+    accumulator = portfolio["accumulator"]
+
+    last_bar = None
+    for kind, event in iter_grid_events(bars, grid_levels, investment_amount, fill_model):
+        if kind == "trade":
+            portfolio["trades"].append(event)
+            accumulator.add_trade(event)
+            continue
+
+        portfolio["bars"] += 1
+        if progress is not None and portfolio["bars"] % PROGRESS_INTERVAL == 0:
+            progress(portfolio["bars"], None)
+        if last_bar is not None and event[0] // NANOS_PER_DAY != last_bar[0] // NANOS_PER_DAY:
+            portfolio["daily_values"].append(_daily_value(last_bar))
+            accumulator.add_value(portfolio["daily_values"][-1]["value"])
+        last_bar = event
+
+    if progress is not None:
+        progress(portfolio["bars"], None)
+
+    if last_bar is not None:
+        portfolio["daily_values"].append(_daily_value(last_bar))
+        accumulator.add_value(portfolio["daily_values"][-1]["value"])
+        portfolio["cash"] = last_bar[2]
+        portfolio["shares"] = last_bar[3]
+
+    return portfolio
+
+def intraday_end(end_date):
+    """
+    Extend a date-only end date to the end of that day
+
+    Parameters:
+    - end_date: End date (YYYY-MM-DD) or timestamp string
+
+    Returns:
+    - Timestamp of the last nanosecond to include
+    """
+    end = pd.Timestamp(end_date)
+    if end == end.normalize() and len(str(end_date)) <= 10:
+        return end + pd.Timedelta(days=1) - pd.Timedelta(1, unit="ns")
+    return end
+
+def _trade(timestamp, trade_type, price, shares, amount, level, fee=None):
+    moment = pd.Timestamp(timestamp)
+    trade = {
+        "date": moment.strftime('%Y-%m-%d'),
+        "time": moment.strftime('%H:%M:%S'),
+        "type": trade_type,
+        "price": price,
+        "shares": shares,
+        "amount": amount,
+        "grid_level": level
+    }
+    if fee is not None:
+        trade["fee"] = fee
+    return trade
+
+def _daily_value(bar):
+    timestamp, close, cash, shares = bar
+    return {
+        "date": pd.Timestamp(timestamp).strftime('%Y-%m-%d'),
+        "close": close,
+        "cash": cash,
+        "shares": shares,
+        "value": cash + shares * close
+    }
@@ -0,0 +1,363 @@
+import hashlib
+import json
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pymongo.errors import DuplicateKeyError
+from src.backtest import run_backtest
+from src.database import ensure_indexes
+from src.result_store import save_backtest_result
+
+# Job states
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+# Finished jobs kept in memory before the oldest are forgotten
+MAX_FINISHED_JOBS = 1000
+
+# Seconds between heartbeats of a process's queued and running jobs, which
+# write their progress to db.backtest_jobs and pick up cancellations
+# requested through another process
+JOB_SYNC_INTERVAL = 1.0
+
+# Seconds without a heartbeat after which a queued or running job is
+# treated as failed (the process owning it was killed or recycled)
+JOB_HEARTBEAT_TIMEOUT = 30.0
+
+# Error recorded for a job whose owning process stopped sending heartbeats
+STALE_JOB_ERROR = "Job was abandoned by the server process running it"
+
+# Job fields mirrored to db.backtest_jobs
+STORED_JOB_FIELDS = ("key", "status", "strategy_id", "start_date", "end_date", "engine", "bars_done",
+                     "bars_total", "backtest_id", "error", "created_at", "finished_at", "owner", "updated_at")
+
+logger = logging.getLogger(__name__)
+
+class JobCancelled(Exception):
+    """Raised inside a running backtest when its job is cancelled"""
+
+def backtest_job_key(strategy, start_date, end_date, engine, interval, fill_model=None):
+    """
+    Hash the inputs that determine a backtest's result
+
+    Parameters:
+    - strategy: Grid strategy dict
+    - start_date: Start date for backtest (YYYY-MM-DD)
+    - end_date: End date for backtest (YYYY-MM-DD)
+    - engine: Simulation engine
+    - interval: Bar interval (only used by the intrabar engine)
+    - fill_model: FillModel the backtest applies, or None
+
+    Returns:
+    - Hex digest identifying the backtest
+    """
+    payload = {
+        "strategy_id": str(strategy.get("_id")),
+        "symbol": strategy["symbol"],
+        "investment_amount": strategy["investment_amount"],
+        "grid_levels": [float(level) for level in strategy["grid_levels"]],
+        "start_date": start_date,
+        "end_date": end_date,
+        "engine": engine,
+        "interval": interval if engine == "intrabar" else None
+    }
+    if fill_model is not None:
+        payload["fill_model"] = fill_model.to_dict()
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+class JobQueue:
+    """
+    In-process queue running backtests on a pool of worker threads
+
+    Each job reports progress as bars simulated out of the total, can be
+    cancelled while queued or running, and stores its result with
+    save_backtest_result when it finishes. Submitting a backtest identical to
+    one that is queued, running or done returns the existing job.
+
+    Job state is mirrored to db.backtest_jobs, so when the app runs in
+    several server processes any of them can report a job's status, cancel
+    it (the owning process picks the request up at its next heartbeat) and
+    reuse a queued, running or finished job. Each stored job names its
+    owning process and the time of its last heartbeat (updated_at); a
+    queued or running job whose heartbeat is older than
+    JOB_HEARTBEAT_TIMEOUT belonged to a process that died, and is marked
+    failed by the next process that looks it up. While a job is queued or
+    running its document also holds its key in active_key, which has a
+    unique index, so the same backtest submitted to two processes at once
+    runs only once.
+    """
+
+    def __init__(self, db, max_workers=2):
+        """
+        Parameters:
+        - db: MongoDB database results are saved to
+        - max_workers: Number of backtests run at the same time
+        """
+        self.db = db
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="backtest-job")
+        self._jobs = OrderedDict()
+        self._by_key = {}
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._heartbeat = None
+        self._indexed = False
+
+    def submit(self, strategy, start_date, end_date, engine="loop", interval="1m", fill_model=None):
+        """
+        Queue a backtest, or return the matching job if one already exists
+
+        Parameters:
+        - strategy: Grid strategy dict
+        - start_date: Start date for backtest (YYYY-MM-DD)
+        - end_date: End date for backtest (YYYY-MM-DD)
+        - engine: Simulation engine passed to run_backtest
+        - interval: Bar interval for the intrabar engine
+        - fill_model: FillModel passed to run_backtest
+
+        Returns:
+        - Tuple of (job status dict, whether an existing job was reused)
+        """
+        key = backtest_job_key(strategy, start_date, end_date, engine, interval, fill_model)
+
+        with self._lock:
+            existing = self._jobs.get(self._by_key.get(key))
+            if existing is not None and existing["status"] in (QUEUED, RUNNING, DONE):
+                return self._public(existing), True
+
+        # Database round-trips are made without the lock, so other requests
+        # and the heartbeat are not held up by them; the unique active_key
+        # keeps concurrent submissions (in this process or another) to one job
+        stored = self._find_shared(key)
+        if stored is not None:
+            return self._public(_from_document(stored)), True
+
+        if not self._indexed:
+            # Unique active_key, created on first submit so building the
+            # queue does not connect to the database
+            ensure_indexes(self.db, ["backtest_jobs"])
+            self._indexed = True
+
+        job = {
+            "job_id": uuid.uuid4().hex,
+            "key": key,
+            "status": QUEUED,
+            "strategy_id": str(strategy.get("_id")),
+            "start_date": start_date,
+            "end_date": end_date,
+            "engine": engine,
+            "bars_done": 0,
+            "bars_total": None,
+            "backtest_id": None,
+            "error": None,
+            "created_at": datetime.now().isoformat(),
+            "finished_at": None,
+            "owner": _owner(),
+            "updated_at": time.time(),
+            "cancel_event": threading.Event()
+        }
+        document = _to_document(job)
+        document["active_key"] = key
+        try:
+            self.db.backtest_jobs.insert_one(document)
+        except DuplicateKeyError:
+            # The same backtest was submitted at the same time
+            stored = self._find_shared(key)
+            if stored is not None:
+                return self._public(_from_document(stored)), True
+            raise
+
+        with self._lock:
+            self._jobs[job["job_id"]] = job
+            self._by_key[key] = job["job_id"]
+            self._start_heartbeat()
+            job["future"] = self._executor.submit(
+                self._run, job, strategy, start_date, end_date, engine, interval, fill_model
+            )
+            return self._public(job), False
+
+    def get(self, job_id):
+        """
+        Get a job's status and progress
+
+        Parameters:
+        - job_id: Job id
+
+        Returns:
+        - Job status dict, or None if unknown
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                return self._public(job)
+
+        self._expire_stale({"_id": job_id})
+        stored = self.db.backtest_jobs.find_one({"_id": job_id})
+        return self._public(_from_document(stored)) if stored is not None else None
+
+    def cancel(self, job_id):
+        """
+        Cancel a queued or running job
+
+        Parameters:
+        - job_id: Job id
+
+        Returns:
+        - Job status dict after the request, or None if unknown
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                if job["status"] in (QUEUED, RUNNING):
+                    job["cancel_event"].set()
+                    if job["future"].cancel():
+                        self._finish(job, CANCELLED)
+                return self._public(job)
+
+        # A job owned by another process stops at its next heartbeat
+        self._expire_stale({"_id": job_id})
+        self.db.backtest_jobs.update_one(
+            {"_id": job_id, "status": {"$in": [QUEUED, RUNNING]}},
+            {"$set": {"cancel_requested": True}}
+        )
+        stored = self.db.backtest_jobs.find_one({"_id": job_id})
+        return self._public(_from_document(stored)) if stored is not None else None
+
+    def shutdown(self, wait=True):
+        """Cancel queued and running jobs and stop the worker threads"""
+        self._stopped.set()
+        with self._lock:
+            for job in list(self._jobs.values()):
+                if job["status"] in (QUEUED, RUNNING):
+                    job["cancel_event"].set()
+                    if job["future"].cancel():
+                        self._finish(job, CANCELLED)
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+
+    def _run(self, job, strategy, start_date, end_date, engine, interval, fill_model):
+        with self._lock:
+            if job["cancel_event"].is_set():
+                self._finish(job, CANCELLED)
+                return
+            job["status"] = RUNNING
+
+        # Progress is written by the heartbeat thread
+        def progress(bars_done, bars_total):
+            if job["cancel_event"].is_set():
+                raise JobCancelled()
+            job["bars_done"] = bars_done
+            job["bars_total"] = bars_total
+
+        try:
+            # A failed write fails the job instead of leaving it running
+            self._sync(job)
+            result = run_backtest(strategy, start_date, end_date, engine=engine,
+                                  interval=interval, progress=progress, fill_model=fill_model)
+            result["strategy_id"] = str(strategy.get("_id"))
+            backtest_id = save_backtest_result(self.db, result)
+            with self._lock:
+                job["backtest_id"] = str(backtest_id)
+                self._finish(job, DONE)
+        except JobCancelled:
+            with self._lock:
+                self._finish(job, CANCELLED)
+        except Exception as e:
+            with self._lock:
+                job["error"] = str(e)
+                self._finish(job, FAILED)
+
+    def _sync(self, job):
+        # Write progress and the heartbeat, and pick up a cancellation
+        # requested elsewhere (or the job being expired by another process)
+        job["updated_at"] = time.time()
+        stored = self.db.backtest_jobs.find_one_and_update(
+            {"_id": job["job_id"], "status": {"$in": [QUEUED, RUNNING]}},
+            {"$set": {"status": job["status"], "bars_done": job["bars_done"], "bars_total": job["bars_total"],
+                      "owner": job["owner"], "updated_at": job["updated_at"]}},
+            projection={"cancel_requested": 1}
+        )
+        if stored is None or stored.get("cancel_requested"):
+            job["cancel_event"].set()
+            with self._lock:
+                if job["status"] == QUEUED and job["future"].cancel():
+                    self._finish(job, CANCELLED)
+
+    def _start_heartbeat(self):
+        # Threads do not survive a fork, so each server process starts its own
+        if self._heartbeat is None or not self._heartbeat.is_alive():
+            self._heartbeat = threading.Thread(target=self._beat, name="backtest-job-heartbeat", daemon=True)
+            self._heartbeat.start()
+
+    def _beat(self):
+        while not self._stopped.wait(JOB_SYNC_INTERVAL):
+            with self._lock:
+                active = [job for job in self._jobs.values() if job["status"] in (QUEUED, RUNNING)]
+            for job in active:
+                try:
+                    self._sync(job)
+                except Exception:
+                    # MongoDB unavailable: keep running, the next beat retries
+                    logger.exception("Heartbeat of backtest job %s failed", job["job_id"])
+
+    def _find_shared(self, key):
+        # Newest stored job with this key that is done, or queued or running
+        # in a live process
+        self._expire_stale({"key": key})
+        return self.db.backtest_jobs.find_one(
+            {"key": key, "status": {"$in": [QUEUED, RUNNING, DONE]}}, sort=[("created_at", -1)]
+        )
+
+    def _expire_stale(self, query):
+        # Mark the matching queued or running jobs without a recent heartbeat
+        # (or stored before heartbeats were recorded) as failed
+        cutoff = time.time() - JOB_HEARTBEAT_TIMEOUT
+        self.db.backtest_jobs.update_many(
+            dict(query, status={"$in": [QUEUED, RUNNING]}, updated_at={"$not": {"$gte": cutoff}}),
+            {"$set": {"status": FAILED, "error": STALE_JOB_ERROR, "finished_at": datetime.now().isoformat()},
+             "$unset": {"active_key": ""}}
+        )
+
+    def _finish(self, job, status):
+        job["status"] = status
+        job["finished_at"] = datetime.now().isoformat()
+        self.db.backtest_jobs.update_one({"_id": job["job_id"]},
+                                         {"$set": _to_document(job), "$unset": {"active_key": ""}})
+
+        # Forget the oldest finished jobs beyond the retention limit
+        finished = [job_id for job_id, other in self._jobs.items()
+                    if other["status"] in (DONE, FAILED, CANCELLED)]
+        for job_id in finished[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+            forgotten = self._jobs.pop(job_id)
+            if self._by_key.get(forgotten["key"]) == job_id:
+                del self._by_key[forgotten["key"]]
+
+    def _public(self, job):
+        public = {key: value for key, value in job.items()
+                  if key not in ("cancel_event", "future", "key", "owner", "updated_at")}
+        if job["bars_total"]:
+            public["progress"] = job["bars_done"] / job["bars_total"]
+        else:
+            public["progress"] = 1.0 if job["status"] == DONE else None
+        return public
+
+def _to_document(job):
+    document = {field: job[field] for field in STORED_JOB_FIELDS}
+    document["_id"] = job["job_id"]
+    return document
+
+def _owner():
+    # Host and process id of the server process owning a job
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+def _from_document(document):
+    job = {field: document.get(field) for field in STORED_JOB_FIELDS}
+    job["job_id"] = document["_id"]
+    return job
@@ -0,0 +1,52 @@
+import importlib.util
+import sys
+import threading
+
+# Serializes the registration of lazily imported modules
+_lock = threading.Lock()
+
+def lazy_import(name):
+    """
+    Import a module the first time one of its attributes is used
+
+    Modules already imported are returned as they are. Otherwise the module
+    is registered in sys.modules through importlib.util.LazyLoader, which
+    runs its code on the first attribute access. A missing module still
+    raises ImportError here. Before Python 3.12 that first access is not
+    thread-safe, so servers load these modules with preload before starting
+    threads.
+
+    Parameters:
+    - name: Absolute module name (e.g., 'pandas')
+
+    Returns:
+    - Module object
+    """
+    with _lock:
+        module = sys.modules.get(name)
+        if module is not None:
+            return module
+
+        spec = importlib.util.find_spec(name)
+        if spec is None:
+            raise ModuleNotFoundError(f"No module named '{name}'", name=name)
+        loader = importlib.util.LazyLoader(spec.loader)
+        spec.loader = loader
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[name] = module
+        loader.exec_module(module)
+        return module
+
+def preload(*names):
+    """
+    Run the code of lazily imported modules now
+
+    Used before forking server workers so they share the loaded modules
+    instead of each paying the import on its first request.
+
+    Parameters:
+    - names: Absolute module names
+    """
+    for name in names:
+        # Any attribute access runs the code of a lazily loaded module
+        getattr(lazy_import(name), "__name__")
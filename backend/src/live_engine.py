@@ -0,0 +1,352 @@
+import asyncio
+import csv
+import logging
+import time
+from datetime import datetime
+from bson.objectid import ObjectId
+from pymongo import UpdateOne
+from src.data_fetcher import get_quotes
+from src.database import bulk_insert
+from src.grid_layout import GridLayout
+from src.grid_trading import orders_between_grids
+from src.metrics import PerformanceAccumulator
+from src.quotes import QuoteProviderError
+
+# Trades buffered before they are written to db.trades
+DEFAULT_BATCH_SIZE = 500
+
+# Seconds between flushes of a partially filled batch
+DEFAULT_FLUSH_INTERVAL = 1.0
+
+# Orders waiting to be written before the engine applies backpressure
+MAX_PENDING_ORDERS = 100000
+
+# Attempts to write a batch of trades before it is dropped
+MAX_FLUSH_ATTEMPTS = 3
+
+# Seconds before retrying a failed batch write; each further retry waits twice as long
+FLUSH_RETRY_DELAY = 0.5
+
+logger = logging.getLogger(__name__)
+
+class ReplayPriceSource:
+    """
+    Price source replaying ticks from a CSV file with timestamp, symbol and price columns
+
+    Ticks are emitted as fast as they can be consumed, or paced by their
+    timestamps when a speed multiplier is given.
+    """
+
+    def __init__(self, path, speed=None):
+        """
+        Parameters:
+        - path: CSV file with a header row (timestamp, symbol, price)
+        - speed: Replay speed relative to real time (None for no pacing)
+        """
+        self.path = path
+        self.speed = speed
+
+    async def ticks(self, symbols):
+        """
+        Yield (symbol, timestamp, price) ticks for the given symbols
+
+        Parameters:
+        - symbols: Set of symbols to emit ticks for
+        """
+        previous = None
+        with open(self.path, newline="") as f:
+            for row in csv.DictReader(f):
+                if row["symbol"] not in symbols:
+                    continue
+                timestamp = datetime.fromisoformat(row["timestamp"])
+                if self.speed and previous is not None:
+                    delay = (timestamp - previous).total_seconds() / self.speed
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+                previous = timestamp
+                yield row["symbol"], timestamp, float(row["price"])
+                # Let other tasks (the trade writer) run between ticks
+                await asyncio.sleep(0)
+
+class PollingPriceSource:
+    """Price source polling quotes for all symbols in one batch at a fixed interval"""
+
+    def __init__(self, poll_interval=5.0):
+        """
+        Parameters:
+        - poll_interval: Seconds between polls
+        """
+        self.poll_interval = poll_interval
+
+    async def ticks(self, symbols):
+        """
+        Yield (symbol, timestamp, price) ticks for the given symbols
+
+        Parameters:
+        - symbols: Set of symbols to emit ticks for
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                quotes = await loop.run_in_executor(None, get_quotes, sorted(symbols))
+            except QuoteProviderError as e:
+                # The provider is down; try again at the next poll
+                logger.warning("Skipping poll: %s", e)
+                quotes = {}
+            for symbol, quote in quotes.items():
+                yield symbol, datetime.now(), quote["price"]
+            await asyncio.sleep(self.poll_interval)
+
+class LiveGridEngine:
+    """
+    Runs grid strategies against a streaming price source
+
+    Each strategy's current grid is kept in memory and looked up in its
+    GridLayout on every tick (a binary search over its levels), plus one
+    order per level crossed. Each strategy's cash and shares are tracked
+    from its orders: as in backtests, buys the cash cannot cover are
+    skipped and sells are capped at the shares held. Performance metrics
+    are updated with one value per trading day. Orders
+    are queued and written to db.trades in batches by a separate task,
+    together with the strategies' new current_grid, so database latency
+    never delays tick processing.
+    """
+
+    def __init__(self, db, source, strategies, batch_size=DEFAULT_BATCH_SIZE,
+                 flush_interval=DEFAULT_FLUSH_INTERVAL):
+        """
+        Parameters:
+        - db: MongoDB database
+        - source: Price source with an async ticks(symbols) generator
+        - strategies: List of grid strategy dicts (each with an _id)
+        - batch_size: Trades per insert_many
+        - flush_interval: Seconds before a partial batch is written
+        """
+        self.db = db
+        self.source = source
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.states = {}
+        self.by_symbol = {}
+        self.stats = {"ticks": 0, "orders": 0, "orders_skipped": 0, "trades_written": 0, "trades_dropped": 0,
+                      "max_latency_ms": 0.0, "total_latency_ms": 0.0}
+        self._orders = None
+        for strategy in strategies:
+            self.add_strategy(strategy)
+
+    def add_strategy(self, strategy):
+        """
+        Start running a strategy
+
+        Parameters:
+        - strategy: Grid strategy dict (with an _id)
+        """
+        strategy_id = str(strategy["_id"])
+        current_grid = strategy.get("current_grid")
+        if current_grid is None:
+            current_grid = strategy.get("initial_position", {}).get("current_grid")
+
+        initial_position = strategy.get("initial_position", {})
+        self.states[strategy_id] = {
+            "strategy": strategy,
+            "current_grid": current_grid,
+            "layout": GridLayout.from_strategy(strategy),
+            "cash": initial_position.get("cash_allocation", strategy["investment_amount"]),
+            "shares": initial_position.get("shares", 0),
+            "last_price": None,
+            "day": None,
+            "accumulator": PerformanceAccumulator(strategy["investment_amount"])
+        }
+        self.by_symbol.setdefault(strategy["symbol"], []).append(strategy_id)
+
+    def remove_strategy(self, strategy_id):
+        """
+        Stop running a strategy
+
+        Parameters:
+        - strategy_id: Strategy id string
+        """
+        state = self.states.pop(strategy_id, None)
+        if state is not None:
+            self.by_symbol[state["strategy"]["symbol"]].remove(strategy_id)
+
+    def on_tick(self, symbol, timestamp, price):
+        """
+        Process one price tick for every strategy on the symbol
+
+        Parameters:
+        - symbol: Stock symbol
+        - timestamp: Tick time
+        - price: Tick price
+
+        Returns:
+        - List of order dicts for every grid level crossed
+        """
+        received = time.perf_counter()
+        orders = []
+
+        for strategy_id in self.by_symbol.get(symbol, ()):
+            state = self.states[strategy_id]
+            strategy = state["strategy"]
+
+            # The first tick of a new day closes the previous day's value
+            day = timestamp.date()
+            if state["day"] is not None and day != state["day"]:
+                state["accumulator"].add_value(state["cash"] + state["shares"] * state["last_price"])
+            state["day"] = day
+            state["last_price"] = price
+
+            current_grid = state["layout"].find_grid(price)
+            if current_grid is None:
+                continue
+
+            previous_grid = state["current_grid"]
+            state["current_grid"] = current_grid
+            if previous_grid is None or previous_grid == current_grid:
+                continue
+
+            for order in orders_between_grids(strategy, previous_grid, current_grid):
+                if order["type"] == "sell":
+                    order["shares"] = min(order["shares"], state["shares"])
+                amount = float(order["price"] * order["shares"])
+                if order["shares"] <= 0 or (order["type"] == "buy" and amount > state["cash"]):
+                    self.stats["orders_skipped"] += 1
+                    continue
+
+                order.update({
+                    "strategy_id": strategy_id,
+                    "symbol": symbol,
+                    "tick_price": price,
+                    "timestamp": timestamp,
+                    "date": timestamp.strftime('%Y-%m-%d'),
+                    "current_grid": current_grid,
+                    "amount": amount
+                })
+                if order["type"] == "buy":
+                    state["cash"] -= amount
+                    state["shares"] += order["shares"]
+                else:
+                    state["cash"] += amount
+                    state["shares"] -= order["shares"]
+                state["accumulator"].add_trade(order)
+                orders.append(order)
+
+        latency_ms = (time.perf_counter() - received) * 1000
+        self.stats["ticks"] += 1
+        self.stats["orders"] += len(orders)
+        self.stats["total_latency_ms"] += latency_ms
+        self.stats["max_latency_ms"] = max(self.stats["max_latency_ms"], latency_ms)
+        return orders
+
+    def metrics(self, strategy_id):
+        """
+        Current performance metrics of a strategy, including the day in progress
+
+        Parameters:
+        - strategy_id: Strategy id string
+
+        Returns:
+        - Dict with the same metrics as calculate_performance_metrics, or
+          None before the strategy's first tick
+        """
+        state = self.states[strategy_id]
+        if state["last_price"] is None:
+            return None
+        return state["accumulator"].snapshot(state["cash"] + state["shares"] * state["last_price"])
+
+    async def run(self):
+        """Consume the price source until it ends, writing orders as trades"""
+        self._orders = asyncio.Queue(maxsize=MAX_PENDING_ORDERS)
+        writer = asyncio.create_task(self._write_trades())
+        try:
+            async for symbol, timestamp, price in self.source.ticks(set(self.by_symbol)):
+                for order in self.on_tick(symbol, timestamp, price):
+                    await self._orders.put(order)
+        finally:
+            await self._orders.put(None)
+            await writer
+
+    async def _write_trades(self):
+        loop = asyncio.get_running_loop()
+        batch = []
+        deadline = loop.time() + self.flush_interval
+        done = False
+
+        while not done:
+            try:
+                order = await asyncio.wait_for(self._orders.get(), timeout=max(0.0, deadline - loop.time()))
+                if order is None:
+                    done = True
+                else:
+                    batch.append(order)
+            except asyncio.TimeoutError:
+                pass
+
+            if batch and (done or len(batch) >= self.batch_size or loop.time() >= deadline):
+                await self._write_batch(batch)
+                batch = []
+            if loop.time() >= deadline:
+                deadline = loop.time() + self.flush_interval
+
+    async def _write_batch(self, batch):
+        # A failed write is retried, then the batch is dropped, so the writer
+        # keeps draining the queue and never stalls the tick loop
+        loop = asyncio.get_running_loop()
+        for attempt in range(1, MAX_FLUSH_ATTEMPTS + 1):
+            try:
+                # pymongo blocks, so write from a worker thread
+                await loop.run_in_executor(None, self._flush, batch)
+                return
+            except Exception:
+                logger.exception("Writing %d trades failed (attempt %d of %d)", len(batch), attempt,
+                                 MAX_FLUSH_ATTEMPTS)
+            if attempt < MAX_FLUSH_ATTEMPTS:
+                await asyncio.sleep(FLUSH_RETRY_DELAY * 2 ** (attempt - 1))
+        self.stats["trades_dropped"] += len(batch)
+
+    def _flush(self, orders):
+        # Persist each strategy's latest grid so a restart resumes from it
+        # (built first, so an invalid strategy id fails before any write)
+        latest = {}
+        for order in orders:
+            latest[order["strategy_id"]] = order["current_grid"]
+        grid_updates = [UpdateOne({"_id": ObjectId(strategy_id)}, {"$set": {"current_grid": grid}})
+                        for strategy_id, grid in latest.items()]
+
+        now = datetime.now().isoformat()
+        for order in orders:
+            order.setdefault("created_at", now)
+        # Trades inserted by an earlier failed attempt keep their _id and are skipped
+        bulk_insert(self.db.trades, orders, batch_size=self.batch_size, ignore_duplicates=True)
+        self.db.strategies.bulk_write(grid_updates, ordered=False)
+        self.stats["trades_written"] += len(orders)
+
+def main():
+    """Run the live engine from the command line against strategies in the database"""
+    import argparse
+    from src.database import init_db
+
+    parser = argparse.ArgumentParser(description="Run grid strategies against a live or replayed price feed")
+    parser.add_argument("--replay", help="CSV file of ticks (timestamp, symbol, price) to replay")
+    parser.add_argument("--speed", type=float, help="Replay speed relative to real time")
+    parser.add_argument("--poll-interval", type=float, default=5.0, help="Seconds between live price polls")
+    parser.add_argument("--strategy", action="append", help="Strategy id to run (default: all)")
+    args = parser.parse_args()
+
+    db = init_db()
+    query = {"_id": {"$in": [ObjectId(strategy_id) for strategy_id in args.strategy]}} if args.strategy else {}
+    strategies = list(db.strategies.find(query))
+
+    if args.replay:
+        source = ReplayPriceSource(args.replay, speed=args.speed)
+    else:
+        source = PollingPriceSource(args.poll_interval)
+
+    engine = LiveGridEngine(db, source, strategies)
+    asyncio.run(engine.run())
+    print(engine.stats)
+    for strategy_id in engine.states:
+        print(strategy_id, engine.metrics(strategy_id))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+import math
+import numpy as np
+
+# Trading days per year used to annualize the Sharpe ratio
+TRADING_DAYS = 252
+
+# Calendar days per year used to annualize the total return
+CALENDAR_DAYS = 365
+
+class PerformanceAccumulator:
+    """
+    Performance metrics of a strategy, updated one bar or trade at a time
+
+    Keeps the running peak and maximum drawdown, a Welford mean and variance
+    of bar-to-bar returns for the Sharpe ratio, and trade counters and P&L,
+    so every update and every snapshot is O(1). Fed the same values and
+    trades, snapshot() gives what calculate_performance_metrics computes over
+    the whole history (the same numbers when fed with add_values, equal up
+    to floating-point rounding of the Sharpe ratio when fed bar by bar).
+    """
+
+    def __init__(self, investment_amount):
+        """
+        Parameters:
+        - investment_amount: Initial portfolio value
+        """
+        self.investment_amount = investment_amount
+        self.bars = 0
+        self.last_value = None
+        self.peak = None
+        self.max_drawdown = 0.0
+        self.returns = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.num_trades = 0
+        self.buy_trades = 0
+        self.sell_trades = 0
+        self.buy_amount = 0.0
+        self.sell_amount = 0.0
+
+    def add_value(self, value):
+        """
+        Record the portfolio value at the end of a bar
+
+        Parameters:
+        - value: Portfolio value
+        """
+        value = float(value)
+        if self.last_value is not None:
+            self._add_return(value / self.last_value - 1)
+
+        self.peak = value if self.peak is None else max(self.peak, value)
+        self.max_drawdown = max(self.max_drawdown, 1 - value / self.peak)
+        self.last_value = value
+        self.bars += 1
+
+    def add_values(self, values):
+        """
+        Record the portfolio values of several bars at once
+
+        Parameters:
+        - values: Array of portfolio values in bar order
+        """
+        values = np.asarray(values, dtype=np.float64)
+        if len(values) == 0:
+            return
+
+        if self.last_value is not None:
+            values_with_last = np.concatenate(([self.last_value], values))
+        else:
+            values_with_last = values
+        returns = values_with_last[1:] / values_with_last[:-1] - 1
+
+        # Skip undefined returns as pct_change().dropna() does
+        returns = returns[~np.isnan(returns)]
+        if len(returns) > 0:
+            mean = returns.sum() / len(returns)
+            self._merge_returns(len(returns), mean, ((mean - returns) ** 2).sum())
+
+        peaks = np.maximum.accumulate(values)
+        if self.peak is not None:
+            peaks = np.maximum(peaks, self.peak)
+        self.max_drawdown = max(self.max_drawdown, float((1 - values / peaks).max()))
+        self.peak = float(peaks[-1])
+        self.last_value = float(values[-1])
+        self.bars += len(values)
+
+    def add_trade(self, trade):
+        """
+        Record a filled trade
+
+        Parameters:
+        - trade: Trade dict with type ('buy' or 'sell') and amount
+        """
+        self.num_trades += 1
+        if trade["type"] == "buy":
+            self.buy_trades += 1
+            self.buy_amount += float(trade["amount"])
+        elif trade["type"] == "sell":
+            self.sell_trades += 1
+            self.sell_amount += float(trade["amount"])
+
+    def add_trades(self, trades):
+        """
+        Record several filled trades
+
+        Parameters:
+        - trades: Iterable of trade dicts
+        """
+        for trade in trades:
+            self.add_trade(trade)
+
+    def snapshot(self, current_value=None):
+        """
+        Compute the metrics for everything recorded so far
+
+        Parameters:
+        - current_value: Value of a bar still in progress, included in the
+          metrics without being recorded (optional)
+
+        Returns:
+        - Dict with the same metrics as calculate_performance_metrics
+        """
+        bars = self.bars
+        final_value = self.last_value
+        max_drawdown = self.max_drawdown
+        returns, mean, m2 = self.returns, self.mean, self.m2
+
+        if current_value is not None:
+            current_value = float(current_value)
+            if final_value is not None:
+                returns, mean, m2 = _welford(returns, mean, m2, current_value / final_value - 1)
+            peak = current_value if self.peak is None else max(self.peak, current_value)
+            max_drawdown = max(max_drawdown, 1 - current_value / peak)
+            final_value = current_value
+            bars += 1
+
+        if final_value is None:
+            raise ValueError("No portfolio values recorded")
+
+        initial_value = self.investment_amount
+        total_return = (final_value - initial_value) / initial_value
+        annualized_return = (1 + total_return) ** (CALENDAR_DAYS / bars) - 1
+
+        # Sharpe ratio (assuming risk-free rate of 0)
+        sharpe_ratio = 0
+        if returns > 0:
+            std = math.sqrt(m2 / (returns - 1)) if returns > 1 else float("nan")
+            with np.errstate(divide="ignore", invalid="ignore"):
+                sharpe_ratio = float(np.sqrt(TRADING_DAYS) * np.float64(mean) / np.float64(std))
+
+        return {
+            "initial_value": initial_value,
+            "final_value": final_value,
+            "total_return": total_return,
+            "total_return_pct": total_return * 100,
+            "annualized_return": annualized_return,
+            "annualized_return_pct": annualized_return * 100,
+            "max_drawdown": max_drawdown,
+            "max_drawdown_pct": max_drawdown * 100,
+            "sharpe_ratio": sharpe_ratio,
+            "num_trades": self.num_trades,
+            "buy_trades": self.buy_trades,
+            "sell_trades": self.sell_trades,
+            "trade_profit": self.sell_amount - self.buy_amount
+        }
+
+    def _add_return(self, value):
+        if not math.isnan(value):
+            self.returns, self.mean, self.m2 = _welford(self.returns, self.mean, self.m2, value)
+
+    def _merge_returns(self, count, mean, m2):
+        # Chan et al. combination of two (count, mean, M2) summaries
+        if self.returns == 0:
+            self.returns, self.mean, self.m2 = count, float(mean), float(m2)
+            return
+        total = self.returns + count
+        delta = mean - self.mean
+        self.m2 = float(self.m2 + m2 + delta * delta * self.returns * count / total)
+        self.mean = float(self.mean + delta * count / total)
+        self.returns = total
+
+def _welford(count, mean, m2, value):
+    count += 1
+    delta = value - mean
+    mean += delta / count
+    m2 += delta * (value - mean)
+    return count, mean, m2
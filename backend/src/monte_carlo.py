@@ -0,0 +1,496 @@
+import math
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from src.backtest import load_backtest_data
+from src.fills import FillModel
+from src.metrics import TRADING_DAYS, CALENDAR_DAYS
+from src.sweep import pool_workers
+
+# Ways of generating synthetic price paths from a history
+PATH_METHODS = ("bootstrap", "gbm")
+
+# Consecutive historical bars per resampled block (keeps volatility clustering)
+DEFAULT_BLOCK_BARS = 20
+
+# Upper bound on paths a single run may simulate
+MAX_PATHS = 100000
+
+# Memory budget of the price and value arrays of one chunk of paths
+CHUNK_BYTES = 64 * 1024 * 1024
+
+# Longest bootstrap block as a fraction of the history, so paths are drawn
+# from many different starting bars instead of repeating the history
+MAX_BLOCK_FRACTION = 0.5
+
+# Peak bytes held per path and bar while a chunk is simulated (measured with
+# tracemalloc). Generating the paths is the peak, with eight 8-byte arrays
+# alive at once: the resampled bar indexes, returns and log closes, the
+# close, high and low paths, and two temporaries of the exp() calls. The
+# simulation (high, low, close, the two level indexes and the values) and
+# the metrics (values plus up to three temporaries) stay below it.
+BYTES_PER_PATH_BAR = 8 * 8
+
+# Quantiles reported for every metric distribution
+METRIC_QUANTILES = (0.01, 0.05, 0.25, 0.5, 0.75, 0.95, 0.99)
+
+# Per-path metrics whose distributions are reported
+DISTRIBUTION_METRICS = ("final_value", "total_return", "annualized_return", "max_drawdown",
+                        "sharpe_ratio", "num_trades", "trade_profit")
+
+# History and settings attached once per worker process by _init_worker
+_worker_state = {}
+
+def bar_shapes(high, low, close):
+    """
+    Decompose a price history into the pieces synthetic paths are built from
+
+    Parameters:
+    - high: Array of bar highs
+    - low: Array of bar lows
+    - close: Array of bar closes
+
+    Returns:
+    - Tuple of (log close-to-close returns, log high/close, log low/close)
+      arrays; the return of the first bar is 0
+    """
+    close = np.asarray(close, dtype=np.float64)
+    returns = np.zeros(len(close))
+    returns[1:] = np.log(close[1:] / close[:-1])
+    high_shape = np.log(np.asarray(high, dtype=np.float64) / close)
+    low_shape = np.log(np.asarray(low, dtype=np.float64) / close)
+    return returns, high_shape, low_shape
+
+def generate_paths(high, low, close, num_paths, rng, method="bootstrap", block_bars=DEFAULT_BLOCK_BARS):
+    """
+    Generate synthetic OHLC paths as long as a history and starting from its first bar
+
+    'bootstrap' strings together blocks of block_bars consecutive historical
+    bars (returns with their high/low excursions) drawn with replacement.
+    'gbm' draws log returns from a normal distribution with the history's
+    mean and volatility, and gives every bar the high/low excursions of a
+    randomly drawn historical bar.
+
+    Parameters:
+    - high: Array of historical bar highs
+    - low: Array of historical bar lows
+    - close: Array of historical bar closes
+    - num_paths: Number of paths
+    - rng: NumPy Generator
+    - method: 'bootstrap' or 'gbm'
+    - block_bars: Bars per bootstrap block
+
+    Returns:
+    - Tuple of (high, low, close) arrays shaped (num_paths, bars)
+    """
+    if method not in PATH_METHODS:
+        raise ValueError(f"Unknown path method: {method}")
+    returns, high_shape, low_shape = bar_shapes(high, low, close)
+    num_bars = len(returns)
+    steps = num_bars - 1
+
+    if method == "bootstrap":
+        block_bars = max(1, min(int(block_bars), steps))
+        num_blocks = -(-steps // block_bars)
+        starts = rng.integers(1, num_bars - block_bars + 1, size=(num_paths, num_blocks))
+        bars = (starts[:, :, None] + np.arange(block_bars)).reshape(num_paths, -1)[:, :steps]
+        path_returns = returns[bars]
+    else:
+        path_returns = rng.normal(returns[1:].mean(), returns[1:].std(ddof=1), size=(num_paths, steps))
+        bars = rng.integers(1, num_bars, size=(num_paths, steps))
+
+    log_close = np.empty((num_paths, num_bars))
+    log_close[:, 0] = 0
+    np.cumsum(path_returns, axis=1, out=log_close[:, 1:])
+    path_close = close[0] * np.exp(log_close)
+
+    path_high = np.empty_like(path_close)
+    path_low = np.empty_like(path_close)
+    path_high[:, 0] = high[0]
+    path_low[:, 0] = low[0]
+    path_high[:, 1:] = path_close[:, 1:] * np.exp(high_shape[bars])
+    path_low[:, 1:] = path_close[:, 1:] * np.exp(low_shape[bars])
+    return path_high, path_low, path_close
+
+def simulate_paths(high, low, close, grid_levels, investment_amount, fill_model=None):
+    """
+    Simulate a grid strategy over many price paths at once
+
+    The grid levels each bar of each path touched are found with one
+    np.searchsorted over the whole (paths, bars) array. Bars are then
+    stepped through in order with every path's cash and shares held in
+    arrays, filling the k-th touched level of all paths in one array
+    operation. Fills follow simulate_grid_vectorized's rules and arithmetic,
+    so each path ends with the values and trade totals that engine computes,
+    with or without a fill model.
+
+    Parameters:
+    - high: Array of bar highs shaped (paths, bars)
+    - low: Array of bar lows shaped (paths, bars)
+    - close: Array of bar closes shaped (paths, bars)
+    - grid_levels: Grid price levels, sorted ascending
+    - investment_amount: Total investment amount (initial cash)
+    - fill_model: Optional FillModel applied to every order
+
+    Returns:
+    - Dict with the (paths, bars) "values" array and per-path "buy_trades",
+      "sell_trades", "buy_amount" and "sell_amount" arrays
+    """
+    levels = np.ascontiguousarray(grid_levels, dtype=np.float64)
+    num_paths, num_bars = close.shape
+    num_levels = len(levels)
+
+    # Levels touched by bar t of path p are levels[lo[p, t]:hi[p, t]]
+    lo = np.searchsorted(levels, low, side="left")
+    hi = np.searchsorted(levels, high, side="right")
+
+    # Per-level order sizes, computed with the vectorized engine's arithmetic
+    level_list = levels.tolist()
+    grid_allocation = investment_amount / (num_levels - 1)
+    sell_shares = np.array([0.0] + [grid_allocation / price for price in level_list[:-1]])
+    buy_shares = np.array([grid_allocation / price for price in level_list])
+    buy_costs = np.array([shares * price for shares, price in zip(buy_shares.tolist(), level_list)])
+
+    cash = np.full(num_paths, float(investment_amount))
+    shares = np.zeros(num_paths)
+    buy_trades = np.zeros(num_paths, dtype=np.int64)
+    sell_trades = np.zeros(num_paths, dtype=np.int64)
+    buy_amount = np.zeros(num_paths)
+    sell_amount = np.zeros(num_paths)
+    values = np.empty((num_paths, num_bars))
+
+    for bar in range(num_bars):
+        first = lo[:, bar]
+        last = hi[:, bar]
+        if fill_model is not None:
+            slippage = fill_model.slippage(high[:, bar], low[:, bar])
+
+        # Sells: touched levels above the bottom one, ascending
+        sell_first = np.maximum(first, 1)
+        num_sells = last - sell_first
+        for k in range(int(num_sells.max(initial=0))):
+            level = np.minimum(sell_first + k, num_levels - 1)
+            quantity = np.minimum(sell_shares[level], shares)
+            fill = (k < num_sells) & (quantity > 0)
+            if fill_model is None:
+                amount = quantity * levels[level]
+            else:
+                amount = fill_model.sell_proceeds(quantity, levels[level], slippage)
+            cash = np.where(fill, cash + amount, cash)
+            shares = np.where(fill, shares - quantity, shares)
+            sell_amount = np.where(fill, sell_amount + amount, sell_amount)
+            sell_trades += fill
+
+        # Buys: touched levels below the top one, descending
+        buy_first = np.minimum(last, num_levels - 1) - 1
+        num_buys = buy_first - first + 1
+        for k in range(int(num_buys.max(initial=0))):
+            level = np.maximum(buy_first - k, 0)
+            cost = buy_costs[level]
+            quantity = buy_shares[level]
+            if fill_model is not None:
+                cost = fill_model.buy_cost(quantity, levels[level], slippage)
+                if fill_model.partial_fills:
+                    # Buy what the cash covers
+                    partial = (cost > cash) & (cash > 0)
+                    quantity = np.where(partial, fill_model.affordable_shares(cash, levels[level], slippage), quantity)
+                    cost = np.where(partial, cash, cost)
+            fill = (k < num_buys) & (cost <= cash)
+            cash = np.where(fill, cash - cost, cash)
+            shares = np.where(fill, shares + quantity, shares)
+            buy_amount = np.where(fill, buy_amount + cost, buy_amount)
+            buy_trades += fill
+
+        values[:, bar] = cash + shares * close[:, bar]
+
+    return {
+        "values": values,
+        "buy_trades": buy_trades,
+        "sell_trades": sell_trades,
+        "buy_amount": buy_amount,
+        "sell_amount": sell_amount
+    }
+
+def path_metrics(simulation, investment_amount):
+    """
+    Compute calculate_performance_metrics for every simulated path at once
+
+    Parameters:
+    - simulation: Dict returned by simulate_paths
+    - investment_amount: Initial portfolio value
+
+    Returns:
+    - Dict mapping each of DISTRIBUTION_METRICS to an array with one value per path
+    """
+    values = simulation["values"]
+    num_bars = values.shape[1]
+    final_value = values[:, -1]
+    total_return = (final_value - investment_amount) / investment_amount
+    max_drawdown = (1 - values / np.maximum.accumulate(values, axis=1)).max(axis=1)
+
+    # Sharpe ratio (assuming risk-free rate of 0), as PerformanceAccumulator.add_values computes it
+    returns = values[:, 1:] / values[:, :-1] - 1
+    count = returns.shape[1]
+    if count == 0:
+        sharpe_ratio = np.zeros(len(values))
+    else:
+        mean = returns.sum(axis=1) / count
+        m2 = ((mean[:, None] - returns) ** 2).sum(axis=1)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            std = np.sqrt(m2 / (count - 1)) if count > 1 else np.full(len(values), np.nan)
+            sharpe_ratio = np.sqrt(TRADING_DAYS) * mean / std
+
+    # Python's float power, as the accumulator uses (NumPy's can differ in the last bit)
+    exponent = CALENDAR_DAYS / num_bars
+    annualized_return = np.array([(1 + value) ** exponent - 1 for value in total_return.tolist()])
+
+    return {
+        "final_value": final_value,
+        "total_return": total_return,
+        "annualized_return": annualized_return,
+        "max_drawdown": max_drawdown,
+        "sharpe_ratio": sharpe_ratio,
+        "num_trades": simulation["buy_trades"] + simulation["sell_trades"],
+        "trade_profit": simulation["sell_amount"] - simulation["buy_amount"]
+    }
+
+def summarize_distribution(values):
+    """
+    Summarize the distribution of one metric over all paths
+
+    Paths where the metric is undefined (NaN, e.g. the Sharpe ratio of a
+    path that never traded) are left out and counted.
+
+    Parameters:
+    - values: Array with one value per path
+
+    Returns:
+    - Dict with mean, std, min, max, the METRIC_QUANTILES (as p1, p5, ...)
+      and the number of undefined paths
+    """
+    values = np.asarray(values, dtype=np.float64)
+    defined = values[np.isfinite(values)]
+    summary = {"undefined": int(len(values) - len(defined))}
+    if len(defined) == 0:
+        summary.update({"mean": None, "std": None, "min": None, "max": None})
+        summary.update({_quantile_key(q): None for q in METRIC_QUANTILES})
+        return summary
+
+    summary.update({
+        "mean": float(defined.mean()),
+        "std": float(defined.std(ddof=1)) if len(defined) > 1 else None,
+        "min": float(defined.min()),
+        "max": float(defined.max())
+    })
+    for q, value in zip(METRIC_QUANTILES, np.quantile(defined, METRIC_QUANTILES)):
+        summary[_quantile_key(q)] = float(value)
+    return summary
+
+def plan_chunks(num_paths, num_bars, chunk_bytes=CHUNK_BYTES):
+    """
+    Split a run into chunks of paths that fit the memory budget
+
+    Parameters:
+    - num_paths: Total number of paths
+    - num_bars: Bars per path
+    - chunk_bytes: Memory budget per chunk
+
+    Returns:
+    - List of path counts, one per chunk
+    """
+    chunk_paths = max(1, min(num_paths, chunk_bytes // (num_bars * BYTES_PER_PATH_BAR)))
+    sizes = [chunk_paths] * (num_paths // chunk_paths)
+    if num_paths % chunk_paths:
+        sizes.append(num_paths % chunk_paths)
+    return sizes
+
+def run_monte_carlo(strategy, start_date, end_date, num_paths=1000, method="bootstrap",
+                    block_bars=DEFAULT_BLOCK_BARS, seed=None, max_workers=None, backtest_data=None,
+                    fill_model=None):
+    """
+    Stress-test a grid strategy on synthetic price paths built from its history
+
+    The history is loaded once and the strategy is simulated over num_paths
+    synthetic paths of the same length, generated and simulated in chunks
+    that fit CHUNK_BYTES, in parallel worker processes. Each chunk draws its
+    paths from its own child of the seed, so a seed gives the same results
+    whatever the number of workers. Nothing is fetched after the history is
+    loaded, and a history can be passed in to run fully offline.
+
+    Parameters:
+    - strategy: Grid strategy dict
+    - start_date: Start of the history (YYYY-MM-DD)
+    - end_date: End of the history (YYYY-MM-DD)
+    - num_paths: Number of synthetic paths
+    - method: 'bootstrap' (block bootstrap of historical bars) or 'gbm'
+      (geometric Brownian motion with the historical drift and volatility)
+    - block_bars: Bars per bootstrap block (at most MAX_BLOCK_FRACTION of the bars)
+    - seed: Integer seed (a random one is drawn and returned if None)
+    - max_workers: Number of worker processes (defaults to and is capped at the CPU count, 1 runs in-process)
+    - backtest_data: Price DataFrame already loaded for the period (optional)
+    - fill_model: Optional FillModel applied to every order
+
+    Returns:
+    - Dict with the run settings, the strategy's metrics on the actual
+      history and the distribution of each metric over the paths
+    """
+    if method not in PATH_METHODS:
+        raise ValueError(f"Unknown path method: {method}")
+    num_paths = int(num_paths)
+    if not 1 <= num_paths <= MAX_PATHS:
+        raise ValueError(f"Number of paths must be between 1 and {MAX_PATHS}")
+    if seed is None:
+        seed = int(np.random.SeedSequence().entropy % 2**63)
+
+    if backtest_data is None:
+        backtest_data = load_backtest_data(strategy["symbol"], start_date, end_date)
+    prices = backtest_data[["High", "Low", "Close"]].to_numpy(dtype=np.float64)
+    prices = prices[~np.isnan(prices).any(axis=1)].T.copy()
+    if prices.shape[1] < 3:
+        raise ValueError("Monte Carlo paths need at least 3 bars of history")
+
+    max_block_bars = max(1, int((prices.shape[1] - 1) * MAX_BLOCK_FRACTION))
+    if method == "bootstrap" and not 1 <= int(block_bars) <= max_block_bars:
+        raise ValueError(f"Block bars must be between 1 and {max_block_bars} "
+                         f"for {prices.shape[1]} bars of history")
+
+    investment_amount = float(strategy["investment_amount"])
+    settings = {
+        "grid_levels": strategy["grid_levels"],
+        "investment_amount": investment_amount,
+        "method": method,
+        "block_bars": int(block_bars),
+        "fill_model": fill_model
+    }
+
+    chunk_sizes = plan_chunks(num_paths, prices.shape[1])
+    tasks = list(zip(chunk_sizes, np.random.SeedSequence(seed).spawn(len(chunk_sizes))))
+
+    max_workers = pool_workers(max_workers, len(tasks))
+    if max_workers == 1:
+        state = dict(settings, prices=prices)
+        chunks = [_simulate_chunk(task, state) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers,
+                                 initializer=_init_worker, initargs=(prices, settings)) as executor:
+            chunks = list(executor.map(_simulate_chunk, tasks))
+
+    metrics = {name: np.concatenate([chunk[name] for chunk in chunks]) for name in DISTRIBUTION_METRICS}
+    historical = path_metrics(
+        simulate_paths(prices[0:1], prices[1:2], prices[2:3], settings["grid_levels"], investment_amount,
+                       fill_model),
+        investment_amount
+    )
+
+    return {
+        "strategy": {
+            "symbol": strategy["symbol"],
+            "upper_price": strategy["upper_price"],
+            "lower_price": strategy["lower_price"],
+            "num_grids": strategy["num_grids"],
+            "investment_amount": investment_amount
+        },
+        "period": {"start_date": start_date, "end_date": end_date, "bars": prices.shape[1]},
+        "method": method,
+        "block_bars": settings["block_bars"] if method == "bootstrap" else None,
+        "num_paths": num_paths,
+        "seed": seed,
+        "chunks": len(chunk_sizes),
+        "fill_model": fill_model.to_dict() if fill_model is not None else None,
+        "historical": {name: _to_python(values[0]) for name, values in historical.items()},
+        "probability_of_loss": float(np.mean(metrics["total_return"] < 0)),
+        "distribution": {name: summarize_distribution(values) for name, values in metrics.items()}
+    }
+
+def main():
+    """Run a Monte Carlo stress test from the command line"""
+    import argparse
+    import json
+    from src.grid_trading import calculate_grid_levels
+
+    parser = argparse.ArgumentParser(description="Stress-test a grid strategy on synthetic price paths")
+    parser.add_argument("--symbol", required=True, help="Stock symbol")
+    parser.add_argument("--upper", type=float, required=True, help="Upper price of the grid")
+    parser.add_argument("--lower", type=float, required=True, help="Lower price of the grid")
+    parser.add_argument("--num-grids", type=int, required=True, help="Number of grid levels")
+    parser.add_argument("--investment", type=float, default=10000, help="Investment amount")
+    parser.add_argument("--start", required=True, help="Start of the history (YYYY-MM-DD)")
+    parser.add_argument("--end", required=True, help="End of the history (YYYY-MM-DD)")
+    parser.add_argument("--csv", help="Daily bars (Date, High, Low, Close) to use instead of the price store")
+    parser.add_argument("--paths", type=int, default=1000, help="Number of synthetic paths")
+    parser.add_argument("--method", choices=PATH_METHODS, default="bootstrap", help="Path generator")
+    parser.add_argument("--block-bars", type=int, default=DEFAULT_BLOCK_BARS, help="Bars per bootstrap block")
+    parser.add_argument("--seed", type=int, help="Random seed")
+    parser.add_argument("--workers", type=int, help="Worker processes")
+    parser.add_argument("--fee-per-share", type=float, default=0.0, help="Fee per share traded")
+    parser.add_argument("--fee-pct", type=float, default=0.0, help="Fee as a fraction of the traded amount")
+    parser.add_argument("--slippage-pct", type=float, default=0.0, help="Fixed slippage as a fraction of the price")
+    parser.add_argument("--slippage-range", type=float, default=0.0,
+                        help="Slippage as a fraction of the bar's relative range")
+    parser.add_argument("--partial-fills", action="store_true", help="Fill buys the cash cannot fully cover")
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    args = parser.parse_args()
+
+    fill_model = None
+    if args.fee_per_share or args.fee_pct or args.slippage_pct or args.slippage_range or args.partial_fills:
+        fill_model = FillModel(args.fee_per_share, args.fee_pct, args.slippage_pct, args.slippage_range,
+                               args.partial_fills)
+
+    backtest_data = None
+    if args.csv:
+        import pandas as pd
+        backtest_data = pd.read_csv(args.csv, parse_dates=["Date"])
+        backtest_data = backtest_data[(backtest_data["Date"] >= args.start) & (backtest_data["Date"] <= args.end)]
+
+    strategy = {
+        "symbol": args.symbol,
+        "upper_price": args.upper,
+        "lower_price": args.lower,
+        "num_grids": args.num_grids,
+        "investment_amount": args.investment,
+        "grid_levels": calculate_grid_levels(args.upper, args.lower, args.num_grids)
+    }
+    result = run_monte_carlo(strategy, args.start, args.end, num_paths=args.paths, method=args.method,
+                             block_bars=args.block_bars, seed=args.seed, max_workers=args.workers,
+                             backtest_data=backtest_data, fill_model=fill_model)
+
+    print(f"{result['num_paths']} {result['method']} paths over {result['period']['bars']} bars, seed {result['seed']}")
+    print(f"probability of loss {result['probability_of_loss']:.1%}")
+    for name, summary in result["distribution"].items():
+        columns = [("historical", result["historical"][name])]
+        columns += [(key, summary[key]) for key in ("p5", "p50", "p95")]
+        print(f"{name:<18}" + "  ".join(
+            f"{label} {value:>12.4f}" if value is not None else f"{label} {'n/a':>12}" for label, value in columns
+        ))
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2)
+
+def _init_worker(prices, settings):
+    _worker_state.update(settings, prices=prices)
+
+def _simulate_chunk(task, state=None):
+    state = state if state is not None else _worker_state
+    num_paths, seed_sequence = task
+    prices = state["prices"]
+    high, low, close = generate_paths(prices[0], prices[1], prices[2], num_paths,
+                                      np.random.default_rng(seed_sequence),
+                                      state["method"], state["block_bars"])
+    simulation = simulate_paths(high, low, close, state["grid_levels"], state["investment_amount"],
+                                state["fill_model"])
+    # The paths are not needed for the metrics
+    del high, low, close
+    return path_metrics(simulation, state["investment_amount"])
+
+def _quantile_key(q):
+    return f"p{q * 100:g}"
+
+def _to_python(value):
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    return value
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from src.backtest import run_backtest, load_backtest_data, calculate_performance_metrics
+from src.lazy import lazy_import
+from src.sweep import pool_workers
+
+pd = lazy_import("pandas")
+
+# Concurrent downloads when loading symbol histories
+MAX_FETCH_THREADS = 16
+
+def run_portfolio_backtest(strategies, start_date, end_date, engine="vectorized", max_workers=None,
+                           fill_model=None):
+    """
+    Backtest several grid strategies together as one portfolio
+
+    Symbol histories are loaded concurrently, each strategy is simulated in its
+    own worker process, and the per-strategy values are aligned on the union of
+    their dates (carrying each value forward over days a symbol did not trade)
+    and summed into a combined equity curve.
+
+    Parameters:
+    - strategies: List of grid strategy dicts (each with an _id)
+    - start_date: Start date for backtest (YYYY-MM-DD)
+    - end_date: End date for backtest (YYYY-MM-DD)
+    - engine: Simulation engine passed to run_backtest
+    - max_workers: Number of worker processes (defaults to and is capped at the CPU count, 1 runs in-process)
+    - fill_model: Optional FillModel applied to every strategy
+
+    Returns:
+    - Dict with per-strategy results and the combined daily values and metrics
+    """
+    if len(strategies) == 0:
+        raise ValueError("Portfolio needs at least one strategy")
+
+    price_data = {}
+    if engine != "intrabar":
+        price_data = load_symbol_histories(
+            sorted({strategy["symbol"] for strategy in strategies}), start_date, end_date
+        )
+
+    tasks = [
+        (strategy, start_date, end_date, engine, price_data.get(strategy["symbol"]), fill_model)
+        for strategy in strategies
+    ]
+
+    max_workers = pool_workers(max_workers, len(tasks))
+    if max_workers == 1:
+        results = [_simulate_strategy(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            results = list(executor.map(_simulate_strategy, tasks))
+
+    combined = combine_daily_values(
+        [result["daily_values"] for result in results],
+        [strategy["investment_amount"] for strategy in strategies]
+    )
+    combined_portfolio = {
+        "investment_amount": sum(strategy["investment_amount"] for strategy in strategies),
+        "daily_values": combined,
+        "trades": [trade for result in results for trade in result["trades"]]
+    }
+
+    summary = {
+        "backtest_period": {
+            "start_date": start_date,
+            "end_date": end_date,
+            "days": len(combined)
+        },
+        "engine": engine,
+        "strategies": [
+            {
+                "strategy_id": str(strategy.get("_id")),
+                "symbol": strategy["symbol"],
+                "days": result["backtest_period"]["days"],
+                "metrics": result["metrics"]
+            }
+            for strategy, result in zip(strategies, results)
+        ],
+        "combined": {
+            "daily_values": combined,
+            "metrics": calculate_performance_metrics(combined_portfolio, None)
+        }
+    }
+    if fill_model is not None:
+        summary["fill_model"] = fill_model.to_dict()
+
+    return summary
+
+def load_symbol_histories(symbols, start_date, end_date):
+    """
+    Load daily price data for several symbols concurrently
+
+    Parameters:
+    - symbols: List of stock symbols
+    - start_date: Start date (YYYY-MM-DD)
+    - end_date: End date (YYYY-MM-DD)
+
+    Returns:
+    - Dict of symbol to price DataFrame
+    """
+    with ThreadPoolExecutor(max_workers=min(MAX_FETCH_THREADS, len(symbols))) as executor:
+        frames = executor.map(lambda symbol: load_backtest_data(symbol, start_date, end_date), symbols)
+        return dict(zip(symbols, frames))
+
+def combine_daily_values(daily_values_list, investment_amounts):
+    """
+    Sum several daily value series on their shared date index
+
+    Before a series' first day its value is its uninvested cash; after that
+    its last value is carried forward over dates it has no row for.
+
+    Parameters:
+    - daily_values_list: List of daily value record lists
+    - investment_amounts: Initial cash of each series
+
+    Returns:
+    - List of combined daily value records (date, cash, value)
+    """
+    values = []
+    cash = []
+    for daily_values, investment_amount in zip(daily_values_list, investment_amounts):
+        frame = pd.DataFrame(daily_values, columns=["date", "cash", "value"]).set_index("date")
+        values.append(frame["value"].rename(len(values)))
+        cash.append(frame["cash"].rename(len(cash)))
+
+    value_frame = pd.concat(values, axis=1).sort_index().ffill()
+    cash_frame = pd.concat(cash, axis=1).sort_index().ffill()
+
+    initial = pd.Series(investment_amounts, index=value_frame.columns, dtype=float)
+    value_frame = value_frame.fillna(initial)
+    cash_frame = cash_frame.fillna(initial)
+
+    return [
+        {"date": date, "cash": total_cash, "value": total_value}
+        for date, total_cash, total_value in zip(
+            value_frame.index.tolist(),
+            cash_frame.sum(axis=1).tolist(),
+            value_frame.sum(axis=1).tolist()
+        )
+    ]
+
+def _simulate_strategy(task):
+    strategy, start_date, end_date, engine, backtest_data, fill_model = task
+    return run_backtest(strategy, start_date, end_date, engine=engine, backtest_data=backtest_data,
+                        fill_model=fill_model)
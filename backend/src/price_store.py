@@ -0,0 +1,502 @@
+import contextlib
+import hashlib
+import json
+import os
+import re
+import shutil
+import threading
+import time
+import uuid
+import numpy as np
+from src.lazy import lazy_import
+
+pd = lazy_import("pandas")
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# How long (in seconds) cached bars stay fresh before the tail is refreshed
+DEFAULT_MAX_AGE = {
+    "1m": 60, "2m": 120, "5m": 300, "15m": 900, "30m": 1800,
+    "60m": 3600, "90m": 3600, "1h": 3600,
+    "1d": 6 * 3600, "5d": 6 * 3600,
+    "1wk": 24 * 3600, "1mo": 24 * 3600, "3mo": 24 * 3600
+}
+
+# Days back the provider serves each intraday interval (yfinance limits);
+# other intervals are served in full
+INTRADAY_LOOKBACK_DAYS = {
+    "1m": 7, "2m": 60, "5m": 60, "15m": 60, "30m": 60, "90m": 60,
+    "60m": 730, "1h": 730
+}
+
+# Attempts to open a series whose version directory was removed by a
+# concurrent writer before it could be mapped
+OPEN_ATTEMPTS = 3
+
+# Name of a series version directory (nanosecond write time, then a random
+# suffix), so version names sort in write order
+VERSION_PATTERN = re.compile(r"\d{20}-[0-9a-f]{8}")
+
+# pd.DateOffset arguments of each period (built on use so importing this
+# module does not load pandas)
+PERIOD_OFFSETS = {
+    "1d": {"days": 1},
+    "5d": {"days": 5},
+    "1mo": {"months": 1},
+    "3mo": {"months": 3},
+    "6mo": {"months": 6},
+    "1y": {"years": 1},
+    "2y": {"years": 2},
+    "5y": {"years": 5},
+    "10y": {"years": 10}
+}
+
+def period_start(period, anchor):
+    """
+    Get the first timestamp covered by a yfinance-style period
+
+    Parameters:
+    - period: Data period (e.g., '5d', '1y', 'ytd', 'max')
+    - anchor: Timestamp the period counts back from
+
+    Returns:
+    - Timestamp, or None for 'max'
+    """
+    if period == "max":
+        return None
+    if period == "ytd":
+        return pd.Timestamp(year=anchor.year, month=1, day=1)
+    if period not in PERIOD_OFFSETS:
+        raise ValueError(f"Unsupported period: {period}")
+    return anchor - pd.DateOffset(**PERIOD_OFFSETS[period])
+
+def normalize_frame(frame):
+    """
+    Normalize a provider DataFrame to a sorted frame with a naive Date column
+
+    Parameters:
+    - frame: DataFrame indexed (or keyed) by bar timestamp
+
+    Returns:
+    - DataFrame with a Date column followed by numeric price/volume columns
+    """
+    frame = frame.copy()
+    if isinstance(frame.columns, pd.MultiIndex):
+        frame.columns = frame.columns.get_level_values(0)
+    if "Date" not in frame.columns:
+        frame = frame.reset_index()
+        frame = frame.rename(columns={frame.columns[0]: "Date"})
+
+    dates = pd.to_datetime(frame["Date"])
+    if dates.dt.tz is not None:
+        dates = dates.dt.tz_localize(None)
+    frame["Date"] = dates.astype("datetime64[ns]")
+
+    frame = frame.sort_values("Date").drop_duplicates("Date", keep="last")
+    return frame.reset_index(drop=True)
+
+class PriceStore:
+    """
+    Persistent per-symbol, per-interval OHLCV store
+
+    Each (ticker, interval) series is stored as one memory-mapped .npy file
+    per column plus a meta.json describing the columns, when the series was
+    last refreshed and how far back it is known to be complete. Every write
+    puts all columns into a new version directory and then atomically
+    replaces meta.json, which names the current version, so readers in any
+    thread or process see either the old or the new series, never a mix of
+    the two. The version meta.json replaced is kept for readers that opened
+    it just before; older versions are removed. Writers of the same series
+    in different processes take turns through a lock file. Reads slice
+    the memory-mapped arrays by date, so only the requested rows are copied
+    into memory. When the cached series is older than the staleness limit,
+    only the bars from the last stored bar onwards are fetched from the
+    provider and merged in.
+
+    The provider is any callable with the signature
+    provider(ticker, interval, period=None, start=None) returning a
+    DataFrame indexed by bar timestamp, like yf.download.
+    """
+
+    def __init__(self, cache_dir, provider, max_age=None, clock=time.time):
+        """
+        Parameters:
+        - cache_dir: Directory holding the cached series
+        - provider: Callable used to download bars
+        - max_age: Seconds before cached bars are stale, either a number or a
+          dict keyed by interval (defaults to DEFAULT_MAX_AGE)
+        - clock: Callable returning the current time in seconds
+        """
+        self.cache_dir = cache_dir
+        self.provider = provider
+        self.max_age = max_age if max_age is not None else DEFAULT_MAX_AGE
+        self.clock = clock
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+
+    def get_history(self, ticker, interval="1d", period=None, start=None, end=None):
+        """
+        Get bars for a ticker, refreshing the cache from the provider as needed
+
+        Parameters:
+        - ticker: Provider ticker symbol
+        - interval: Bar interval (e.g., '1m', '1d', '1wk')
+        - period: Data period counted back from the latest bar (e.g., '1y', 'max')
+        - start: First bar date to include (overrides period)
+        - end: Last bar date to include
+
+        Returns:
+        - DataFrame with a Date column and the provider's price/volume columns
+        """
+        start = pd.Timestamp(start) if start is not None else None
+        end = pd.Timestamp(end) if end is not None else None
+
+        with self._lock_for(ticker, interval):
+            self._ensure_cached(ticker, interval, period, start)
+            return self._read_slice(ticker, interval, period, start, end)
+
+    def load(self, ticker, interval="1d", period=None, start=None, provider=None):
+        """
+        Bring a series into the cache without reading it back
+
+        Bars are fetched and written the same way get_history would, but the
+        cached columns are not read into a DataFrame, so warming many series
+        costs only the download and the column writes.
+
+        Parameters:
+        - ticker: Provider ticker symbol
+        - interval: Bar interval (e.g., '1d', '1wk')
+        - period: Data period to cover (e.g., '1y', 'max')
+        - start: First bar date to cover (overrides period)
+        - provider: Callable used instead of the store's provider for this
+          call (e.g., one that is rate limited)
+
+        Returns:
+        - Dict with the cached rows, the first and last bar timestamps and
+          whether the provider was called
+        """
+        start = pd.Timestamp(start) if start is not None else None
+
+        with self._lock_for(ticker, interval):
+            fetched = self._ensure_cached(ticker, interval, period, start, provider)
+            dates = self._open_columns(ticker, interval)["Date"]
+
+        return {
+            "rows": len(dates),
+            "first_bar": pd.Timestamp(int(dates[0]), unit="ns").isoformat() if len(dates) else None,
+            "last_bar": pd.Timestamp(int(dates[-1]), unit="ns").isoformat() if len(dates) else None,
+            "fetched": fetched
+        }
+
+    def iter_history(self, ticker, interval="1d", period=None, start=None, end=None, chunk_rows=65536):
+        """
+        Yield bars for a ticker in chunks, reading the memory-mapped columns lazily
+
+        The cache is refreshed once up front; the column files are then mapped
+        and sliced chunk by chunk, so only one chunk is in memory at a time.
+
+        Parameters:
+        - ticker: Provider ticker symbol
+        - interval: Bar interval (e.g., '1m', '1d')
+        - period: Data period counted back from the latest bar (e.g., '1y', 'max')
+        - start: First bar date to include (overrides period)
+        - end: Last bar date to include
+        - chunk_rows: Number of bars per chunk
+
+        Returns:
+        - Generator of DataFrames with a Date column and price/volume columns
+        """
+        start = pd.Timestamp(start) if start is not None else None
+        end = pd.Timestamp(end) if end is not None else None
+
+        with self._lock_for(ticker, interval):
+            self._ensure_cached(ticker, interval, period, start)
+            # Mapped files stay valid even if a later refresh replaces them
+            columns = self._open_columns(ticker, interval)
+
+        first, last = self._slice_bounds(columns["Date"], period, start, end)
+        for offset in range(first, last, chunk_rows):
+            stop = min(offset + chunk_rows, last)
+            yield self._frame_from_columns(columns, offset, stop)
+
+    def fingerprint(self, ticker, interval="1d", start=None, end=None):
+        """
+        Hash the cached bars in a date range, refreshing the cache first
+
+        The hash changes whenever any bar in the range changes, so it can be
+        used as the version of the price data behind a derived result.
+
+        Parameters:
+        - ticker: Provider ticker symbol
+        - interval: Bar interval
+        - start: First bar date to include
+        - end: Last bar date to include
+
+        Returns:
+        - Hex digest of the bars in the range
+        """
+        start = pd.Timestamp(start) if start is not None else None
+        end = pd.Timestamp(end) if end is not None else None
+
+        with self._lock_for(ticker, interval):
+            self._ensure_cached(ticker, interval, None, start)
+            columns = self._open_columns(ticker, interval)
+
+        first, last = self._slice_bounds(columns["Date"], None, start, end)
+        digest = hashlib.blake2b(digest_size=16)
+        for name in sorted(columns):
+            digest.update(name.encode())
+            digest.update(np.ascontiguousarray(columns[name][first:last]).tobytes())
+        return digest.hexdigest()
+
+    def version(self, ticker, interval="1d", period=None, start=None):
+        """
+        Get the version of a cached series, refreshing the cache first
+
+        The version changes every time the series is written (fetched,
+        refreshed or backfilled), so it can key results derived from the
+        series without reading its bars; only the metadata file is read.
+
+        Parameters:
+        - ticker: Provider ticker symbol
+        - interval: Bar interval
+        - period: Period the caller will read (e.g., '1y'), used to fetch
+          missing history like load()
+        - start: First date the caller will read (overrides period)
+
+        Returns:
+        - Version string
+        """
+        with self._lock_for(ticker, interval):
+            self._ensure_cached(ticker, interval, period, start)
+            meta = self._read_meta(ticker, interval)
+        return meta["version"]
+
+    def is_stale(self, meta, interval):
+        """
+        Check whether a cached series is past its staleness limit
+
+        Parameters:
+        - meta: Metadata dict of the cached series
+        - interval: Bar interval of the series
+
+        Returns:
+        - True if the tail should be refreshed from the provider
+        """
+        if isinstance(self.max_age, dict):
+            max_age = self.max_age.get(interval, DEFAULT_MAX_AGE.get(interval, 3600))
+        else:
+            max_age = self.max_age
+        return self.clock() - meta["refreshed_at"] > max_age
+
+    def invalidate(self, ticker, interval):
+        """Remove a cached series so the next read fetches it from scratch"""
+        with self._lock_for(ticker, interval):
+            path = self._series_dir(ticker, interval)
+            meta_path = os.path.join(path, "meta.json")
+            if os.path.exists(meta_path):
+                os.remove(meta_path)
+            for entry in os.listdir(path) if os.path.isdir(path) else []:
+                if VERSION_PATTERN.fullmatch(entry):
+                    shutil.rmtree(os.path.join(path, entry), ignore_errors=True)
+
+    def _ensure_cached(self, ticker, interval, period, start, provider=None):
+        # Returns True if the provider was called
+        provider = provider or self.provider
+        meta = self._read_meta(ticker, interval)
+        now = pd.Timestamp(self.clock(), unit="s")
+
+        if meta is None:
+            self._fetch_initial(ticker, interval, period, start, now, provider)
+        else:
+            required_from = self._fetch_start(interval, period, start, now)
+            covered_from = meta["covered_from"]
+            if covered_from is not None and (
+                    required_from is None or required_from < pd.Timestamp(covered_from)):
+                self._backfill(ticker, interval, meta, period, start, now, provider)
+            elif self.is_stale(meta, interval):
+                self._refresh_tail(ticker, interval, meta, provider)
+            else:
+                return False
+        return True
+
+    def _fetch_start(self, interval, period, start, now):
+        # First bar a read needs cached (None for the whole history). Intraday
+        # history is limited by the provider, so reads reaching further back
+        # are clamped to its look-back window instead of asking for bars it
+        # would refuse
+        required_from = start if start is not None else period_start(period or "max", now)
+        if interval not in INTRADAY_LOOKBACK_DAYS:
+            return required_from
+        earliest = now - pd.Timedelta(days=INTRADAY_LOOKBACK_DAYS[interval] - 1)
+        return earliest if required_from is None or required_from < earliest else required_from
+
+    def _fetch_initial(self, ticker, interval, period, start, now, provider):
+        # Daily and longer bars are fetched in full once so any later slice is
+        # served from disk; intraday bars from the start the read needs
+        if interval not in INTRADAY_LOOKBACK_DAYS:
+            frame = provider(ticker, interval, period="max")
+            covered_from = None
+        else:
+            covered_from = self._fetch_start(interval, period, start, now)
+            frame = provider(ticker, interval, start=covered_from)
+
+        frame = normalize_frame(frame)
+        if len(frame) == 0:
+            raise ValueError(f"No data returned for {ticker} ({interval})")
+        self._write(ticker, interval, frame, covered_from)
+
+    def _backfill(self, ticker, interval, meta, period, start, now, provider):
+        covered_from = self._fetch_start(interval, period, start, now)
+        if covered_from is not None:
+            frame = provider(ticker, interval, start=covered_from)
+        else:
+            frame = provider(ticker, interval, period="max")
+
+        cached = self._read_slice(ticker, interval)
+        merged = normalize_frame(pd.concat([cached, normalize_frame(frame)], ignore_index=True))
+        self._write(ticker, interval, merged, covered_from)
+
+    def _refresh_tail(self, ticker, interval, meta, provider):
+        cached = self._read_slice(ticker, interval)
+        last_bar = cached["Date"].iloc[-1]
+
+        # The last stored bar may have been incomplete, so fetch it again
+        tail = normalize_frame(provider(ticker, interval, start=last_bar.normalize()))
+        if len(tail) > 0:
+            cached = cached[cached["Date"] < tail["Date"].iloc[0]]
+            cached = pd.concat([cached, tail], ignore_index=True)
+            cached = normalize_frame(cached)
+
+        covered_from = meta["covered_from"]
+        self._write(ticker, interval, cached,
+                    pd.Timestamp(covered_from) if covered_from is not None else None)
+
+    def _read_slice(self, ticker, interval, period=None, start=None, end=None):
+        columns = self._open_columns(ticker, interval)
+        first, last = self._slice_bounds(columns["Date"], period, start, end)
+        return self._frame_from_columns(columns, first, last)
+
+    def _open_columns(self, ticker, interval):
+        # Mapped files stay readable after their version directory is
+        # removed; one removed before it was mapped is retried at the new version
+        for attempt in range(OPEN_ATTEMPTS):
+            meta = self._read_meta(ticker, interval)
+            path = self._version_dir(ticker, interval, meta)
+            try:
+                columns = {"Date": np.load(os.path.join(path, "Date.npy"), mmap_mode="r")}
+                for name in meta["columns"]:
+                    columns[name] = np.load(os.path.join(path, self._file_name(name)), mmap_mode="r")
+                return columns
+            except FileNotFoundError:
+                if attempt == OPEN_ATTEMPTS - 1:
+                    raise
+
+    def _slice_bounds(self, dates, period=None, start=None, end=None):
+        first, last = 0, len(dates)
+
+        if start is None and period not in (None, "max") and len(dates) > 0:
+            # Periods count back from the latest stored bar
+            start = period_start(period, pd.Timestamp(int(dates[-1]), unit="ns"))
+            first = int(np.searchsorted(dates, start.value, side="right"))
+        elif start is not None:
+            first = int(np.searchsorted(dates, start.value, side="left"))
+        if end is not None:
+            last = int(np.searchsorted(dates, end.value, side="right"))
+
+        return first, max(first, last)
+
+    def _frame_from_columns(self, columns, first, last):
+        frame = {"Date": pd.to_datetime(np.array(columns["Date"][first:last]), unit="ns")}
+        for name, values in columns.items():
+            if name != "Date":
+                frame[name] = np.array(values[first:last])
+        return pd.DataFrame(frame)
+
+    def _write(self, ticker, interval, frame, covered_from):
+        path = self._series_dir(ticker, interval)
+        os.makedirs(path, exist_ok=True)
+        with self._write_lock(path):
+            self._write_version(ticker, interval, path, frame, covered_from)
+
+    def _write_version(self, ticker, interval, path, frame, covered_from):
+        version = f"{time.time_ns():020d}-{uuid.uuid4().hex[:8]}"
+        version_path = os.path.join(path, version)
+        os.makedirs(version_path)
+
+        columns = [name for name in frame.columns if name != "Date"]
+        arrays = {"Date": frame["Date"].to_numpy(dtype="datetime64[ns]").view(np.int64)}
+        for name in columns:
+            if pd.api.types.is_integer_dtype(frame[name]):
+                arrays[name] = frame[name].to_numpy(dtype=np.int64)
+            else:
+                arrays[name] = pd.to_numeric(frame[name], errors="coerce").to_numpy(dtype=np.float64)
+
+        # Columns go to the new version directory, which no reader knows about
+        # until meta.json names it
+        for name, values in arrays.items():
+            with open(os.path.join(version_path, self._file_name(name)), "wb") as f:
+                np.save(f, np.ascontiguousarray(values))
+
+        previous = self._read_meta(ticker, interval)
+        meta = {
+            "version": version,
+            "ticker": ticker,
+            "interval": interval,
+            "columns": columns,
+            "rows": len(frame),
+            "refreshed_at": self.clock(),
+            "covered_from": covered_from.isoformat() if covered_from is not None else None
+        }
+        meta_path = os.path.join(path, "meta.json")
+        temp_path = f"{meta_path}.{version}.tmp"
+        with open(temp_path, "w") as f:
+            json.dump(meta, f)
+        os.replace(temp_path, meta_path)
+
+        if previous is not None:
+            self._remove_versions_before(path, previous["version"])
+
+    @contextlib.contextmanager
+    def _write_lock(self, path):
+        # Other processes writing the series wait, so removing old versions
+        # never races with a version still being written
+        with open(os.path.join(path, "write.lock"), "a") as f:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _remove_versions_before(self, path, version):
+        # Versions older than the one just replaced are no longer named by
+        # any meta.json a reader could still be opening
+        for entry in os.listdir(path):
+            if VERSION_PATTERN.fullmatch(entry) and entry < version:
+                shutil.rmtree(os.path.join(path, entry), ignore_errors=True)
+
+    def _read_meta(self, ticker, interval):
+        meta_path = os.path.join(self._series_dir(ticker, interval), "meta.json")
+        if not os.path.exists(meta_path):
+            return None
+        with open(meta_path) as f:
+            return json.load(f)
+
+    def _version_dir(self, ticker, interval, meta):
+        return os.path.join(self._series_dir(ticker, interval), meta["version"])
+
+    def _series_dir(self, ticker, interval):
+        safe_ticker = re.sub(r"[^A-Za-z0-9._-]", "_", ticker)
+        return os.path.join(self.cache_dir, safe_ticker, interval)
+
+    def _file_name(self, column):
+        return re.sub(r"[^A-Za-z0-9._-]", "_", column) + ".npy"
+
+    def _lock_for(self, ticker, interval):
+        with self._locks_guard:
+            return self._locks.setdefault((ticker, interval), threading.RLock())
@@ -0,0 +1,147 @@
+import logging
+import math
+import threading
+import time
+from src.telemetry import count
+
+# Seconds a fetched price is served from the cache
+DEFAULT_QUOTE_TTL = 10
+
+# Seconds to wait for another request's fetch of the same symbol
+COALESCE_TIMEOUT = 30
+
+logger = logging.getLogger(__name__)
+
+class QuoteProviderError(Exception):
+    """Raised when the price provider fails, as opposed to having no price for a symbol"""
+
+class _PendingFetch:
+    # A fetch in progress, waited on by concurrent requests for its symbols
+    def __init__(self):
+        self.done = threading.Event()
+        self.error = None
+
+class QuoteService:
+    """
+    Current-price lookups with batching, request coalescing and a short TTL cache
+
+    All symbols missing from the cache are fetched with a single call to the
+    fetcher. If another thread is already fetching a symbol, the request waits
+    for that fetch instead of starting its own. Every quote says where its
+    price came from: "live" (fetched for this or a concurrent request),
+    "cached" (fetched within the TTL) or "fallback" (supplied by the caller
+    because no price could be fetched).
+
+    The fetcher is any callable taking a list of symbols and returning a dict
+    of symbol to price; symbols it has no price for are left out. If the
+    fetcher raises, the failure is logged and counted, and every request
+    waiting on that fetch gets a QuoteProviderError, so a provider outage is
+    never mistaken for symbols without a price.
+    """
+
+    def __init__(self, fetcher, ttl=DEFAULT_QUOTE_TTL, clock=time.time):
+        """
+        Parameters:
+        - fetcher: Callable fetching prices for a list of symbols
+        - ttl: Seconds a price stays in the cache
+        - clock: Callable returning the current time in seconds
+        """
+        self.fetcher = fetcher
+        self.ttl = ttl
+        self.clock = clock
+        self._cache = {}
+        self._in_flight = {}
+        self._lock = threading.Lock()
+
+    def get_quotes(self, symbols):
+        """
+        Get current prices for several symbols
+
+        Parameters:
+        - symbols: Iterable of stock symbols
+
+        Returns:
+        - Dict of symbol to quote dict (price, source, as_of); symbols without
+          a price are left out
+
+        Raises:
+        - QuoteProviderError: If a symbol not in the cache could not be
+          fetched because the fetcher failed
+        """
+        quotes = {}
+        to_fetch = []
+        waiting = {}
+
+        with self._lock:
+            now = self.clock()
+            for symbol in dict.fromkeys(symbols):
+                cached = self._cache.get(symbol)
+                if cached is not None and now - cached[1] <= self.ttl:
+                    quotes[symbol] = {"price": cached[0], "source": "cached", "as_of": cached[1]}
+                elif symbol in self._in_flight:
+                    waiting[symbol] = self._in_flight[symbol]
+                else:
+                    to_fetch.append(symbol)
+            pending = _PendingFetch()
+            for symbol in to_fetch:
+                self._in_flight[symbol] = pending
+
+        error = None
+        if to_fetch:
+            prices = {}
+            try:
+                prices = self.fetcher(to_fetch)
+            except Exception as e:
+                logger.warning("Quote fetch for %d symbols failed: %s", len(to_fetch), e)
+                count("quote_fetch_errors_total")
+                error = pending.error = QuoteProviderError(f"Quote provider failed: {e}")
+            finally:
+                fetched_at = self.clock()
+                with self._lock:
+                    for symbol in to_fetch:
+                        price = prices.get(symbol)
+                        if _valid_price(price):
+                            self._cache[symbol] = (float(price), fetched_at)
+                            quotes[symbol] = {"price": float(price), "source": "live", "as_of": fetched_at}
+                        self._in_flight.pop(symbol)
+                pending.done.set()
+
+        for symbol, fetch in waiting.items():
+            fetch.done.wait(COALESCE_TIMEOUT)
+            with self._lock:
+                cached = self._cache.get(symbol)
+            if cached is not None:
+                quotes[symbol] = {"price": cached[0], "source": "live", "as_of": cached[1]}
+            elif fetch.error is not None:
+                error = error or fetch.error
+
+        if error is not None:
+            raise error
+        return quotes
+
+    def get_quote(self, symbol, fallback=None):
+        """
+        Get the current price of one symbol
+
+        Parameters:
+        - symbol: Stock symbol
+        - fallback: Price to report (with source "fallback") if none can be fetched
+
+        Returns:
+        - Quote dict (price, source, as_of), or None if there is no price and no fallback
+
+        Raises:
+        - QuoteProviderError: If the price provider failed
+        """
+        quote = self.get_quotes([symbol]).get(symbol)
+        if quote is None and fallback is not None:
+            quote = {"price": float(fallback), "source": "fallback", "as_of": self.clock()}
+        return quote
+
+    def clear(self):
+        """Drop every cached price"""
+        with self._lock:
+            self._cache.clear()
+
+def _valid_price(price):
+    return price is not None and not math.isnan(price) and price > 0
@@ -0,0 +1,174 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from src.data_fetcher import get_price_fingerprint
+from src.database import ensure_indexes
+from src.intrabar import intraday_end
+from src.result_store import load_backtest_result
+from src.telemetry import count
+
+# Default number of results kept in the in-process tier
+DEFAULT_CACHE_SIZE = 128
+
+# Default lifetime of a cached result in seconds
+DEFAULT_CACHE_TTL = 7 * 24 * 3600
+
+def backtest_cache_key(strategy, start_date, end_date, engine, interval, data_version, fill_model=None):
+    """
+    Build the content address of a backtest result
+
+    The strategy id is part of the key, so a cache hit is always a stored
+    backtest of the requesting strategy, even when another strategy has
+    the same parameters.
+
+    Parameters:
+    - strategy: Grid strategy dict (with _id when stored)
+    - start_date: Start date for backtest (YYYY-MM-DD)
+    - end_date: End date for backtest (YYYY-MM-DD)
+    - engine: Simulation engine
+    - interval: Bar interval (only used by the intrabar engine)
+    - data_version: Fingerprint of the price data in the range
+    - fill_model: FillModel the backtest applies, or None
+
+    Returns:
+    - Hex digest identifying the result
+    """
+    payload = {
+        "strategy_id": str(strategy["_id"]) if "_id" in strategy else None,
+        "symbol": strategy["symbol"],
+        "upper_price": strategy["upper_price"],
+        "lower_price": strategy["lower_price"],
+        "num_grids": strategy["num_grids"],
+        "investment_amount": strategy["investment_amount"],
+        "grid_levels": [float(level) for level in strategy["grid_levels"]],
+        "start_date": start_date,
+        "end_date": end_date,
+        "engine": engine,
+        "interval": interval if engine == "intrabar" else None,
+        "data_version": data_version
+    }
+    if fill_model is not None:
+        payload["fill_model"] = fill_model.to_dict()
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+def backtest_data_version(strategy, start_date, end_date, engine, interval):
+    """
+    Get the version of the price data a backtest would read
+
+    Parameters:
+    - strategy: Grid strategy dict
+    - start_date: Start date for backtest (YYYY-MM-DD)
+    - end_date: End date for backtest (YYYY-MM-DD)
+    - engine: Simulation engine
+    - interval: Bar interval for the intrabar engine
+
+    Returns:
+    - Fingerprint of the bars in the backtest range
+    """
+    if engine == "intrabar":
+        return get_price_fingerprint(strategy["symbol"], interval, start_date, intraday_end(end_date))
+    return get_price_fingerprint(strategy["symbol"], "1d", start_date, end_date)
+
+class BacktestCache:
+    """
+    Two-tier cache of backtest results keyed by backtest_cache_key
+
+    The first tier is an in-process LRU of ready-to-serve result dicts. The
+    second is the db.backtest_cache collection, mapping keys to stored
+    backtests and expired by a TTL index on expires_at. Because the key
+    includes a fingerprint of the price data, results computed on data that
+    has since changed are simply never looked up again.
+    """
+
+    def __init__(self, db, max_entries=DEFAULT_CACHE_SIZE, ttl_seconds=DEFAULT_CACHE_TTL):
+        """
+        Parameters:
+        - db: MongoDB database
+        - max_entries: Results kept in the in-process tier
+        - ttl_seconds: Lifetime of a cached result
+        """
+        self.db = db
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._indexed = False
+
+    def get(self, key):
+        """
+        Look up a cached result
+
+        Parameters:
+        - key: Cache key
+
+        Returns:
+        - Result dict (with _id of the stored backtest), or None on a miss
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires, result = entry
+                if expires > time.time():
+                    self._entries.move_to_end(key)
+                    count("backtest_cache_lookups_total", result="memory")
+                    return result
+                del self._entries[key]
+
+        cached = self.db.backtest_cache.find_one({"key": key, "expires_at": {"$gt": datetime.utcnow()}})
+        if not cached:
+            count("backtest_cache_lookups_total", result="miss")
+            return None
+
+        result = load_backtest_result(self.db, cached["backtest_id"])
+        if result is None:
+            count("backtest_cache_lookups_total", result="miss")
+            return None
+
+        count("backtest_cache_lookups_total", result="db")
+
+        expires = time.time() + (cached["expires_at"] - datetime.utcnow()).total_seconds()
+        self._remember(key, result, expires)
+        return result
+
+    def put(self, key, backtest_id, result):
+        """
+        Cache a stored backtest result
+
+        Parameters:
+        - key: Cache key
+        - backtest_id: Id of the stored backtest
+        - result: Result dict as returned to the client
+        """
+        if not self._indexed:
+            # Unique key plus a TTL index on expires_at, created on first write
+            # so building the cache does not connect to the database
+            ensure_indexes(self.db, ["backtest_cache"])
+            self._indexed = True
+
+        now = datetime.utcnow()
+        self.db.backtest_cache.update_one(
+            {"key": key},
+            {"$set": {
+                "backtest_id": str(backtest_id),
+                "created_at": now,
+                "expires_at": now + timedelta(seconds=self.ttl_seconds)
+            }},
+            upsert=True
+        )
+        self._remember(key, result, time.time() + self.ttl_seconds)
+
+    def clear(self):
+        """Drop every cached result"""
+        with self._lock:
+            self._entries.clear()
+        self.db.backtest_cache.delete_many({})
+
+    def _remember(self, key, result, expires):
+        with self._lock:
+            self._entries[key] = (expires, result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
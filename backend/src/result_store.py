@@ -0,0 +1,399 @@
+import numpy as np
+from bson.binary import Binary
+from bson.objectid import ObjectId
+from src.database import bulk_insert
+from src.serialization import records_to_columns
+from src.downsample import downsample_series
+from src.lazy import lazy_import
+
+pd = lazy_import("pandas")
+
+# Rows per stored chunk of a backtest series
+CHUNK_ROWS = 8192
+
+# Series stored column-wise next to the backtest summary document
+SERIES_KINDS = ("daily_values", "trades")
+
+EPOCH = np.datetime64("1970-01-01", "D")
+
+def pack_columns(records):
+    """
+    Pack a list of row dicts into typed column buffers
+
+    Dates ('YYYY-MM-DD') are stored as int32 days since the epoch, numbers as
+    little-endian float64/int64 and strings as int32 codes into a category list.
+
+    Parameters:
+    - records: List of dicts with the same keys
+
+    Returns:
+    - Tuple of (column specs dict, dict of numpy arrays) where each spec gives
+      the dtype and, for strings, the categories
+    """
+    frame = pd.DataFrame.from_records(records)
+    specs = {}
+    arrays = {}
+
+    for name in frame.columns:
+        column = frame[name]
+        if name == "date":
+            arrays[name] = (column.to_numpy(dtype="datetime64[D]") - EPOCH).astype("<i4")
+            specs[name] = {"kind": "date", "dtype": "<i4"}
+        elif pd.api.types.is_bool_dtype(column):
+            arrays[name] = column.to_numpy(dtype="<i1")
+            specs[name] = {"kind": "bool", "dtype": "<i1"}
+        elif pd.api.types.is_integer_dtype(column):
+            arrays[name] = column.to_numpy(dtype="<i8")
+            specs[name] = {"kind": "int", "dtype": "<i8"}
+        elif pd.api.types.is_numeric_dtype(column):
+            arrays[name] = column.to_numpy(dtype="<f8")
+            specs[name] = {"kind": "float", "dtype": "<f8"}
+        else:
+            codes, categories = pd.factorize(column.astype(str))
+            arrays[name] = codes.astype("<i4")
+            specs[name] = {"kind": "category", "dtype": "<i4", "categories": list(categories)}
+
+    return specs, arrays
+
+def unpack_columns(specs, buffers):
+    """
+    Decode typed column buffers back into numpy arrays
+
+    Parameters:
+    - specs: Column specs from pack_columns
+    - buffers: Dict of column name to list of bytes chunks
+
+    Returns:
+    - Dict of column name to numpy array (dates as datetime64[D])
+    """
+    columns = {}
+    for name, spec in specs.items():
+        parts = [np.frombuffer(part, dtype=spec["dtype"]) for part in buffers.get(name, [])]
+        values = np.concatenate(parts) if parts else np.array([], dtype=spec["dtype"])
+        if spec["kind"] == "date":
+            values = EPOCH + values.astype("timedelta64[D]")
+        elif spec["kind"] == "bool":
+            values = values.astype(bool)
+        elif spec["kind"] == "category":
+            values = np.asarray(spec["categories"], dtype=object)[values]
+        columns[name] = values
+    return columns
+
+def columns_to_json_records(columns):
+    """
+    Convert decoded columns into JSON-serializable row dicts
+
+    Parameters:
+    - columns: Dict of column name to numpy array
+
+    Returns:
+    - List of row dicts with dates as 'YYYY-MM-DD' strings
+    """
+    names = list(columns.keys())
+    values = []
+    for name in names:
+        column = columns[name]
+        if np.issubdtype(column.dtype, np.datetime64):
+            column = np.datetime_as_string(column, unit="D")
+        values.append(column.tolist())
+    return [dict(zip(names, row)) for row in zip(*values)]
+
+def columns_to_json_columns(columns):
+    """
+    Lay out decoded columns as {"columns", "data"} without building row dicts
+
+    Parameters:
+    - columns: Dict of column name to numpy array
+
+    Returns:
+    - Dict with "columns" (names) and "data" (one array per column, dates as
+      'YYYY-MM-DD' strings)
+    """
+    data = []
+    for column in columns.values():
+        if np.issubdtype(column.dtype, np.datetime64):
+            column = np.datetime_as_string(column, unit="D").tolist()
+        data.append(column)
+    return {"columns": list(columns.keys()), "data": data}
+
+def downsample_columns(columns, max_points):
+    """
+    Reduce columns to at most max_points evenly spaced rows, keeping first and last
+
+    Parameters:
+    - columns: Dict of column name to numpy array
+    - max_points: Maximum number of rows to keep
+
+    Returns:
+    - Dict of column name to numpy array
+    """
+    length = len(next(iter(columns.values()))) if columns else 0
+    if max_points is None or length <= max_points:
+        return columns
+    if max_points < 2:
+        raise ValueError("Downsampling needs at least 2 points")
+    index = np.unique(np.linspace(0, length - 1, max_points).round().astype(np.int64))
+    return {name: values[index] for name, values in columns.items()}
+
+def save_backtest_result(db, result):
+    """
+    Store a backtest result as a summary document plus columnar series chunks
+
+    The summary (strategy, period, metrics) goes into db.backtests; daily
+    values and trades are packed into typed binary buffers and split into
+    chunks of CHUNK_ROWS rows in db.backtest_series, each tagged with the
+    date range it covers. The chunks are written first and the summary
+    last, so a backtest is never visible with missing series; if a write
+    fails, the chunks already written are removed.
+
+    Parameters:
+    - db: MongoDB database
+    - result: Backtest result dict from run_backtest
+
+    Returns:
+    - ObjectId of the stored backtest
+    """
+    summary = {key: value for key, value in result.items() if key not in SERIES_KINDS}
+    summary["storage"] = "columnar"
+    summary["series"] = {}
+
+    packed = {kind: pack_columns(result.get(kind, [])) for kind in SERIES_KINDS}
+    for kind, (specs, arrays) in packed.items():
+        summary["series"][kind] = {
+            "length": len(result.get(kind, [])),
+            "columns": specs
+        }
+
+    backtest_id = ObjectId()
+    summary["_id"] = backtest_id
+
+    chunks = []
+    for kind, (specs, arrays) in packed.items():
+        length = summary["series"][kind]["length"]
+        for seq, offset in enumerate(range(0, length, CHUNK_ROWS)):
+            chunk = {name: values[offset:offset + CHUNK_ROWS] for name, values in arrays.items()}
+            dates = chunk["date"]
+            chunks.append({
+                "backtest_id": backtest_id,
+                "kind": kind,
+                "seq": seq,
+                "rows": len(dates),
+                "start_date": str(EPOCH + np.timedelta64(int(dates[0]), "D")),
+                "end_date": str(EPOCH + np.timedelta64(int(dates[-1]), "D")),
+                "columns": {name: Binary(values.tobytes()) for name, values in chunk.items()}
+            })
+    try:
+        bulk_insert(db.backtest_series, chunks)
+        db.backtests.insert_one(summary)
+    except Exception:
+        db.backtest_series.delete_many({"backtest_id": backtest_id})
+        raise
+
+    return backtest_id
+
+def iter_backtest_series(db, backtest, kind, start=None, end=None):
+    """
+    Yield one series of a stored backtest chunk by chunk, within a date range
+
+    Only one chunk is decoded at a time, so memory stays flat however long
+    the series is.
+
+    Parameters:
+    - db: MongoDB database
+    - backtest: Summary document from db.backtests
+    - kind: 'daily_values' or 'trades'
+    - start: First date to include (YYYY-MM-DD)
+    - end: Last date to include (YYYY-MM-DD)
+
+    Returns:
+    - Generator of dicts of column name to numpy array
+    """
+    specs = backtest["series"][kind]["columns"]
+
+    query = {"backtest_id": backtest["_id"], "kind": kind}
+    if start is not None:
+        query["end_date"] = {"$gte": start}
+    if end is not None:
+        query["start_date"] = {"$lte": end}
+
+    for chunk in db.backtest_series.find(query).sort("seq", 1):
+        buffers = {name: [bytes(chunk["columns"][name])] for name in specs}
+        yield filter_columns_by_date(unpack_columns(specs, buffers), start, end)
+
+def load_backtest_series(db, backtest, kind, start=None, end=None):
+    """
+    Load one series of a stored backtest, reading only chunks in the date range
+
+    Parameters:
+    - db: MongoDB database
+    - backtest: Summary document from db.backtests
+    - kind: 'daily_values' or 'trades'
+    - start: First date to include (YYYY-MM-DD)
+    - end: Last date to include (YYYY-MM-DD)
+
+    Returns:
+    - Dict of column name to numpy array
+    """
+    specs = backtest["series"][kind]["columns"]
+    chunks = list(iter_backtest_series(db, backtest, kind, start, end))
+    if not chunks:
+        return unpack_columns(specs, {})
+    return {name: np.concatenate([chunk[name] for chunk in chunks]) for name in specs}
+
+def iter_backtest_records(db, backtest_id, kind, start=None, end=None):
+    """
+    Yield the rows of one series of a stored backtest as JSON-serializable dicts
+
+    Parameters:
+    - db: MongoDB database
+    - backtest_id: Backtest id string
+    - kind: 'daily_values' or 'trades'
+    - start: First date to include (YYYY-MM-DD)
+    - end: Last date to include (YYYY-MM-DD)
+
+    Returns:
+    - Generator of row dicts, or None if the backtest does not exist
+    """
+    if kind not in SERIES_KINDS:
+        raise ValueError(f"Unknown series: {kind}")
+
+    # Series stored inline (before columnar storage) are read with the document
+    backtest = db.backtests.find_one(
+        {"_id": ObjectId(backtest_id)},
+        {kind: 1, "series": 1, "storage": 1}
+    )
+    if not backtest:
+        return None
+
+    def generate():
+        if backtest.get("storage") == "columnar":
+            for columns in iter_backtest_series(db, backtest, kind, start, end):
+                for record in columns_to_json_records(columns):
+                    yield record
+        else:
+            for record in backtest.get(kind, []):
+                if (start is None or record["date"] >= start) and (end is None or record["date"] <= end):
+                    yield record
+
+    return generate()
+
+def filter_columns_by_date(columns, start=None, end=None):
+    """
+    Keep only rows whose date falls within [start, end]
+
+    Parameters:
+    - columns: Dict of column name to numpy array with a datetime64 'date' column
+    - start: First date to include (YYYY-MM-DD)
+    - end: Last date to include (YYYY-MM-DD)
+
+    Returns:
+    - Dict of column name to numpy array
+    """
+    if "date" not in columns or (start is None and end is None):
+        return columns
+    dates = columns["date"]
+    mask = np.ones(len(dates), dtype=bool)
+    if start is not None:
+        mask &= dates >= np.datetime64(start, "D")
+    if end is not None:
+        mask &= dates <= np.datetime64(end, "D")
+    return {name: values[mask] for name, values in columns.items()}
+
+def load_backtest_result(db, backtest_id, view="full", start=None, end=None, points=None, layout="records"):
+    """
+    Load a stored backtest result
+
+    Parameters:
+    - db: MongoDB database
+    - backtest_id: Backtest id string
+    - view: 'summary' (metrics only) or 'full' (with daily values and trades)
+    - start: First date of the series to include (YYYY-MM-DD)
+    - end: Last date of the series to include (YYYY-MM-DD)
+    - points: Maximum number of daily values to return (downsampled)
+    - layout: 'records' (list of row dicts) or 'columns' ({"columns", "data"})
+      for the daily values and trades
+
+    Returns:
+    - JSON-serializable backtest dict, or None if not found
+    """
+    if view not in ("summary", "full"):
+        raise ValueError(f"Unknown view: {view}")
+    if layout not in ("records", "columns"):
+        raise ValueError(f"Unknown layout: {layout}")
+
+    projection = {kind: 0 for kind in SERIES_KINDS} if view == "summary" else None
+    backtest = db.backtests.find_one({"_id": ObjectId(backtest_id)}, projection)
+    if not backtest:
+        return None
+
+    if backtest.get("storage") == "columnar":
+        if view == "full":
+            for kind in SERIES_KINDS:
+                columns = load_backtest_series(db, backtest, kind, start, end)
+                if kind == "daily_values":
+                    columns = downsample_columns(columns, points)
+                if layout == "columns":
+                    backtest[kind] = columns_to_json_columns(columns)
+                else:
+                    backtest[kind] = columns_to_json_records(columns)
+        del backtest["series"]
+        del backtest["storage"]
+    elif view == "full":
+        # Results stored before columnar storage keep their series inline
+        for kind in SERIES_KINDS:
+            records = backtest.get(kind, [])
+            if start is not None:
+                records = [record for record in records if record["date"] >= start]
+            if end is not None:
+                records = [record for record in records if record["date"] <= end]
+            if kind == "daily_values" and points is not None and len(records) > points:
+                index = downsample_columns({"row": np.arange(len(records))}, points)["row"]
+                records = [records[i] for i in index]
+            backtest[kind] = records_to_columns(records) if layout == "columns" else records
+
+    backtest["_id"] = str(backtest["_id"])
+    return backtest
+
+def load_backtest_chart(db, backtest_id, start=None, end=None, points=1000, method="lttb"):
+    """
+    Load the daily values of a stored backtest downsampled for charting
+
+    Parameters:
+    - db: MongoDB database
+    - backtest_id: Backtest id string
+    - start: First date to include (YYYY-MM-DD)
+    - end: Last date to include (YYYY-MM-DD)
+    - points: Maximum number of daily values to return
+    - method: 'lttb' or 'minmax', both keeping the shape of the portfolio value
+
+    Returns:
+    - Dict with the number of days in the range, the points returned and the
+      daily values as {"columns", "data"}, or None if not found
+    """
+    if method not in ("lttb", "minmax"):
+        raise ValueError("Daily values are downsampled with lttb or minmax")
+
+    backtest = db.backtests.find_one({"_id": ObjectId(backtest_id)}, {"daily_values": 1, "series": 1, "storage": 1})
+    if not backtest:
+        return None
+
+    if backtest.get("storage") == "columnar":
+        columns = load_backtest_series(db, backtest, "daily_values", start, end)
+    else:
+        # Results stored before columnar storage keep their series inline
+        records = [record for record in backtest.get("daily_values", [])
+                   if (start is None or record["date"] >= start) and (end is None or record["date"] <= end)]
+        layout = records_to_columns(records)
+        columns = {name: np.asarray(values) for name, values in zip(layout["columns"], layout["data"])}
+
+    days = len(columns["value"]) if "value" in columns else 0
+    if days > 0:
+        columns = downsample_series(columns, points, method, "value")
+
+    return {
+        "backtest_id": str(backtest["_id"]),
+        "method": method,
+        "days": days,
+        "points": len(columns["value"]) if days > 0 else 0,
+        "daily_values": columns_to_json_columns(columns)
+    }
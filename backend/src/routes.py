@@ -1,20 +1,209 @@
-from flask import request, jsonify
-from src.data_fetcher import get_stock_data
+import json
+import os
+from flask import request, jsonify, Response
+from pymongo.errors import BulkWriteError
+from src.data_fetcher import get_stock_data, get_price_history, iter_price_history, get_price_version, get_quotes
+from src.database import bulk_insert
 from src.grid_trading import create_grid_strategy, calculate_grid_levels
 from src.backtest import run_backtest
+from src.fills import FillModel
+from src.sweep import build_parameter_grid, iter_parameter_sweep, run_parameter_sweep
+from src.walk_forward import run_walk_forward
+from src.monte_carlo import DEFAULT_BLOCK_BARS, run_monte_carlo
+from src.portfolio import run_portfolio_backtest
+from src.jobs import JobQueue
+from src.result_cache import BacktestCache, backtest_cache_key, backtest_data_version
+from src.result_store import (SERIES_KINDS, save_backtest_result, load_backtest_result, load_backtest_chart,
+                              iter_backtest_records)
+from src.downsample import DEFAULT_CHART_POINTS, ChartCache, downsample_frame
+from src.bulk_loader import (DEFAULT_LOADER_WORKERS, DEFAULT_LOADER_RATE, DEFAULT_LOADER_RETRIES,
+                             MAX_LOADER_RETRIES, iter_bulk_load, run_bulk_load)
+from src.streaming import STREAM_CHUNK_ROWS, iter_frame_records, stream_rows
+from src.quotes import QuoteProviderError
+from src.telemetry import span, instrument_app, render_metrics
+from src.serialization import (FormatNotAvailable, STREAMING_FORMATS, get_response_format, encode_response,
+                               frame_to_columns, records_to_columns, records_to_columns_in)
+
+# Page size limits for /api/strategies
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+# Most strategies accepted by one bulk create request
+MAX_BULK_STRATEGIES = 1000
+
+# Fields every new strategy must have
+STRATEGY_FIELDS = ['symbol', 'upper_price', 'lower_price', 'num_grids', 'investment_amount']
 
 def register_routes(app, db):
     """Register all API routes"""
     
+    # Per-endpoint latency and X-Debug-Profile request profiles
+    instrument_app(app)
+    
+    # Background workers for backtests submitted as jobs
+    job_queue = JobQueue(db, max_workers=int(os.environ.get("BACKTEST_WORKERS", 2)))
+    app.extensions["backtest_jobs"] = job_queue
+    
+    # Results of identical backtests on unchanged price data
+    backtest_cache = BacktestCache(
+        db,
+        max_entries=int(os.environ.get("BACKTEST_CACHE_SIZE", 128)),
+        ttl_seconds=int(os.environ.get("BACKTEST_CACHE_TTL", 7 * 24 * 3600))
+    )
+    app.extensions["backtest_cache"] = backtest_cache
+    
+    # Downsampled chart series per (series, range, resolution)
+    chart_cache = ChartCache(max_entries=int(os.environ.get("CHART_CACHE_SIZE", 256)))
+    app.extensions["chart_cache"] = chart_cache
+    
+    # Bulk load limits, set by the server only: the provider rate limit
+    # protects the server's own provider access, whoever asks for a load
+    bulk_load_rate = float(os.environ.get("BULK_LOAD_RATE", DEFAULT_LOADER_RATE))
+    bulk_load_burst = float(os.environ["BULK_LOAD_BURST"]) if os.environ.get("BULK_LOAD_BURST") else None
+    bulk_load_max_workers = int(os.environ.get("BULK_LOAD_MAX_WORKERS", DEFAULT_LOADER_WORKERS))
+    
+    # Worker processes one sweep, walk-forward, portfolio or Monte Carlo
+    # request may start; larger client values are capped. gunicorn.conf.py
+    # lowers the default so concurrent requests in all server workers
+    # together stay near the CPU count
+    pool_max_workers = int(os.environ.get("POOL_MAX_WORKERS", os.cpu_count() or 1))
+    
+    def requested_pool_workers(data):
+        requested = data.get('max_workers')
+        return min(int(requested), pool_max_workers) if requested else pool_max_workers
+    
+    @app.route('/api/metrics', methods=['GET'])
+    def metrics():
+        """
+        Expose timing spans, request latency and counters in the Prometheus text format
+
+        Metrics are kept per server process: under gunicorn each scrape is
+        answered by one worker and covers only the requests that worker served.
+        """
+        return Response(render_metrics(), mimetype='text/plain; version=0.0.4')
+    
     @app.route('/api/stock/<symbol>', methods=['GET'])
     def get_stock(symbol):
-        """Get stock data for a given symbol"""
+        """
+        Get stock data for a given symbol
+        
+        Rows are returned as JSON records by default, as {"columns", "data"}
+        with format=columnar, as columnar MessagePack with format=msgpack (or
+        Accept: application/x-msgpack), or streamed with format=ndjson/chunked.
+        """
         period = request.args.get('period', '1y')
         interval = request.args.get('interval', '1d')
         
         try:
+            response_format = get_response_format(request)
+            envelope = {"symbol": symbol, "period": period, "interval": interval}
+            if response_format in STREAMING_FORMATS:
+                # Bars are read from the store a chunk at a time while streaming
+                frames = iter_price_history(symbol, interval, period=period, chunk_rows=STREAM_CHUNK_ROWS)
+                return stream_rows(iter_frame_records(frames), response_format, envelope)
+            
+            if response_format != 'json':
+                with span("stock.read"):
+                    frame = get_price_history(symbol, interval, period=period)
+                with span("response.encode"):
+                    return encode_response(dict(envelope, data=frame_to_columns(frame)), response_format)
+            
             data = get_stock_data(symbol, period, interval)
-            return jsonify(data)
+            with span("response.encode"):
+                return encode_response(data)
+        except FormatNotAvailable as e:
+            return jsonify({"error": str(e)}), 406
+        except Exception as e:
+            return jsonify({"error": str(e)}), 400
+    
+    @app.route('/api/stock/<symbol>/chart', methods=['GET'])
+    def get_stock_chart(symbol):
+        """
+        Get stock bars downsampled to a point count for charting
+        
+        method=ohlc (the default) merges consecutive bars into candles;
+        lttb and minmax keep the shape of the close. Pass start and end to
+        get the visible range of a zoomed chart at full screen resolution.
+        Results are cached per symbol, range, resolution and version of the
+        cached bars, which is read from the store's metadata without
+        touching the bars.
+        """
+        interval = request.args.get('interval', '1d')
+        period = request.args.get('period', '1y')
+        start = request.args.get('start')
+        end = request.args.get('end')
+        points = request.args.get('points', DEFAULT_CHART_POINTS, type=int)
+        method = request.args.get('method', 'ohlc')
+        
+        try:
+            response_format = get_response_format(request)
+            version = get_price_version(symbol, interval, period=period, start=start)
+            
+            def compute():
+                with span("stock.read"):
+                    frame = get_price_history(symbol, interval, period=period, start=start, end=end)
+                with span("chart.downsample"):
+                    chart = downsample_frame(frame, points, method, 'Close')
+                return {
+                    "symbol": symbol,
+                    "interval": interval,
+                    "method": method,
+                    "bars": len(frame),
+                    "points": len(chart),
+                    "data": frame_to_columns(chart)
+                }
+            
+            key = ("stock", symbol, interval, period, start, end, points, method, version)
+            payload = chart_cache.get_or_compute(key, compute)
+            with span("response.encode"):
+                return encode_response(payload, response_format)
+        except FormatNotAvailable as e:
+            return jsonify({"error": str(e)}), 406
+        except Exception as e:
+            return jsonify({"error": str(e)}), 400
+    
+    @app.route('/api/stock/bulk-load', methods=['POST'])
+    def bulk_load_stocks():
+        """
+        Download the price history of many symbols into the local price store
+        
+        Symbols are fetched concurrently under a shared rate limit, with
+        failed requests retried; each (symbol, interval) gets its own result
+        with the rows cached or the error. With stream set, results are sent
+        as NDJSON lines as they finish. The rate limit comes from the server
+        configuration, and max_workers and retries are capped by it.
+        """
+        data = request.json
+        
+        if not data.get('symbols'):
+            return jsonify({"error": "Missing required field: symbols"}), 400
+        
+        try:
+            settings = {
+                "intervals": data.get('intervals', ['1d']),
+                "period": data.get('period', 'max'),
+                "start": data.get('start_date'),
+                "max_workers": min(max(int(data.get('max_workers', bulk_load_max_workers)), 1),
+                                   bulk_load_max_workers),
+                "rate": bulk_load_rate,
+                "burst": bulk_load_burst,
+                "retries": min(max(int(data.get('retries', DEFAULT_LOADER_RETRIES)), 0), MAX_LOADER_RETRIES)
+            }
+            
+            if data.get('stream'):
+                # Arguments are validated before the streamed response starts
+                results = iter_bulk_load(data['symbols'], **settings)
+                
+                def generate():
+                    try:
+                        for result in results:
+                            yield json.dumps(result) + "\n"
+                    except Exception as e:
+                        yield json.dumps({"error": str(e)}) + "\n"
+                
+                return Response(generate(), mimetype='application/x-ndjson')
+            
+            return jsonify(run_bulk_load(data['symbols'], **settings))
         except Exception as e:
             return jsonify({"error": str(e)}), 400
     
@@ -35,7 +224,9 @@ def register_routes(app, db):
             grid_levels = calculate_grid_levels(
                 float(upper_price), 
                 float(lower_price), 
-                int(num_grids)
+                int(num_grids),
+                spacing=data.get('spacing', 'arithmetic'),
+                symbol=symbol
             )
             return jsonify({"grid_levels": grid_levels})
         except Exception as e:
@@ -47,8 +238,7 @@ def register_routes(app, db):
         data = request.json
         
         # Validate required fields
-        required_fields = ['symbol', 'upper_price', 'lower_price', 'num_grids', 'investment_amount']
-        for field in required_fields:
+        for field in STRATEGY_FIELDS:
             if field not in data:
                 return jsonify({"error": f"Missing required field: {field}"}), 400
         
@@ -56,12 +246,80 @@ def register_routes(app, db):
             strategy = create_grid_strategy(data)
             
             # Save strategy to database
-            strategy_id = db.strategies.insert_one(strategy).inserted_id
+            with span("db.insert_strategy"):
+                strategy_id = db.strategies.insert_one(strategy).inserted_id
             
             return jsonify({
                 "message": "Strategy created successfully",
-                "strategy_id": str(strategy_id)
+                "strategy_id": str(strategy_id),
+                "price_source": strategy["price_source"]
             })
+        except QuoteProviderError as e:
+            return jsonify({"error": str(e)}), 503
+        except Exception as e:
+            return jsonify({"error": str(e)}), 400
+    
+    @app.route('/api/strategies', methods=['POST'])
+    def create_strategies():
+        """
+        Create several grid trading strategies
+        
+        Current prices for all symbols are fetched in one batch. Strategies
+        that fail validation are reported in errors (by position in the
+        request) and the rest are still created.
+        """
+        data = request.json or {}
+        items = data.get('strategies')
+        
+        if not isinstance(items, list) or len(items) == 0:
+            return jsonify({"error": "strategies must be a non-empty list"}), 400
+        if len(items) > MAX_BULK_STRATEGIES:
+            return jsonify({"error": f"At most {MAX_BULK_STRATEGIES} strategies per request"}), 400
+        
+        try:
+            errors = []
+            valid = []
+            for index, item in enumerate(items):
+                missing = [field for field in STRATEGY_FIELDS if not isinstance(item, dict) or field not in item]
+                if missing:
+                    errors.append({"index": index, "error": f"Missing required field: {missing[0]}"})
+                else:
+                    valid.append((index, item))
+            
+            quotes = get_quotes([item['symbol'] for _, item in valid])
+            
+            strategies = []
+            for index, item in valid:
+                try:
+                    strategies.append((index, create_grid_strategy(item, quotes.get(item['symbol']))))
+                except Exception as e:
+                    errors.append({"index": index, "error": str(e)})
+            
+            # insert_many assigns each strategy its _id; the request fits in
+            # one unordered batch, so every strategy without a write error
+            # was inserted
+            failed = {}
+            try:
+                bulk_insert(db.strategies, [strategy for _, strategy in strategies],
+                            batch_size=MAX_BULK_STRATEGIES)
+            except BulkWriteError as e:
+                failed = {error["index"]: error.get("errmsg", "Insert failed")
+                          for error in e.details.get("writeErrors", [])}
+            created = []
+            for position, (index, strategy) in enumerate(strategies):
+                if position in failed:
+                    errors.append({"index": index, "error": failed[position]})
+                else:
+                    created.append({
+                        "index": index,
+                        "strategy_id": str(strategy["_id"]),
+                        "price_source": strategy["price_source"]
+                    })
+            
+            errors.sort(key=lambda error: error["index"])
+            return jsonify({"created": created, "errors": errors}), 200 if created else 400
+        except QuoteProviderError as e:
+            return jsonify({"error": str(e)}), 503
         except Exception as e:
             return jsonify({"error": str(e)}), 400
     
@@ -84,15 +342,61 @@ def register_routes(app, db):
     
     @app.route('/api/strategies', methods=['GET'])
     def get_all_strategies():
-        """Get all strategies"""
+        """
+        Get strategies
+        
+        With limit and/or after, returns one page ({"strategies", "next_cursor"})
+        ordered by id; otherwise streams every strategy as a JSON array (or
+        NDJSON). fields restricts the returned fields (comma-separated).
+        format=columnar or msgpack lays the strategies out as {"columns", "data"}
+        (building the whole list when no page is requested).
+        """
+        from bson.objectid import ObjectId
+        
+        limit = request.args.get('limit', type=int)
+        after = request.args.get('after')
+        fields = request.args.get('fields')
+        
         try:
-            strategies = list(db.strategies.find())
+            projection = None
+            if fields:
+                projection = {field.strip(): 1 for field in fields.split(',') if field.strip()}
             
-            # Convert ObjectId to string for JSON serialization
-            for strategy in strategies:
+            query = {}
+            if after:
+                query["_id"] = {"$gt": ObjectId(after)}
+            
+            cursor = db.strategies.find(query, projection).sort("_id", 1)
+            
+            def serialize(strategy):
+                # Convert ObjectId to string for JSON serialization
                 strategy["_id"] = str(strategy["_id"])
+                return strategy
             
-            return jsonify(strategies)
+            response_format = get_response_format(request)
+            columnar = response_format in ('columnar', 'msgpack')
+            
+            if limit is None and after is None:
+                if columnar:
+                    strategies = [serialize(strategy) for strategy in cursor]
+                    with span("response.encode"):
+                        return encode_response({"strategies": records_to_columns(strategies)}, response_format)
+                return stream_rows((serialize(strategy) for strategy in cursor),
+                                   'ndjson' if response_format == 'ndjson' else 'chunked')
+            
+            limit = max(1, min(limit or DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE))
+            strategies = [serialize(strategy) for strategy in cursor.limit(limit + 1)]
+            has_more = len(strategies) > limit
+            strategies = strategies[:limit]
+            next_cursor = strategies[-1]["_id"] if has_more else None
+            
+            with span("response.encode"):
+                return encode_response({
+                    "strategies": records_to_columns(strategies) if columnar else strategies,
+                    "next_cursor": next_cursor
+                }, response_format if columnar else 'json')
+        except FormatNotAvailable as e:
+            return jsonify({"error": str(e)}), 406
         except Exception as e:
             return jsonify({"error": str(e)}), 400
     
@@ -109,41 +413,412 @@ def register_routes(app, db):
         from bson.objectid import ObjectId
         
         try:
+            response_format = get_response_format(request)
+            columnar = response_format in ('columnar', 'msgpack')
+            
+            def respond(result):
+                with span("response.encode"):
+                    if columnar:
+                        return encode_response(records_to_columns_in(result, SERIES_KINDS), response_format)
+                    return encode_response(result)
+            
             # Get strategy from database
-            strategy = db.strategies.find_one({"_id": ObjectId(data['strategy_id'])})
+            with span("db.find_strategy"):
+                strategy = db.strategies.find_one({"_id": ObjectId(data['strategy_id'])})
             if not strategy:
                 return jsonify({"error": "Strategy not found"}), 404
             
+            engine = data.get('engine', 'loop')
+            interval = data.get('interval', '1m')
+            fill_model = FillModel.from_dict(data.get('fill_model'))
+            
+            # Serve identical backtests on unchanged price data from the cache
+            cache_key = None
+            if data.get('cache', True):
+                with span("backtest.cache_lookup"):
+                    data_version = backtest_data_version(strategy, data['start_date'], data['end_date'], engine, interval)
+                    cache_key = backtest_cache_key(strategy, data['start_date'], data['end_date'],
+                                                   engine, interval, data_version, fill_model)
+                    cached = backtest_cache.get(cache_key)
+                if cached is not None:
+                    return respond(dict(cached, cached=True))
+            
             # Run backtest
             result = run_backtest(
                 strategy, 
                 data['start_date'], 
-                data['end_date']
+                data['end_date'],
+                engine=engine,
+                interval=interval,
+                fill_model=fill_model
             )
             
             # Save backtest result to database
             result['strategy_id'] = str(strategy['_id'])
-            backtest_id = db.backtests.insert_one(result).inserted_id
+            with span("db.save_backtest"):
+                backtest_id = save_backtest_result(db, result)
             
             # Return backtest result
             result['_id'] = str(backtest_id)
+            if cache_key is not None:
+                backtest_cache.put(cache_key, backtest_id, result)
+            return respond(result)
+        except FormatNotAvailable as e:
+            return jsonify({"error": str(e)}), 406
+        except Exception as e:
+            return jsonify({"error": str(e)}), 400
+    
+    @app.route('/api/backtest/sweep', methods=['POST'])
+    def backtest_sweep():
+        """Run a backtest for every combination of grid parameters"""
+        data = request.json
+        
+        required_fields = ['start_date', 'end_date']
+        for field in required_fields:
+            if field not in data:
+                return jsonify({"error": f"Missing required field: {field}"}), 400
+        
+        from bson.objectid import ObjectId
+        
+        try:
+            # Symbol, investment and default ranges come from the strategy if given
+            defaults = {}
+            if 'strategy_id' in data:
+                strategy = db.strategies.find_one(
+                    {"_id": ObjectId(data['strategy_id'])},
+                    {"symbol": 1, "investment_amount": 1, "upper_price": 1, "lower_price": 1, "num_grids": 1}
+                )
+                if not strategy:
+                    return jsonify({"error": "Strategy not found"}), 404
+                defaults = strategy
+            
+            symbol = data.get('symbol', defaults.get('symbol'))
+            investment_amount = data.get('investment_amount', defaults.get('investment_amount'))
+            param_ranges = {
+                name: data.get(name, defaults.get(name))
+                for name in ('upper_price', 'lower_price', 'num_grids')
+            }
+            
+            for field, value in [('symbol', symbol), ('investment_amount', investment_amount)] + list(param_ranges.items()):
+                if value is None:
+                    return jsonify({"error": f"Missing required field: {field}"}), 400
+            
+            # Validate the ranges up front so a streamed response never starts on bad input
+            build_parameter_grid(**param_ranges)
+            
+            engine = data.get('engine', 'vectorized')
+            max_workers = requested_pool_workers(data)
+            fill_model = FillModel.from_dict(data.get('fill_model'))
+            
+            if data.get('stream'):
+                def generate():
+                    try:
+                        for row in iter_parameter_sweep(symbol, investment_amount, data['start_date'],
+                                                        data['end_date'], param_ranges,
+                                                        engine=engine, max_workers=max_workers,
+                                                        fill_model=fill_model):
+                            yield json.dumps(row) + "\n"
+                    except Exception as e:
+                        yield json.dumps({"error": str(e)}) + "\n"
+                
+                return Response(generate(), mimetype='application/x-ndjson')
+            
+            rank_by = data.get('rank_by', 'total_return')
+            results = run_parameter_sweep(
+                symbol,
+                investment_amount,
+                data['start_date'],
+                data['end_date'],
+                param_ranges,
+                rank_by=rank_by,
+                engine=engine,
+                max_workers=max_workers,
+                fill_model=fill_model
+            )
+            
+            return jsonify({
+                "symbol": symbol,
+                "rank_by": rank_by,
+                "count": len(results),
+                "results": results
+            })
+        except Exception as e:
+            return jsonify({"error": str(e)}), 400
+    
+    @app.route('/api/backtest/walk-forward', methods=['POST'])
+    def backtest_walk_forward():
+        """Optimize grid parameters on rolling train windows and trade them out of sample"""
+        data = request.json
+        
+        required_fields = ['start_date', 'end_date', 'train_bars', 'test_bars', 'num_grids']
+        for field in required_fields:
+            if field not in data:
+                return jsonify({"error": f"Missing required field: {field}"}), 400
+        
+        from bson.objectid import ObjectId
+        
+        try:
+            # Symbol and investment come from the strategy if given
+            defaults = {}
+            if 'strategy_id' in data:
+                strategy = db.strategies.find_one(
+                    {"_id": ObjectId(data['strategy_id'])},
+                    {"symbol": 1, "investment_amount": 1}
+                )
+                if not strategy:
+                    return jsonify({"error": "Strategy not found"}), 404
+                defaults = strategy
+            
+            symbol = data.get('symbol', defaults.get('symbol'))
+            investment_amount = data.get('investment_amount', defaults.get('investment_amount'))
+            for field, value in [('symbol', symbol), ('investment_amount', investment_amount)]:
+                if value is None:
+                    return jsonify({"error": f"Missing required field: {field}"}), 400
+            
+            # Bounds are absolute prices or offsets from each train window's high/low
+            param_space = {
+                name: data[name]
+                for name in ('upper_price', 'lower_price', 'upper_pct', 'lower_pct', 'num_grids')
+                if name in data
+            }
+            
+            result = run_walk_forward(
+                symbol,
+                investment_amount,
+                data['start_date'],
+                data['end_date'],
+                data['train_bars'],
+                data['test_bars'],
+                param_space,
+                rank_by=data.get('rank_by', 'total_return'),
+                max_workers=requested_pool_workers(data),
+                fill_model=FillModel.from_dict(data.get('fill_model'))
+            )
+            
+            return jsonify(result)
+        except Exception as e:
+            return jsonify({"error": str(e)}), 400
+    
+    @app.route('/api/backtest/monte-carlo', methods=['POST'])
+    def backtest_monte_carlo():
+        """Backtest a strategy on synthetic price paths built from its history"""
+        data = request.json
+        
+        required_fields = ['strategy_id', 'start_date', 'end_date']
+        for field in required_fields:
+            if field not in data:
+                return jsonify({"error": f"Missing required field: {field}"}), 400
+        
+        from bson.objectid import ObjectId
+        
+        try:
+            strategy = db.strategies.find_one({"_id": ObjectId(data['strategy_id'])})
+            if not strategy:
+                return jsonify({"error": "Strategy not found"}), 404
+            
+            result = run_monte_carlo(
+                strategy,
+                data['start_date'],
+                data['end_date'],
+                num_paths=data.get('num_paths', 1000),
+                method=data.get('method', 'bootstrap'),
+                block_bars=data.get('block_bars', DEFAULT_BLOCK_BARS),
+                seed=data.get('seed'),
+                max_workers=requested_pool_workers(data),
+                fill_model=FillModel.from_dict(data.get('fill_model'))
+            )
+            
+            return jsonify(result)
+        except Exception as e:
+            return jsonify({"error": str(e)}), 400
+    
+    @app.route('/api/backtest/portfolio', methods=['POST'])
+    def backtest_portfolio():
+        """Run a combined backtest over several strategies"""
+        data = request.json
+        
+        required_fields = ['strategy_ids', 'start_date', 'end_date']
+        for field in required_fields:
+            if field not in data:
+                return jsonify({"error": f"Missing required field: {field}"}), 400
+        
+        from bson.objectid import ObjectId
+        
+        try:
+            strategy_ids = [ObjectId(strategy_id) for strategy_id in data['strategy_ids']]
+            found = {strategy["_id"]: strategy for strategy in db.strategies.find({"_id": {"$in": strategy_ids}})}
+            
+            missing = [str(strategy_id) for strategy_id in strategy_ids if strategy_id not in found]
+            if missing:
+                return jsonify({"error": f"Strategies not found: {', '.join(missing)}"}), 404
+            
+            result = run_portfolio_backtest(
+                [found[strategy_id] for strategy_id in strategy_ids],
+                data['start_date'],
+                data['end_date'],
+                engine=data.get('engine', 'vectorized'),
+                max_workers=requested_pool_workers(data),
+                fill_model=FillModel.from_dict(data.get('fill_model'))
+            )
+            
             return jsonify(result)
         except Exception as e:
             return jsonify({"error": str(e)}), 400
     
+    @app.route('/api/backtest/jobs', methods=['POST'])
+    def submit_backtest_job():
+        """Submit a backtest to run in the background"""
+        data = request.json
+        
+        required_fields = ['strategy_id', 'start_date', 'end_date']
+        for field in required_fields:
+            if field not in data:
+                return jsonify({"error": f"Missing required field: {field}"}), 400
+        
+        from bson.objectid import ObjectId
+        
+        try:
+            strategy = db.strategies.find_one({"_id": ObjectId(data['strategy_id'])})
+            if not strategy:
+                return jsonify({"error": "Strategy not found"}), 404
+            
+            job, deduplicated = job_queue.submit(
+                strategy,
+                data['start_date'],
+                data['end_date'],
+                engine=data.get('engine', 'loop'),
+                interval=data.get('interval', '1m'),
+                fill_model=FillModel.from_dict(data.get('fill_model'))
+            )
+            job["deduplicated"] = deduplicated
+            
+            return jsonify(job), 202
+        except Exception as e:
+            return jsonify({"error": str(e)}), 400
+    
+    @app.route('/api/backtest/jobs/<job_id>', methods=['GET'])
+    def get_backtest_job(job_id):
+        """Get the status and progress of a backtest job"""
+        job = job_queue.get(job_id)
+        if job is None:
+            return jsonify({"error": "Job not found"}), 404
+        
+        return jsonify(job)
+    
+    @app.route('/api/backtest/jobs/<job_id>', methods=['DELETE'])
+    def cancel_backtest_job(job_id):
+        """Cancel a queued or running backtest job"""
+        job = job_queue.cancel(job_id)
+        if job is None:
+            return jsonify({"error": "Job not found"}), 404
+        
+        return jsonify(job)
+    
+    @app.route('/api/backtest/jobs/<job_id>/result', methods=['GET'])
+    def get_backtest_job_result(job_id):
+        """Get the result of a finished backtest job"""
+        job = job_queue.get(job_id)
+        if job is None:
+            return jsonify({"error": "Job not found"}), 404
+        
+        if job["status"] != "done":
+            return jsonify({"error": f"Job is {job['status']}", "job": job}), 409
+        
+        try:
+            backtest = load_backtest_result(
+                db,
+                job["backtest_id"],
+                view=request.args.get('view', 'full'),
+                start=request.args.get('start'),
+                end=request.args.get('end'),
+                points=request.args.get('points', type=int)
+            )
+            if not backtest:
+                return jsonify({"error": "Backtest not found"}), 404
+            
+            return jsonify(backtest)
+        except Exception as e:
+            return jsonify({"error": str(e)}), 400
+    
     @app.route('/api/backtest/<backtest_id>', methods=['GET'])
     def get_backtest(backtest_id):
-        """Get a backtest result by ID"""
-        from bson.objectid import ObjectId
+        """
+        Get a backtest result by ID, optionally as a summary, date range or downsampled series
+        
+        format=columnar (or msgpack) returns the daily values and trades as
+        {"columns", "data"}, encoded straight from the stored column arrays.
+        """
+        view = request.args.get('view', 'full')
+        start = request.args.get('start')
+        end = request.args.get('end')
+        points = request.args.get('points', type=int)
         
         try:
-            backtest = db.backtests.find_one({"_id": ObjectId(backtest_id)})
+            response_format = get_response_format(request)
+            layout = 'columns' if response_format in ('columnar', 'msgpack') else 'records'
+            with span("db.load_backtest"):
+                backtest = load_backtest_result(db, backtest_id, view=view, start=start, end=end,
+                                                points=points, layout=layout)
             if not backtest:
                 return jsonify({"error": "Backtest not found"}), 404
             
-            # Convert ObjectId to string for JSON serialization
-            backtest["_id"] = str(backtest["_id"])
+            with span("response.encode"):
+                return encode_response(backtest, response_format if layout == 'columns' else 'json')
+        except FormatNotAvailable as e:
+            return jsonify({"error": str(e)}), 406
+        except Exception as e:
+            return jsonify({"error": str(e)}), 400
+    
+    @app.route('/api/backtest/<backtest_id>/chart', methods=['GET'])
+    def get_backtest_chart(backtest_id):
+        """
+        Get the daily values of a backtest downsampled to a point count for charting
+        
+        method=lttb (the default) or minmax keep the shape of the portfolio
+        value. Pass start and end to get the visible range of a zoomed chart
+        at full screen resolution. Stored results never change, so each
+        (backtest, range, resolution) is downsampled once.
+        """
+        start = request.args.get('start')
+        end = request.args.get('end')
+        points = request.args.get('points', DEFAULT_CHART_POINTS, type=int)
+        method = request.args.get('method', 'lttb')
+        
+        try:
+            response_format = get_response_format(request)
             
-            return jsonify(backtest)
+            def compute():
+                with span("chart.downsample"):
+                    return load_backtest_chart(db, backtest_id, start=start, end=end, points=points, method=method)
+            
+            payload = chart_cache.get_or_compute(("backtest", backtest_id, start, end, points, method), compute)
+            if payload is None:
+                return jsonify({"error": "Backtest not found"}), 404
+            with span("response.encode"):
+                return encode_response(payload, response_format)
+        except FormatNotAvailable as e:
+            return jsonify({"error": str(e)}), 406
+        except Exception as e:
+            return jsonify({"error": str(e)}), 400
+    
+    @app.route('/api/backtest/<backtest_id>/series', methods=['GET'])
+    def get_backtest_series(backtest_id):
+        """Stream the daily values or trades of a backtest as chunked JSON or NDJSON"""
+        kind = request.args.get('kind', 'daily_values')
+        start = request.args.get('start')
+        end = request.args.get('end')
+        
+        try:
+            # Series are only streamed as JSON rows; an Accept header asking for
+            # MessagePack gets chunked JSON like any other client
+            if request.args.get('format') in ('columnar', 'msgpack'):
+                return jsonify({"error": "Backtest series are streamed as json, ndjson or chunked"}), 400
+            response_format = get_response_format(request)
+            records = iter_backtest_records(db, backtest_id, kind, start=start, end=end)
+            if records is None:
+                return jsonify({"error": "Backtest not found"}), 404
+            
+            envelope = {"backtest_id": backtest_id, "kind": kind}
+            return stream_rows(records, 'ndjson' if response_format == 'ndjson' else 'chunked', envelope)
         except Exception as e:
             return jsonify({"error": str(e)}), 400
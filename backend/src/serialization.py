@@ -0,0 +1,235 @@
+import json
+import math
+import numpy as np
+from bson.objectid import ObjectId
+from src.lazy import lazy_import
+
+pd = lazy_import("pandas")
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+# Response formats accepted by routes that serve large payloads
+RESPONSE_FORMATS = ("json", "columnar", "msgpack", "ndjson", "chunked")
+
+# Formats that stream rows instead of building one document
+STREAMING_FORMATS = ("ndjson", "chunked")
+
+# Accept header media types mapped to response formats
+ACCEPT_FORMATS = (
+    ("application/x-msgpack", "msgpack"),
+    ("application/msgpack", "msgpack"),
+    ("application/x-ndjson", "ndjson")
+)
+
+# Date formats rendered with np.datetime_as_string instead of strftime
+FAST_DATE_FORMATS = {
+    '%Y-%m-%d %H:%M:%S': ("s", 19),
+    '%Y-%m-%d': ("D", 10)
+}
+
+class FormatNotAvailable(Exception):
+    """Raised when a client explicitly asks for a format whose encoder is not installed"""
+
+def get_response_format(request):
+    """
+    Work out the response format requested by a client
+
+    The format query parameter wins; otherwise the Accept header is used,
+    falling back to JSON when it names a format that cannot be produced.
+
+    Parameters:
+    - request: Flask request
+
+    Returns:
+    - 'json' (row records), 'columnar' ({"columns", "data"} JSON),
+      'msgpack' (columnar MessagePack), 'ndjson' or 'chunked'
+    """
+    response_format = request.args.get("format")
+    if response_format is not None:
+        if response_format not in RESPONSE_FORMATS:
+            raise ValueError(f"Unknown format: {response_format}")
+        if response_format == "msgpack" and msgpack is None:
+            raise FormatNotAvailable("MessagePack responses need the msgpack package")
+        return response_format
+
+    accept = request.headers.get("Accept", "")
+    for media_type, candidate in ACCEPT_FORMATS:
+        if media_type in accept and (candidate != "msgpack" or msgpack is not None):
+            return candidate
+    return "json"
+
+def dumps(value):
+    """
+    Encode a value as JSON bytes, using orjson when it is installed
+
+    NumPy arrays and scalars are encoded directly; NaN and infinite floats
+    become null with either encoder.
+
+    Parameters:
+    - value: JSON-serializable value (may contain NumPy arrays)
+
+    Returns:
+    - UTF-8 encoded JSON
+    """
+    if orjson is not None:
+        return orjson.dumps(value, default=_to_builtin,
+                            option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+    try:
+        return json.dumps(value, default=_to_builtin, allow_nan=False).encode()
+    except ValueError:
+        # The json module writes NaN and Infinity, which are not JSON; only
+        # documents holding them pay for the copy
+        return json.dumps(_replace_nan(value), default=_to_builtin, allow_nan=False).encode()
+
+def encode_response(payload, response_format="json", status=200):
+    """
+    Build a response from a document in the requested format
+
+    Parameters:
+    - payload: Document to send
+    - response_format: 'json', 'columnar' or 'msgpack' (the caller lays the
+      document out in columns for the last two)
+    - status: HTTP status code
+
+    Returns:
+    - Flask Response
+    """
+    # Flask is only needed by the web app, not by the backtest code that
+    # shares this module
+    from flask import Response
+
+    if response_format == "msgpack":
+        body = msgpack.packb(payload, default=_to_builtin, use_bin_type=True)
+        return Response(body, status=status, mimetype="application/x-msgpack")
+    return Response(dumps(payload), status=status, mimetype="application/json")
+
+def format_dates(values, date_format='%Y-%m-%d %H:%M:%S'):
+    """
+    Format datetime64 values as strings
+
+    Parameters:
+    - values: Array or Series of datetime64 values
+    - date_format: strftime format
+
+    Returns:
+    - List of date strings
+    """
+    values = np.asarray(values, dtype="datetime64[ns]")
+    if date_format not in FAST_DATE_FORMATS:
+        return pd.DatetimeIndex(values).strftime(date_format).tolist()
+
+    unit, width = FAST_DATE_FORMATS[date_format]
+    strings = np.datetime_as_string(values, unit=unit).astype(f"<U{width}")
+    if unit == "s" and len(strings) > 0:
+        # ISO output separates date and time with 'T'
+        strings.view("<U1").reshape(len(strings), width)[:, 10] = " "
+    return strings.tolist()
+
+def frame_to_columns(frame, date_format='%Y-%m-%d %H:%M:%S', native=True):
+    """
+    Lay out a DataFrame as column arrays
+
+    Parameters:
+    - frame: DataFrame with a Date column
+    - date_format: strftime format for the Date column
+    - native: Keep numeric columns as NumPy arrays (for dumps) instead of lists
+
+    Returns:
+    - Dict with "columns" (names) and "data" (one array or list per column)
+    """
+    names = list(frame.columns)
+    data = []
+    for name in names:
+        column = frame[name]
+        if pd.api.types.is_datetime64_any_dtype(column):
+            data.append(format_dates(column.to_numpy(), date_format))
+        elif native and orjson is not None and pd.api.types.is_numeric_dtype(column):
+            data.append(column.to_numpy())
+        else:
+            data.append(_column_list(column.to_numpy()))
+    return {"columns": names, "data": data}
+
+def frame_to_records(frame, date_format='%Y-%m-%d %H:%M:%S'):
+    """
+    Convert a DataFrame to row dicts without going through to_dict('records')
+
+    Parameters:
+    - frame: DataFrame with a Date column
+    - date_format: strftime format for the Date column
+
+    Returns:
+    - List of row dicts with dates as strings and NaN as None
+    """
+    columns = frame_to_columns(frame, date_format, native=False)
+    names = columns["columns"]
+    return [dict(zip(names, row)) for row in zip(*columns["data"])]
+
+def records_to_columns(records):
+    """
+    Lay out a list of row dicts as columns
+
+    Parameters:
+    - records: List of dicts (keys may differ between rows)
+
+    Returns:
+    - Dict with "columns" (names, in first-seen order) and "data" (one list per column)
+    """
+    names = list(dict.fromkeys(name for record in records for name in record))
+    return {"columns": names, "data": [[record.get(name) for record in records] for name in names]}
+
+def records_to_columns_in(document, keys):
+    """
+    Copy a document with the row lists under some keys laid out as columns
+
+    Parameters:
+    - document: Dict holding lists of row dicts
+    - keys: Keys whose lists to convert (missing keys are skipped)
+
+    Returns:
+    - New dict with {"columns", "data"} in place of those lists
+    """
+    converted = dict(document)
+    for key in keys:
+        if isinstance(converted.get(key), list):
+            converted[key] = records_to_columns(converted[key])
+    return converted
+
+def _column_list(values):
+    if values.dtype.kind == "f":
+        missing = np.isnan(values)
+        if missing.any():
+            values = values.astype(object)
+            values[missing] = None
+    return values.tolist()
+
+def _replace_nan(value):
+    if isinstance(value, float):
+        return None if math.isnan(value) or math.isinf(value) else value
+    if isinstance(value, dict):
+        return {key: _replace_nan(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_replace_nan(item) for item in value]
+    if isinstance(value, np.ndarray):
+        return _replace_nan(_column_list(value))
+    return value
+
+def _to_builtin(value):
+    if isinstance(value, np.ndarray):
+        return _column_list(value)
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, (pd.Timestamp, np.datetime64)):
+        return str(value)
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    if isinstance(value, ObjectId):
+        return str(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not serializable")
@@ -0,0 +1,108 @@
+import logging
+from flask import Response
+from src.serialization import dumps, frame_to_records
+
+# Bars read and converted to Python objects at a time when streaming prices
+STREAM_CHUNK_ROWS = 1000
+
+logger = logging.getLogger(__name__)
+
+def iter_frame_records(frames, date_format='%Y-%m-%d %H:%M:%S'):
+    """
+    Yield the rows of a stream of price DataFrame chunks as JSON-serializable dicts
+
+    Only one chunk is held at a time, so memory stays flat however many bars
+    are streamed.
+
+    Parameters:
+    - frames: Iterable of DataFrames with a Date column (e.g., from iter_price_history)
+    - date_format: strftime format for the Date column
+
+    Returns:
+    - Generator of row dicts
+    """
+    for frame in frames:
+        for record in frame_to_records(frame, date_format):
+            yield record
+
+def ndjson_response(rows):
+    """
+    Stream rows as newline-delimited JSON
+
+    The status is sent before the first row, so a failure while streaming
+    ends the response with an {"error": ...} line instead.
+
+    Parameters:
+    - rows: Iterable of JSON-serializable rows
+
+    Returns:
+    - Flask streaming Response
+    """
+    def generate():
+        try:
+            for row in rows:
+                yield dumps(row) + b"\n"
+        except Exception as e:
+            logger.exception("NDJSON stream failed")
+            yield dumps({"error": str(e)}) + b"\n"
+
+    return Response(generate(), mimetype="application/x-ndjson")
+
+def chunked_json_response(rows, envelope=None, key="data"):
+    """
+    Stream a JSON array (optionally inside an envelope object) row by row
+
+    Parameters:
+    - rows: Iterable of JSON-serializable rows
+    - envelope: Dict of fields to put around the array, or None for a bare array
+    - key: Envelope field that holds the array
+
+    Returns:
+    - Flask streaming Response with the same body a non-streamed response
+      would have; if the rows fail part way, the document is still closed
+      and carries an "error" field (or, for a bare array, ends with an
+      {"error": ...} row)
+    """
+    def generate():
+        if envelope is not None:
+            # Open the envelope object and its array, closed again at the end
+            head = dumps(envelope)[:-1]
+            yield head + (b"," if envelope else b"") + dumps(key) + b":["
+        else:
+            yield b"["
+
+        first = True
+        error = None
+        try:
+            for row in rows:
+                yield (b"" if first else b",") + dumps(row)
+                first = False
+        except Exception as e:
+            logger.exception("Chunked JSON stream failed")
+            error = {"error": str(e)}
+
+        if envelope is not None:
+            yield b"]" + (b"," + dumps(error)[1:] if error else b"}")
+        elif error is not None:
+            yield (b"" if first else b",") + dumps(error) + b"]"
+        else:
+            yield b"]"
+
+    return Response(generate(), mimetype="application/json")
+
+def stream_rows(rows, response_format, envelope=None, key="data"):
+    """
+    Build a streaming response in the requested format
+
+    Parameters:
+    - rows: Iterable of JSON-serializable rows
+    - response_format: 'ndjson' or 'chunked'
+    - envelope: Envelope fields for the chunked format
+    - key: Envelope field that holds the rows
+
+    Returns:
+    - Flask streaming Response
+    """
+    if response_format == "ndjson":
+        return ndjson_response(rows)
+    return chunked_json_response(rows, envelope, key)
@@ -0,0 +1,244 @@
+import itertools
+import math
+import os
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+from src.backtest import run_backtest, load_backtest_data
+from src.grid_trading import calculate_grid_levels
+from src.lazy import lazy_import
+
+pd = lazy_import("pandas")
+
+# Upper bound on combinations a single sweep may run
+MAX_SWEEP_COMBINATIONS = 10000
+
+# Metrics where a smaller value ranks higher
+ASCENDING_METRICS = ("max_drawdown", "max_drawdown_pct")
+
+# Price data attached once per worker process by _init_worker
+_worker_state = {}
+
+def pool_workers(max_workers, tasks):
+    """
+    Get the number of worker processes to start for a batch of tasks
+
+    Parameters:
+    - max_workers: Requested number of processes (None for the CPU count)
+    - tasks: Number of tasks
+
+    Returns:
+    - Requested count capped at the CPU count and the number of tasks (at least 1)
+    """
+    cpus = os.cpu_count() or 1
+    return max(1, min(int(max_workers or cpus), cpus, tasks))
+
+def expand_range(spec, cast=float):
+    """
+    Expand a parameter range spec into a list of values
+
+    Parameters:
+    - spec: A single value, a list of values, or a dict with start, stop
+      and step (stop is inclusive)
+    - cast: Type to convert each value to
+
+    Returns:
+    - List of parameter values
+    """
+    if isinstance(spec, dict):
+        start = float(spec["start"])
+        stop = float(spec["stop"])
+        step = float(spec.get("step", 1))
+        if step <= 0:
+            raise ValueError("Range step must be positive")
+        values = np.arange(start, stop + step / 2, step)
+        return [cast(round(value, 10)) for value in values]
+    if isinstance(spec, (list, tuple)):
+        return [cast(value) for value in spec]
+    return [cast(spec)]
+
+def build_parameter_grid(upper_price, lower_price, num_grids):
+    """
+    Build all valid (upper_price, lower_price, num_grids) combinations
+
+    Parameters:
+    - upper_price: Range spec for the upper price boundary
+    - lower_price: Range spec for the lower price boundary
+    - num_grids: Range spec for the number of grid levels
+
+    Returns:
+    - List of parameter dicts
+    """
+    combinations = [
+        {"upper_price": upper, "lower_price": lower, "num_grids": grids}
+        for upper, lower, grids in itertools.product(
+            expand_range(upper_price),
+            expand_range(lower_price),
+            expand_range(num_grids, cast=int)
+        )
+        if upper > lower and grids >= 2
+    ]
+
+    if len(combinations) == 0:
+        raise ValueError("Parameter ranges produce no valid grid")
+    if len(combinations) > MAX_SWEEP_COMBINATIONS:
+        raise ValueError(f"Sweep has {len(combinations)} combinations, the limit is {MAX_SWEEP_COMBINATIONS}")
+
+    return combinations
+
+def iter_parameter_sweep(symbol, investment_amount, start_date, end_date, param_ranges,
+                         engine="vectorized", max_workers=None, fill_model=None):
+    """
+    Run a backtest for every parameter combination, yielding results as they finish
+
+    The price series is loaded once and written to a temporary .npy file that
+    every worker memory-maps, so workers share the same pages instead of each
+    receiving a pickled copy.
+
+    Parameters:
+    - symbol: Stock symbol
+    - investment_amount: Total investment amount
+    - start_date: Start date for backtest (YYYY-MM-DD)
+    - end_date: End date for backtest (YYYY-MM-DD)
+    - param_ranges: Dict with upper_price, lower_price and num_grids range specs
+    - engine: Simulation engine passed to run_backtest
+    - max_workers: Number of worker processes (defaults to and is capped at the CPU count, 1 runs in-process)
+    - fill_model: Optional FillModel applied to every backtest
+
+    Returns:
+    - Generator of result rows with the parameters and performance metrics
+    """
+    combinations = build_parameter_grid(
+        param_ranges["upper_price"],
+        param_ranges["lower_price"],
+        param_ranges["num_grids"]
+    )
+    backtest_data = load_backtest_data(symbol, start_date, end_date)
+    settings = {
+        "symbol": symbol,
+        "investment_amount": float(investment_amount),
+        "start_date": start_date,
+        "end_date": end_date,
+        "engine": engine,
+        "fill_model": fill_model
+    }
+
+    max_workers = pool_workers(max_workers, len(combinations))
+    if max_workers == 1:
+        state = dict(settings, backtest_data=backtest_data)
+        for params in combinations:
+            yield _run_combination(params, state)
+        return
+
+    shared_dir = tempfile.mkdtemp(prefix="grid_sweep_")
+    try:
+        prices_path = os.path.join(shared_dir, "prices.npy")
+        dates_path = os.path.join(shared_dir, "dates.npy")
+        np.save(prices_path, backtest_data[["High", "Low", "Close"]].to_numpy(dtype=np.float64).T.copy())
+        np.save(dates_path, backtest_data["Date"].to_numpy(dtype="datetime64[ns]"))
+
+        with ProcessPoolExecutor(max_workers=max_workers,
+                                 initializer=_init_worker,
+                                 initargs=(prices_path, dates_path, settings)) as executor:
+            futures = [executor.submit(_run_combination, params) for params in combinations]
+            try:
+                for future in as_completed(futures):
+                    yield future.result()
+            finally:
+                for future in futures:
+                    future.cancel()
+    finally:
+        shutil.rmtree(shared_dir, ignore_errors=True)
+
+def run_parameter_sweep(symbol, investment_amount, start_date, end_date, param_ranges,
+                        rank_by="total_return", engine="vectorized", max_workers=None, fill_model=None):
+    """
+    Run a parameter sweep and rank the combinations by a performance metric
+
+    Parameters:
+    - symbol: Stock symbol
+    - investment_amount: Total investment amount
+    - start_date: Start date for backtest (YYYY-MM-DD)
+    - end_date: End date for backtest (YYYY-MM-DD)
+    - param_ranges: Dict with upper_price, lower_price and num_grids range specs
+    - rank_by: Metric from calculate_performance_metrics to rank by
+    - engine: Simulation engine passed to run_backtest
+    - max_workers: Number of worker processes
+    - fill_model: Optional FillModel applied to every backtest
+
+    Returns:
+    - List of result rows, best first, each with a rank
+    """
+    results = list(iter_parameter_sweep(
+        symbol, investment_amount, start_date, end_date, param_ranges,
+        engine=engine, max_workers=max_workers, fill_model=fill_model
+    ))
+    return rank_results(results, rank_by)
+
+def rank_results(results, rank_by="total_return"):
+    """
+    Sort sweep result rows by a metric and number them
+
+    Parameters:
+    - results: List of result rows
+    - rank_by: Metric to rank by (drawdowns rank smallest first, others largest first)
+
+    Returns:
+    - Sorted list of result rows with a rank field
+    """
+    if results and rank_by not in results[0]:
+        raise ValueError(f"Unknown metric to rank by: {rank_by}")
+
+    ascending = rank_by in ASCENDING_METRICS
+
+    def sort_key(row):
+        value = row[rank_by]
+        # Rows with an undefined metric (e.g. NaN Sharpe) go last
+        if value is None or (isinstance(value, float) and math.isnan(value)):
+            return (1, 0)
+        return (0, value if ascending else -value)
+
+    ranked = sorted(results, key=sort_key)
+    for rank, row in enumerate(ranked, start=1):
+        row["rank"] = rank
+    return ranked
+
+def _init_worker(prices_path, dates_path, settings):
+    # The frame's columns stay views of the memory-mapped files (one float
+    # block over the shared price array), so workers share the pages
+    # instead of each holding a copy
+    prices = np.load(prices_path, mmap_mode="r")
+    dates = np.load(dates_path, mmap_mode="r")
+    backtest_data = pd.DataFrame(prices.T, columns=["High", "Low", "Close"], copy=False)
+    backtest_data.insert(0, "Date", pd.Series(np.asarray(dates), copy=False))
+    _worker_state.update(settings, backtest_data=backtest_data)
+
+def _run_combination(params, state=None):
+    state = state if state is not None else _worker_state
+    grid_levels = calculate_grid_levels(params["upper_price"], params["lower_price"], params["num_grids"])
+    strategy = {
+        "symbol": state["symbol"],
+        "upper_price": params["upper_price"],
+        "lower_price": params["lower_price"],
+        "num_grids": params["num_grids"],
+        "investment_amount": state["investment_amount"],
+        "grid_levels": grid_levels
+    }
+    result = run_backtest(
+        strategy,
+        state["start_date"],
+        state["end_date"],
+        engine=state["engine"],
+        backtest_data=state["backtest_data"],
+        fill_model=state["fill_model"]
+    )
+
+    row = dict(params)
+    row.update({key: _to_python(value) for key, value in result["metrics"].items()})
+    return row
+
+def _to_python(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
@@ -0,0 +1,332 @@
+import contextvars
+import functools
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+
+# Prefix of every exported metric name
+METRIC_PREFIX = "gridtrade_"
+
+# Upper bounds in seconds of the latency histogram buckets
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Request header asking for a per-request profile
+PROFILE_HEADER = "X-Debug-Profile"
+
+# Spans recorded per profiled request (totals in Server-Timing cover all spans)
+MAX_PROFILE_SPANS = 200
+
+# Size limit of the X-Profile header; proxies and servers commonly reject
+# requests or responses whose headers add up to more than 8 KB
+MAX_PROFILE_HEADER_BYTES = 4096
+
+class Histogram:
+    """Cumulative latency histogram with fixed buckets"""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        """
+        Parameters:
+        - buckets: Sorted bucket upper bounds (a +Inf bucket is added)
+        """
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        """Record one observation"""
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+class Registry:
+    """
+    Process-wide counters and histograms, rendered in the Prometheus text format
+
+    Metrics are created on first use and identified by name plus labels.
+    Worker processes (sweeps, portfolio backtests) keep their own registries,
+    so only work done in the serving process is reported.
+    """
+
+    def __init__(self):
+        self._counters = {}
+        self._histograms = {}
+        self._help = {}
+        self._lock = threading.Lock()
+
+    def describe(self, name, help_text):
+        """Set the HELP text of a metric"""
+        self._help[name] = help_text
+
+    def inc(self, name, value=1, labels=None):
+        """
+        Increase a counter
+
+        Parameters:
+        - name: Metric name (without prefix)
+        - value: Amount to add
+        - labels: Optional dict of label names to values
+        """
+        key = (name, _label_key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, value, labels=None):
+        """
+        Record a value in a histogram
+
+        Parameters:
+        - name: Metric name (without prefix)
+        - value: Observed value in seconds
+        - labels: Optional dict of label names to values
+        """
+        key = (name, _label_key(labels))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.observe(value)
+
+    def clear(self):
+        """Reset every metric"""
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def render(self):
+        """
+        Render all metrics in the Prometheus text exposition format
+
+        Returns:
+        - Metrics text
+        """
+        lines = []
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted((key, (histogram.buckets, list(histogram.counts), histogram.sum, histogram.count))
+                                for key, histogram in self._histograms.items())
+
+        previous = None
+        for (name, labels), value in counters:
+            if name != previous:
+                lines.extend(self._header(name, "counter"))
+                previous = name
+            lines.append(f"{METRIC_PREFIX}{name}{_format_labels(labels)} {_format_value(value)}")
+
+        for (name, labels), (buckets, counts, total, count) in histograms:
+            if name != previous:
+                lines.extend(self._header(name, "histogram"))
+                previous = name
+            cumulative = 0
+            for bound, bucket_count in zip(buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = "+Inf" if bound == float("inf") else _format_value(bound)
+                lines.append(f"{METRIC_PREFIX}{name}_bucket{_format_labels(labels + (('le', le),))} {cumulative}")
+            lines.append(f"{METRIC_PREFIX}{name}_sum{_format_labels(labels)} {_format_value(total)}")
+            lines.append(f"{METRIC_PREFIX}{name}_count{_format_labels(labels)} {count}")
+
+        return "\n".join(lines) + "\n"
+
+    def _header(self, name, kind):
+        header = []
+        if name in self._help:
+            header.append(f"# HELP {METRIC_PREFIX}{name} {self._help[name]}")
+        header.append(f"# TYPE {METRIC_PREFIX}{name} {kind}")
+        return header
+
+class _Span:
+    __slots__ = ("name", "started", "profile", "depth")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.profile = _profile.get()
+        if self.profile is not None:
+            self.depth = self.profile["depth"]
+            self.profile["depth"] += 1
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        duration = time.perf_counter() - self.started
+        registry.observe("span_seconds", duration, {"span": self.name})
+        profile = self.profile
+        if profile is not None:
+            profile["depth"] -= 1
+            totals = profile["totals"]
+            totals[self.name] = totals.get(self.name, 0.0) + duration
+            if len(profile["spans"]) < MAX_PROFILE_SPANS:
+                profile["spans"].append({
+                    "name": self.name,
+                    "depth": self.depth,
+                    "start_ms": round((self.started - profile["started"]) * 1000, 3),
+                    "duration_ms": round(duration * 1000, 3)
+                })
+            else:
+                profile["dropped"] += 1
+        return False
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+_NULL_SPAN = _NullSpan()
+
+registry = Registry()
+registry.describe("span_seconds", "Time spent in instrumented code sections")
+registry.describe("http_request_duration_seconds", "API request latency by endpoint")
+registry.describe("bars_simulated_total", "Price bars simulated by backtests")
+registry.describe("trades_emitted_total", "Trades produced by backtests")
+registry.describe("backtest_cache_lookups_total", "Backtest cache lookups by result")
+registry.describe("quotes_total", "Current-price quotes by source")
+
+_enabled = os.environ.get("TELEMETRY_ENABLED", "1").lower() not in ("0", "false", "no")
+_profile = contextvars.ContextVar("telemetry_profile", default=None)
+
+def enabled():
+    """Whether spans and counters are being recorded"""
+    return _enabled
+
+def set_enabled(flag):
+    """Turn recording of spans and counters on or off"""
+    global _enabled
+    _enabled = bool(flag)
+
+def span(name):
+    """
+    Time a block of code
+
+    Parameters:
+    - name: Span name (e.g., 'backtest.simulate')
+
+    Returns:
+    - Context manager recording the block's duration in the span_seconds
+      histogram and in the current request profile, if any
+    """
+    if not _enabled:
+        return _NULL_SPAN
+    return _Span(name)
+
+def timed(name):
+    """
+    Decorator timing every call of a function as a span
+
+    Parameters:
+    - name: Span name
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            with _Span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def count(name, value=1, **labels):
+    """
+    Increase a counter if telemetry is enabled
+
+    Parameters:
+    - name: Counter name (e.g., 'bars_simulated_total')
+    - value: Amount to add
+    - labels: Label names and values
+    """
+    if _enabled:
+        registry.inc(name, value, labels)
+
+def render_metrics():
+    """Render every metric of this process in the Prometheus text format"""
+    return registry.render()
+
+def instrument_app(app):
+    """
+    Record per-endpoint latency for a Flask app and serve request profiles
+
+    When a request carries the X-Debug-Profile header, the spans it runs are
+    collected. The response then gets a Server-Timing header with the total
+    time per span name, and an X-Profile header listing the first spans
+    (name, nesting depth, start and duration in ms) as JSON, up to
+    MAX_PROFILE_HEADER_BYTES. When spans are left out, an X-Profile-Dropped
+    header gives their number.
+
+    Parameters:
+    - app: Flask app
+    """
+    from flask import g, request
+
+    @app.before_request
+    def start_request_timer():
+        if not _enabled:
+            return
+        g.telemetry_started = time.perf_counter()
+        if request.headers.get(PROFILE_HEADER):
+            g.telemetry_profile = {"started": g.telemetry_started, "depth": 0, "spans": [], "totals": {},
+                                   "dropped": 0}
+            g.telemetry_token = _profile.set(g.telemetry_profile)
+
+    @app.after_request
+    def finish_request_timer(response):
+        started = g.pop("telemetry_started", None)
+        if started is None:
+            return response
+        endpoint = request.url_rule.rule if request.url_rule is not None else "unmatched"
+        registry.observe("http_request_duration_seconds", time.perf_counter() - started, {
+            "endpoint": endpoint,
+            "method": request.method,
+            "status": str(response.status_code)
+        })
+
+        profile = g.pop("telemetry_profile", None)
+        if profile is not None:
+            _profile.reset(g.pop("telemetry_token"))
+            response.headers["Server-Timing"] = _server_timing(profile["totals"])
+            header, listed = _profile_header(profile["spans"], MAX_PROFILE_HEADER_BYTES)
+            response.headers["X-Profile"] = header
+            dropped = profile["dropped"] + len(profile["spans"]) - listed
+            if dropped > 0:
+                response.headers["X-Profile-Dropped"] = str(dropped)
+        return response
+
+def _profile_header(spans, max_bytes):
+    # JSON list of the first spans that fit in max_bytes, and their number
+    parts = []
+    size = 2
+    for item in spans:
+        part = json.dumps(item, separators=(",", ":"))
+        size += len(part) + (1 if parts else 0)
+        if size > max_bytes:
+            break
+        parts.append(part)
+    return "[" + ",".join(parts) + "]", len(parts)
+
+def _server_timing(totals):
+    return ", ".join(f"{name.replace('.', '-')};dur={duration * 1000:.3f}" for name, duration in totals.items())
+
+def _label_key(labels):
+    if not labels:
+        return ()
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    escaped = ",".join(
+        f'{name}="' + value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") + '"'
+        for name, value in labels
+    )
+    return "{" + escaped + "}"
+
+def _format_value(value):
+    if isinstance(value, int):
+        return str(value)
+    return repr(float(value))
@@ -0,0 +1,179 @@
+import numpy as np
+from src.fills import FillModel
+
+# Active bars simulated between calls to a progress callback
+PROGRESS_INTERVAL = 1000
+
+def simulate_grid_vectorized(dates, high, low, close, grid_levels, investment_amount, progress=None,
+                             fill_model=None):
+    """
+    Simulate a grid strategy over price bars using array operations
+
+    Which grid levels each bar touched is worked out with np.searchsorted
+    against the sorted level array, so only bars that actually touched a
+    level (and only the levels they touched) are visited when applying
+    fills. Fills follow the same rules and arithmetic as
+    backtest.process_price_movements (sells first in ascending level order,
+    then buys in descending order), so trades and values match the loop
+    engine exactly. Fill model costs use the same arithmetic too: their
+    per-level parts are computed once and each bar's slippage is applied
+    with one multiplication, so costs add almost nothing to the loop (a
+    frictionless model leaves every result unchanged).
+
+    Parameters:
+    - dates: Array of bar dates as 'YYYY-MM-DD' strings
+    - high: Array of bar highs
+    - low: Array of bar lows
+    - close: Array of bar closes
+    - grid_levels: Grid price levels, sorted ascending
+    - investment_amount: Total investment amount (initial cash)
+    - progress: Optional callable progress(bars_done, bars_total)
+    - fill_model: Optional FillModel applied to every order
+
+    Returns:
+    - Dict with columnar "trades" and "daily_values" plus final "cash" and "shares"
+    """
+    high = np.ascontiguousarray(high, dtype=np.float64)
+    low = np.ascontiguousarray(low, dtype=np.float64)
+    close = np.ascontiguousarray(close, dtype=np.float64)
+    levels = np.ascontiguousarray(grid_levels, dtype=np.float64)
+    dates = np.asarray(dates)
+    num_bars = len(close)
+    num_levels = len(levels)
+
+    # Levels touched by bar i are levels[lo[i]:hi[i]]
+    lo = np.searchsorted(levels, low, side="left")
+    hi = np.searchsorted(levels, high, side="right")
+    active_bars = np.flatnonzero(hi > lo)
+
+    # Per-level order sizes, computed once with the loop engine's arithmetic
+    level_list = levels.tolist()
+    grid_allocation = investment_amount / (num_levels - 1)
+    sell_shares = [0.0] + [grid_allocation / price for price in level_list[:-1]]
+    buy_shares = [grid_allocation / price for price in level_list]
+    buy_costs = [shares * price for shares, price in zip(buy_shares, level_list)]
+
+    # Fill model parts of each level's order and slippage factors of each active bar
+    model = fill_model if fill_model is not None else FillModel()
+    sell_prices = [price * (1 - model.fee_pct) for price in level_list]
+    buy_totals = [cost * (1 + model.fee_pct) for cost in buy_costs]
+    buy_fees = [shares * model.fee_per_share for shares in buy_shares]
+    fee_per_share = model.fee_per_share
+    partial_fills = model.partial_fills
+    slippage = model.slippage(high, low)
+    sell_factors = (1 - slippage[active_bars]).tolist()
+    buy_factors = (1 + slippage[active_bars]).tolist()
+
+    trade_bar = []
+    trade_is_sell = []
+    trade_level = []
+    trade_shares = []
+    trade_amount = []
+
+    cash = investment_amount
+    shares = 0
+    post_cash = np.empty(len(active_bars), dtype=np.float64)
+    post_shares = np.empty(len(active_bars), dtype=np.float64)
+
+    for n, (bar, first, last) in enumerate(zip(active_bars.tolist(),
+                                               lo[active_bars].tolist(),
+                                               hi[active_bars].tolist())):
+        if progress is not None and n % PROGRESS_INTERVAL == 0:
+            progress(bar, num_bars)
+
+        # Sells: touched levels above the bottom one, ascending
+        for level in range(max(first, 1), last):
+            quantity = sell_shares[level]
+            if shares < quantity:
+                quantity = shares
+            if quantity > 0:
+                # Net price per share floored at 0, as in FillModel.sell_proceeds
+                net_price = sell_prices[level] * sell_factors[n] - fee_per_share
+                amount = quantity * ((net_price + abs(net_price)) / 2)
+                cash += amount
+                shares -= quantity
+                trade_bar.append(bar)
+                trade_is_sell.append(True)
+                trade_level.append(level)
+                trade_shares.append(quantity)
+                trade_amount.append(amount)
+
+        # Buys: touched levels below the top one, descending
+        for level in range(min(last, num_levels - 1) - 1, first - 1, -1):
+            cost = buy_totals[level] * buy_factors[n] + buy_fees[level]
+            quantity = buy_shares[level]
+            if cost > cash and partial_fills and cash > 0:
+                # Buy what the cash covers
+                quantity = model.affordable_shares(cash, level_list[level], slippage[bar])
+                cost = cash
+            if cost <= cash:
+                cash -= cost
+                shares += quantity
+                trade_bar.append(bar)
+                trade_is_sell.append(False)
+                trade_level.append(level)
+                trade_shares.append(quantity)
+                trade_amount.append(cost)
+
+        post_cash[n] = cash
+        post_shares[n] = shares
+
+    if progress is not None:
+        progress(num_bars, num_bars)
+
+    # Carry the state after each active bar forward to the following bars
+    daily_cash = np.full(num_bars, investment_amount, dtype=np.float64)
+    daily_shares = np.zeros(num_bars, dtype=np.float64)
+    if len(active_bars) > 0:
+        last_active = np.searchsorted(active_bars, np.arange(num_bars), side="right") - 1
+        has_state = last_active >= 0
+        daily_cash[has_state] = post_cash[last_active[has_state]]
+        daily_shares[has_state] = post_shares[last_active[has_state]]
+    daily_value = daily_cash + daily_shares * close
+
+    trade_bar = np.asarray(trade_bar, dtype=np.int64)
+    trade_is_sell = np.asarray(trade_is_sell, dtype=bool)
+    trade_level = np.asarray(trade_level, dtype=np.int32)
+    trade_shares = np.asarray(trade_shares, dtype=np.float64)
+    trade_price = np.where(trade_is_sell,
+                           model.fill_price(levels[trade_level], slippage[trade_bar], "sell"),
+                           model.fill_price(levels[trade_level], slippage[trade_bar], "buy"))
+    trades = {
+        "date": dates[trade_bar],
+        "type": np.where(trade_is_sell, "sell", "buy"),
+        "price": trade_price,
+        "shares": trade_shares,
+        "amount": np.asarray(trade_amount, dtype=np.float64),
+        "grid_level": trade_level
+    }
+    if fill_model is not None:
+        trades["fee"] = fill_model.fee(trade_shares, trade_price)
+
+    daily_values = {
+        "date": dates,
+        "close": close,
+        "cash": daily_cash,
+        "shares": daily_shares,
+        "value": daily_value
+    }
+
+    return {
+        "trades": trades,
+        "daily_values": daily_values,
+        "cash": cash,
+        "shares": shares
+    }
+
+def columns_to_records(columns):
+    """
+    Convert a dict of equal-length arrays into a list of row dicts
+
+    Parameters:
+    - columns: Dict mapping column name to array
+
+    Returns:
+    - List of dicts with plain Python values
+    """
+    names = list(columns.keys())
+    values = [np.asarray(columns[name]).tolist() for name in names]
+    return [dict(zip(names, row)) for row in zip(*values)]
@@ -0,0 +1,69 @@
+import mongomock
+import pytest
+from bson.objectid import ObjectId
+from app import create_app
+from benchmarks.synthetic import synthetic_ohlcv, synthetic_provider
+from src.data_fetcher import resolve_ticker, set_price_store
+from src.grid_trading import calculate_grid_levels
+from src.price_store import PriceStore
+
+# Symbol served by the synthetic price store
+SYMBOL = "SYN"
+
+# Daily bars of the synthetic history (business days from 1970-01-01)
+NUM_BARS = 500
+
+# Backtest period covering the whole synthetic history
+START_DATE = "1970-01-01"
+END_DATE = "1971-12-31"
+
+def assert_records_equal(actual, expected):
+    """Compare lists of record dicts, floats up to rounding"""
+    assert len(actual) == len(expected)
+    for actual_record, expected_record in zip(actual, expected):
+        assert actual_record.keys() == expected_record.keys()
+        for key, value in expected_record.items():
+            if isinstance(value, float):
+                assert actual_record[key] == pytest.approx(value, rel=1e-12, abs=1e-9), key
+            else:
+                assert actual_record[key] == value, key
+
+@pytest.fixture
+def history():
+    """Synthetic daily OHLCV bars of SYMBOL"""
+    return synthetic_ohlcv(NUM_BARS, seed=7)
+
+@pytest.fixture
+def price_store(tmp_path, history):
+    """Process-wide price store serving the synthetic history, removed after the test"""
+    store = PriceStore(str(tmp_path / "prices"), synthetic_provider({resolve_ticker(SYMBOL): history}))
+    set_price_store(store)
+    yield store
+    set_price_store(None)
+
+@pytest.fixture
+def strategy(history):
+    """Grid strategy spanning most of the synthetic price range"""
+    upper_price = round(float(history["High"].quantile(0.95)), 2)
+    lower_price = round(float(history["Low"].quantile(0.05)), 2)
+    return {
+        "_id": ObjectId(),
+        "symbol": SYMBOL,
+        "upper_price": upper_price,
+        "lower_price": lower_price,
+        "num_grids": 20,
+        "investment_amount": 10000.0,
+        "grid_levels": calculate_grid_levels(upper_price, lower_price, 20)
+    }
+
+@pytest.fixture
+def db():
+    """In-memory MongoDB database"""
+    return mongomock.MongoClient().grid_trading
+
+@pytest.fixture
+def client(db):
+    """Test client of an app backed by the in-memory database"""
+    app = create_app(db)
+    yield app.test_client()
+    app.extensions["backtest_jobs"].shutdown()
@@ -0,0 +1,31 @@
+import pytest
+from conftest import START_DATE, END_DATE, assert_records_equal
+from src.backtest import run_backtest, load_backtest_data
+
+def test_vectorized_matches_loop(price_store, strategy):
+    loop = run_backtest(strategy, START_DATE, END_DATE, engine="loop")
+    vectorized = run_backtest(strategy, START_DATE, END_DATE, engine="vectorized")
+
+    assert len(loop["trades"]) > 0
+    assert_records_equal(vectorized["trades"], loop["trades"])
+    assert_records_equal(vectorized["daily_values"], loop["daily_values"])
+    assert vectorized["metrics"] == pytest.approx(loop["metrics"], rel=1e-9)
+
+def test_vectorized_matches_loop_on_preloaded_data(price_store, strategy):
+    backtest_data = load_backtest_data(strategy["symbol"], START_DATE, END_DATE)
+    loop = run_backtest(strategy, START_DATE, END_DATE, engine="loop", backtest_data=backtest_data)
+    vectorized = run_backtest(strategy, START_DATE, END_DATE, engine="vectorized", backtest_data=backtest_data)
+
+    assert_records_equal(vectorized["trades"], loop["trades"])
+
+@pytest.mark.parametrize("engine", ["loop", "vectorized"])
+def test_progress_reaches_total(price_store, strategy, engine):
+    calls = []
+    run_backtest(strategy, START_DATE, END_DATE, engine=engine, progress=lambda done, total: calls.append((done, total)))
+
+    assert calls[-1][0] == calls[-1][1] > 0
+    assert [done for done, _ in calls] == sorted(done for done, _ in calls)
+
+def test_unknown_engine_raises(strategy):
+    with pytest.raises(ValueError):
+        run_backtest(strategy, START_DATE, END_DATE, engine="quantum")
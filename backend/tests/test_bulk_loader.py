@@ -0,0 +1,112 @@
+import pytest
+from benchmarks.synthetic import synthetic_ohlcv, synthetic_provider, flaky_provider
+from src.bulk_loader import TokenBucket, is_transient_error, load_series, run_bulk_load
+from src.data_fetcher import resolve_ticker
+from src.price_store import PriceStore
+
+class FakeClock:
+    """Clock advanced only by its own sleep"""
+
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+class HTTPError(Exception):
+    def __init__(self, status_code):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+
+@pytest.fixture
+def frames():
+    return {resolve_ticker(f"SYN{index}"): synthetic_ohlcv(50, seed=index) for index in range(6)}
+
+def no_sleep(seconds):
+    pass
+
+def test_token_bucket_allows_burst_then_rate():
+    clock = FakeClock()
+    bucket = TokenBucket(2, burst=3, clock=clock, sleep=clock.sleep)
+
+    waits = [bucket.acquire() for _ in range(7)]
+
+    assert waits[:3] == [0.0, 0.0, 0.0]
+    assert waits[3:] == pytest.approx([0.5] * 4)
+    assert clock.now == pytest.approx(2.0)
+
+def test_token_bucket_refills_while_idle():
+    clock = FakeClock()
+    bucket = TokenBucket(1, clock=clock, sleep=clock.sleep)
+    bucket.acquire()
+    clock.now += 10
+
+    assert bucket.acquire() == 0.0
+    assert bucket.acquire() == pytest.approx(1.0)
+
+def test_token_bucket_without_rate_never_waits():
+    clock = FakeClock()
+    bucket = TokenBucket(None, clock=clock, sleep=clock.sleep)
+
+    assert all(bucket.acquire() == 0.0 for _ in range(100))
+    assert clock.sleeps == []
+
+@pytest.mark.parametrize("error, transient", [
+    (ConnectionError("reset"), True),
+    (TimeoutError("timed out"), True),
+    (HTTPError(429), True),
+    (HTTPError(503), True),
+    (HTTPError(404), False),
+    (ValueError("No data for ticker"), False)
+])
+def test_is_transient_error(error, transient):
+    assert is_transient_error(error) is transient
+
+def test_load_series_retries_transient_failures(tmp_path, frames):
+    provider = flaky_provider(synthetic_provider(frames), failure_rate=0.5, seed=1)
+    store = PriceStore(str(tmp_path), provider)
+
+    results = [load_series(store, symbol, "1d", period="max", retries=20, sleep=no_sleep)
+               for symbol in ("SYN0", "SYN1", "SYN2", "SYN3")]
+
+    assert [result["status"] for result in results] == ["loaded"] * 4
+    assert all(result["rows"] == 50 for result in results)
+    assert sum(result["attempts"] for result in results) == provider.calls
+    assert provider.calls > 4
+
+def test_load_series_gives_up_after_retries(tmp_path, frames):
+    provider = flaky_provider(synthetic_provider(frames), failing={resolve_ticker("SYN0")})
+    store = PriceStore(str(tmp_path), provider)
+
+    result = load_series(store, "SYN0", "1d", period="max", retries=3, sleep=no_sleep)
+
+    assert result["status"] == "failed"
+    assert result["error_type"] == "ConnectionError"
+    assert result["attempts"] == 4
+
+def test_load_series_does_not_retry_permanent_errors(tmp_path):
+    def provider(ticker, interval, period=None, start=None):
+        raise HTTPError(404)
+
+    result = load_series(PriceStore(str(tmp_path), provider), "NOPE", "1d", period="max", retries=3, sleep=no_sleep)
+
+    assert result["status"] == "failed"
+    assert result["attempts"] == 1
+
+def test_run_bulk_load_reports_each_series(tmp_path, frames):
+    provider = flaky_provider(synthetic_provider(frames), failing={resolve_ticker("SYN4")})
+    symbols = [f"SYN{index}" for index in range(6)]
+
+    summary = run_bulk_load(symbols, intervals=("1d", "1wk"), max_workers=4, rate=None, retries=2, backoff=0,
+                            store=PriceStore(str(tmp_path), provider))
+
+    assert (summary["requested"], summary["loaded"], summary["failed"]) == (12, 10, 2)
+    assert [(result["symbol"], result["interval"]) for result in summary["results"]] == [
+        (symbol, interval) for symbol in symbols for interval in ("1d", "1wk")
+    ]
+    assert {result["symbol"] for result in summary["results"] if result["status"] == "failed"} == {"SYN4"}
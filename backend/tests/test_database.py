@@ -0,0 +1,60 @@
+import os
+import mongomock
+import pytest
+from pymongo.errors import BulkWriteError
+from src.database import COLLECTIONS, INDEXES, LazyDatabase, bulk_insert, get_client_options, init_db
+
+def test_init_db_creates_collections_and_indexes():
+    db = init_db(mongomock.MongoClient())
+    # A second start finds everything in place
+    init_db(db.client)
+
+    assert set(COLLECTIONS) <= set(db.list_collection_names())
+    for name, indexes in INDEXES.items():
+        created = [tuple(info["key"]) for info in db[name].index_information().values()]
+        for index in indexes:
+            assert tuple(index.document["key"].items()) in created, name
+    assert db.backtest_series.index_information()["backtest_id_1_kind_1_seq_1"]["unique"]
+
+def test_client_options_from_environment(monkeypatch):
+    monkeypatch.setenv("MONGO_MAX_POOL_SIZE", "20")
+    monkeypatch.setenv("MONGO_SOCKET_TIMEOUT_MS", "1500")
+    monkeypatch.delenv("MONGO_WAIT_QUEUE_TIMEOUT_MS", raising=False)
+
+    options = get_client_options()
+    assert options["maxPoolSize"] == 20 and options["socketTimeoutMS"] == 1500
+    assert options["serverSelectionTimeoutMS"] == 5000
+    assert "waitQueueTimeoutMS" not in options
+
+def test_lazy_database_connects_on_first_use_per_process(monkeypatch):
+    clients = []
+    lazy = LazyDatabase(lambda: clients.append(mongomock.MongoClient()) or clients[-1])
+    assert clients == []
+
+    lazy.trades.insert_one({"symbol": "SYN"})
+    assert lazy["trades"].count_documents({}) == 1 and len(clients) == 1
+
+    # A forked worker gets its own client
+    monkeypatch.setattr(os, "getpid", lambda: -1)
+    assert lazy.trades.count_documents({}) == 0 and len(clients) == 2
+
+def test_bulk_insert_batches_and_skips_duplicates():
+    collection = init_db(mongomock.MongoClient()).backtest_series
+    documents = [{"backtest_id": 1, "kind": "trades", "seq": seq} for seq in range(25)]
+
+    assert bulk_insert(collection, documents, batch_size=10) == 25
+    again = [{"backtest_id": 1, "kind": "trades", "seq": seq} for seq in range(20, 30)]
+    assert bulk_insert(collection, again, batch_size=4, ignore_duplicates=True) == 5
+    assert collection.count_documents({}) == 30
+    with pytest.raises(BulkWriteError):
+        bulk_insert(collection, [{"backtest_id": 1, "kind": "trades", "seq": 0}])
+
+def test_bulk_insert_failure_counts_from_the_first_document():
+    collection = init_db(mongomock.MongoClient()).backtest_series
+    documents = [{"backtest_id": 1, "kind": "trades", "seq": seq % 6} for seq in range(8)]
+
+    with pytest.raises(BulkWriteError) as raised:
+        bulk_insert(collection, documents, batch_size=4)
+
+    assert [error["index"] for error in raised.value.details["writeErrors"]] == [6, 7]
+    assert raised.value.details["nInserted"] == collection.count_documents({}) == 6
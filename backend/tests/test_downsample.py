@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+from src.downsample import bucket_edges, lttb_indices, minmax_indices
+
+def reference_lttb(y, points):
+    # Largest-Triangle-Three-Buckets one bucket at a time
+    length = len(y)
+    x = np.arange(length, dtype=np.float64)
+    edges = 1 + bucket_edges(length - 2, points - 2)
+    selected = [0]
+    for start, end, next_end in zip(edges[:-1], edges[1:], np.append(edges[2:], length)):
+        if end < length - 1:
+            next_x, next_y = x[end:next_end].mean(), y[end:next_end].mean()
+        else:
+            next_x, next_y = x[-1], y[-1]
+        kept_x, kept_y = x[selected[-1]], y[selected[-1]]
+        area = np.abs((x[start:end] - kept_x) * (next_y - kept_y) - (next_x - kept_x) * (y[start:end] - kept_y))
+        selected.append(start + int(area.argmax()))
+    selected.append(length - 1)
+    return np.array(selected)
+
+@pytest.fixture
+def series():
+    rng = np.random.default_rng(5)
+    return np.cumsum(rng.normal(0, 1, 10007))
+
+@pytest.mark.parametrize("points", [3, 4, 100, 997, 5000])
+def test_lttb_matches_reference(series, points):
+    indices = lttb_indices(series, points)
+
+    assert len(indices) == points
+    assert indices[0] == 0 and indices[-1] == len(series) - 1
+    assert np.all(np.diff(indices) > 0)
+    np.testing.assert_array_equal(indices, reference_lttb(series, points))
+
+def test_lttb_keeps_short_series():
+    np.testing.assert_array_equal(lttb_indices(np.arange(10.0), 10), np.arange(10))
+    with pytest.raises(ValueError):
+        lttb_indices(np.arange(10.0), 2)
+
+@pytest.mark.parametrize("points", [4, 5, 100, 1001])
+def test_minmax_keeps_every_bucket_extreme(series, points):
+    indices = minmax_indices(series, points)
+    edges = bucket_edges(len(series), (points - 2) // 2)
+
+    assert len(indices) <= points
+    assert indices[0] == 0 and indices[-1] == len(series) - 1
+    assert np.all(np.diff(indices) > 0)
+    kept = set(indices.tolist())
+    for start, end in zip(edges[:-1], edges[1:]):
+        bucket = series[start:end]
+        assert start + int(bucket.argmin()) in kept
+        assert start + int(bucket.argmax()) in kept
+
+def test_minmax_skips_missing_values():
+    values = np.array([1.0, np.nan, 5.0, np.nan, -3.0, 2.0, np.nan, 0.0, 4.0, 1.0])
+    indices = minmax_indices(values, 6)
+
+    assert not np.isnan(values[indices[1:-1]]).any()
+    assert {2, 4} <= set(indices.tolist())
@@ -0,0 +1,89 @@
+import pytest
+from conftest import START_DATE, END_DATE, assert_records_equal
+from src.backtest import run_backtest
+from src.fills import FillModel
+
+# Fill models the engines must agree under: none, costs with partial
+# fills, and costs where unaffordable buys are skipped
+FILL_MODELS = [
+    None,
+    FillModel(fee_per_share=0.01, fee_pct=0.001, slippage_pct=0.0005, slippage_range=0.1, partial_fills=True),
+    FillModel(fee_per_share=0.05, fee_pct=0.002, slippage_range=0.2)
+]
+
+def strip_fees(trades):
+    return [{key: value for key, value in trade.items() if key != "fee"} for trade in trades]
+
+def test_fill_costs():
+    model = FillModel(fee_per_share=0.01, fee_pct=0.001, slippage_pct=0.002, slippage_range=0.1)
+    slippage = model.slippage(105.0, 95.0)
+    shares, price = 10.0, 100.0
+
+    assert slippage == pytest.approx(0.002 + 0.1 * 0.1)
+    assert model.fill_price(price, slippage, "buy") == pytest.approx(101.2)
+    assert model.fill_price(price, slippage, "sell") == pytest.approx(98.8)
+    assert model.fee(shares, 101.2) == pytest.approx(0.1 + 1.012)
+    assert model.buy_cost(shares, price, slippage) == pytest.approx(shares * 101.2 + model.fee(shares, 101.2))
+    assert model.sell_proceeds(shares, price, slippage) == pytest.approx(shares * 98.8 - model.fee(shares, 98.8))
+    assert model.buy_cost(model.affordable_shares(500.0, price, slippage), price, slippage) == pytest.approx(500.0)
+
+def test_costless_fill_model_changes_nothing():
+    model = FillModel()
+    slippage = model.slippage(105.0, 95.0)
+
+    assert slippage == 0
+    assert model.buy_cost(3.0, 50.0, slippage) == model.sell_proceeds(3.0, 50.0, slippage) == 150.0
+
+def test_settings_round_trip_and_validation():
+    model = FillModel(fee_pct=0.001, partial_fills=True)
+
+    assert FillModel.from_dict(model.to_dict()).to_dict() == model.to_dict()
+    assert FillModel.from_dict(None) is None
+    with pytest.raises(ValueError):
+        FillModel.from_dict({"commission": 1})
+    with pytest.raises(ValueError):
+        FillModel(fee_per_share=-0.01)
+    with pytest.raises(ValueError):
+        FillModel(fee_pct=1)
+    # Slippage of a whole price on the widest bar
+    with pytest.raises(ValueError):
+        FillModel(slippage_pct=0.2, slippage_range=0.4)
+
+@pytest.mark.parametrize("fill_model", FILL_MODELS)
+def test_vectorized_matches_loop(price_store, strategy, fill_model):
+    loop = run_backtest(strategy, START_DATE, END_DATE, engine="loop", fill_model=fill_model)
+    vectorized = run_backtest(strategy, START_DATE, END_DATE, engine="vectorized", fill_model=fill_model)
+
+    assert len(loop["trades"]) > 0
+    assert_records_equal(vectorized["trades"], loop["trades"])
+    assert_records_equal(vectorized["daily_values"], loop["daily_values"])
+    assert vectorized["metrics"] == pytest.approx(loop["metrics"], rel=1e-9)
+
+@pytest.mark.parametrize("engine", ["loop", "vectorized", "intrabar"])
+def test_costless_fill_model_matches_no_fill_model(price_store, strategy, engine):
+    plain = run_backtest(strategy, START_DATE, END_DATE, engine=engine, interval="1d")
+    costless = run_backtest(strategy, START_DATE, END_DATE, engine=engine, interval="1d", fill_model=FillModel())
+
+    assert len(plain["trades"]) > 0
+    assert all(trade["fee"] == 0 for trade in costless["trades"])
+    assert_records_equal(strip_fees(costless["trades"]), plain["trades"])
+    assert_records_equal(costless["daily_values"], plain["daily_values"])
+
+@pytest.mark.parametrize("engine", ["loop", "vectorized", "intrabar"])
+def test_costs_lower_the_final_value(price_store, strategy, engine):
+    plain = run_backtest(strategy, START_DATE, END_DATE, engine=engine, interval="1d")
+    costly = run_backtest(strategy, START_DATE, END_DATE, engine=engine, interval="1d", fill_model=FILL_MODELS[2])
+
+    assert all(trade["fee"] > 0 for trade in costly["trades"])
+    assert costly["metrics"]["final_value"] < plain["metrics"]["final_value"]
+
+@pytest.mark.parametrize("engine", ["loop", "vectorized", "intrabar"])
+def test_sell_proceeds_never_negative(price_store, strategy, engine):
+    # A per-share fee above every level's price takes all of each sell
+    fill_model = FillModel(fee_per_share=strategy["upper_price"] * 2)
+    result = run_backtest(strategy, START_DATE, END_DATE, engine=engine, interval="1d", fill_model=fill_model)
+    sells = [trade for trade in result["trades"] if trade["type"] == "sell"]
+
+    assert len(sells) > 0
+    assert all(trade["amount"] == 0 for trade in sells)
+    assert all(day["cash"] >= 0 for day in result["daily_values"])
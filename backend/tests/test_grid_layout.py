@@ -0,0 +1,66 @@
+import numpy as np
+import pytest
+from src.grid_layout import GridLayout
+from src.grid_trading import calculate_grid_levels, calculate_initial_position, generate_grid_orders
+
+def test_arithmetic_levels_are_evenly_spaced():
+    assert calculate_grid_levels(110, 100, 6) == [100.0, 102.0, 104.0, 106.0, 108.0, 110.0]
+    assert calculate_grid_levels(10.05, 10, 6) == [10.0, 10.01, 10.02, 10.03, 10.04, 10.05]
+
+def test_geometric_levels_have_a_constant_ratio():
+    levels = np.array(calculate_grid_levels(160, 10, 5, spacing="geometric"))
+
+    assert levels.tolist() == [10.0, 20.0, 40.0, 80.0, 160.0]
+    with pytest.raises(ValueError):
+        calculate_grid_levels(160, 0, 5, spacing="geometric")
+
+def test_adaptive_levels_are_denser_where_bars_are_calm():
+    # Bars closing below 150 move 1, bars above move 10
+    close = np.concatenate((np.full(100, 120.0), np.full(100, 180.0)))
+    ranges = np.where(close < 150, 1.0, 10.0)
+    layout = GridLayout.adaptive(200, 100, 21, close + ranges / 2, close - ranges / 2, close)
+    steps = np.diff(layout.levels)
+
+    assert layout.levels[0] == 100 and layout.levels[-1] == 200
+    assert np.all(steps > 0)
+    assert steps[0] < steps[-1]
+    with pytest.raises(ValueError):
+        GridLayout.adaptive(200, 100, 21, [np.nan], [np.nan], [np.nan])
+
+@pytest.mark.parametrize("spacing", ["arithmetic", "geometric"])
+def test_levels_that_repeat_in_cents_are_rejected(spacing):
+    with pytest.raises(ValueError):
+        calculate_grid_levels(10.02, 10, 6, spacing=spacing)
+
+def test_invalid_bounds_are_rejected():
+    with pytest.raises(ValueError):
+        calculate_grid_levels(100, 110, 5)
+    with pytest.raises(ValueError):
+        calculate_grid_levels(110, 100, 1)
+    with pytest.raises(ValueError):
+        calculate_grid_levels(110, 100, 5, spacing="fibonacci")
+
+def test_find_grid_and_find_grids_agree():
+    layout = GridLayout([100.0, 110.0, 121.0, 133.1], "geometric")
+    prices = [99.0, 100.0, 105.0, 110.0, 110.01, 133.1, 140.0]
+
+    assert [layout.find_grid(price) for price in prices] == [None, 0, 0, 0, 1, 2, None]
+    assert layout.find_grids(prices + [np.nan]).tolist() == [-1, 0, 0, 0, 1, 2, -1, -1]
+
+def test_strategy_lookups_use_the_layout():
+    strategy = {"symbol": "SYN", "investment_amount": 3000.0, "grid_levels": [100.0, 110.0, 120.0, 130.0],
+                "current_grid": 2}
+
+    assert calculate_initial_position(115.0, strategy["grid_levels"], 3000.0)["current_grid"] == 1
+    assert calculate_initial_position(90.0, strategy["grid_levels"], 3000.0)["current_grid"] == 0
+    assert [(order["type"], order["price"]) for order in generate_grid_orders(strategy, 105.0)] == \
+        [("buy", 110.0), ("buy", 100.0)]
+    assert generate_grid_orders(strategy, 140.0) == []
+
+def test_layout_document_round_trip():
+    layout = GridLayout.geometric(160, 10, 5)
+    strategy = {"grid_levels": layout.tolist(), "grid_layout": layout.to_document()}
+
+    assert layout.to_document() == {"spacing": "geometric", "lower_price": 10.0, "upper_price": 160.0, "num_grids": 5}
+    assert GridLayout.from_strategy(strategy).tolist() == layout.tolist()
+    assert GridLayout.from_strategy({"grid_levels": [1.0, 2.0]}).spacing == "arithmetic"
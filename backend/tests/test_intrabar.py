@@ -0,0 +1,44 @@
+import pandas as pd
+import pytest
+from conftest import SYMBOL, START_DATE, END_DATE, assert_records_equal
+from src.backtest import run_backtest
+from src.data_fetcher import resolve_ticker
+from src.intrabar import iter_bars, simulate_intrabar, intraday_end
+
+def test_intrabar_does_not_depend_on_chunking(price_store, strategy):
+    ticker = resolve_ticker(SYMBOL)
+    results = [
+        simulate_intrabar(iter_bars(price_store.iter_history(ticker, "1d", chunk_rows=chunk_rows)),
+                          strategy["grid_levels"], strategy["investment_amount"])
+        for chunk_rows in (7, 65536)
+    ]
+
+    assert len(results[0]["trades"]) > 0
+    assert_records_equal(results[0]["trades"], results[1]["trades"])
+    assert_records_equal(results[0]["daily_values"], results[1]["daily_values"])
+
+def test_intrabar_fills_orders_inside_a_gap():
+    day = 86400 * 10**9
+    bars = [
+        # Falls through 100 before closing on it: the buy at level 1 fills
+        (0, 105.0, 106.0, 95.0, 100.0),
+        # Opens above 110: the resting sell fills in the gap from 100 to 112
+        (day, 112.0, 113.0, 111.0, 112.0)
+    ]
+    portfolio = simulate_intrabar(bars, [90.0, 100.0, 110.0], 2000.0)
+
+    assert [(trade["type"], trade["grid_level"], trade["price"], trade["shares"])
+            for trade in portfolio["trades"]] == [("buy", 1, 100.0, 10.0), ("sell", 2, 110.0, 10.0)]
+    assert portfolio["daily_values"][-1]["value"] == pytest.approx(2100.0)
+
+def test_intrabar_backtest_keeps_one_value_per_day(price_store, strategy):
+    result = run_backtest(strategy, START_DATE, END_DATE, engine="intrabar", interval="1d")
+    dates = [day["date"] for day in result["daily_values"]]
+
+    assert len(result["trades"]) > 0
+    assert dates == sorted(set(dates))
+    assert result["metrics"]["final_value"] == pytest.approx(result["daily_values"][-1]["value"])
+
+def test_intraday_end_covers_the_whole_last_day():
+    assert intraday_end("1970-01-02") == pd.Timestamp("1970-01-02 23:59:59.999999999")
+    assert intraday_end("1970-01-02 12:00") == pd.Timestamp("1970-01-02 12:00")
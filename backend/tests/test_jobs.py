@@ -0,0 +1,127 @@
+import threading
+import time
+import mongomock
+import pytest
+import src.jobs as jobs
+from conftest import START_DATE, END_DATE
+from src.jobs import JobQueue, backtest_job_key, QUEUED, RUNNING, DONE, FAILED, CANCELLED, STALE_JOB_ERROR
+
+@pytest.fixture
+def db():
+    return mongomock.MongoClient().grid_trading
+
+@pytest.fixture
+def queue(db):
+    queue = JobQueue(db, max_workers=1)
+    yield queue
+    queue.shutdown()
+
+@pytest.fixture
+def blocked_backtests(monkeypatch):
+    # Backtests that report progress until released, then finish
+    release = threading.Event()
+
+    def run_backtest(strategy, start_date, end_date, progress=None, **kwargs):
+        while not release.wait(0.01):
+            progress(1, 10)
+        progress(10, 10)
+        return {"strategy": {"symbol": strategy["symbol"]}, "trades": [], "daily_values": [], "metrics": {}}
+
+    monkeypatch.setattr(jobs, "run_backtest", run_backtest)
+    yield release
+    release.set()
+
+def wait_for(queue, job_id, statuses, timeout=10):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = queue.get(job_id)
+        if job["status"] in statuses:
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"Job {job_id} is still {queue.get(job_id)['status']}")
+
+def test_job_runs_and_saves_result(db, queue, price_store, strategy):
+    job, reused = queue.submit(strategy, START_DATE, END_DATE, engine="vectorized")
+    finished = wait_for(queue, job["job_id"], (DONE, FAILED))
+
+    assert not reused
+    assert finished["status"] == DONE and finished["progress"] == 1.0
+    assert db.backtests.count_documents({}) == 1
+
+def test_identical_submissions_share_a_job(db, queue, blocked_backtests, strategy):
+    job, reused = queue.submit(strategy, START_DATE, END_DATE)
+    again, reused_again = queue.submit(strategy, START_DATE, END_DATE)
+    # Another server process sharing the database
+    other = JobQueue(db, max_workers=1)
+    try:
+        shared, reused_shared = other.submit(strategy, START_DATE, END_DATE)
+    finally:
+        other.shutdown()
+    different, reused_different = queue.submit(strategy, START_DATE, "1971-06-30")
+
+    assert (reused, reused_again, reused_shared, reused_different) == (False, True, True, False)
+    assert again["job_id"] == shared["job_id"] == job["job_id"]
+    assert different["job_id"] != job["job_id"]
+
+def test_cancel_queued_and_running_jobs(queue, blocked_backtests, strategy):
+    running, _ = queue.submit(strategy, START_DATE, END_DATE)
+    queued, _ = queue.submit(strategy, START_DATE, "1971-06-30")
+    wait_for(queue, running["job_id"], (RUNNING,))
+
+    assert queue.get(queued["job_id"])["status"] == QUEUED
+    assert queue.cancel(queued["job_id"])["status"] == CANCELLED
+    queue.cancel(running["job_id"])
+    assert wait_for(queue, running["job_id"], (CANCELLED, DONE, FAILED))["status"] == CANCELLED
+
+    # A cancelled backtest can be submitted again
+    resubmitted, reused = queue.submit(strategy, START_DATE, "1971-06-30")
+    assert not reused and resubmitted["job_id"] != queued["job_id"]
+
+def test_cancel_from_another_process(db, queue, blocked_backtests, strategy):
+    job, _ = queue.submit(strategy, START_DATE, END_DATE)
+    wait_for(queue, job["job_id"], (RUNNING,))
+    other = JobQueue(db, max_workers=1)
+    try:
+        other.cancel(job["job_id"])
+    finally:
+        other.shutdown()
+
+    # The owner picks the request up at its next heartbeat
+    assert wait_for(queue, job["job_id"], (CANCELLED, DONE, FAILED))["status"] == CANCELLED
+
+def test_job_without_heartbeat_is_failed_and_not_reused(db, queue, blocked_backtests, strategy):
+    # A running job of a server process that was killed
+    key = backtest_job_key(strategy, START_DATE, END_DATE, "loop", "1m")
+    db.backtest_jobs.insert_one({"_id": "abandoned", "key": key, "active_key": key, "status": RUNNING,
+                                 "bars_done": 5, "bars_total": 10, "created_at": "1970-01-01T00:00:00",
+                                 "owner": "gone:1", "updated_at": time.time() - 3600})
+
+    stale = queue.get("abandoned")
+    job, reused = queue.submit(strategy, START_DATE, END_DATE)
+
+    assert stale["status"] == FAILED and stale["error"] == STALE_JOB_ERROR
+    assert not reused and job["job_id"] != "abandoned"
+
+def test_submit_makes_database_calls_without_the_lock(monkeypatch, queue, blocked_backtests, strategy):
+    calls = []
+    find_shared = queue._find_shared
+
+    def checked_find_shared(key):
+        calls.append(queue._lock.locked())
+        return find_shared(key)
+
+    monkeypatch.setattr(queue, "_find_shared", checked_find_shared)
+    monkeypatch.setattr(jobs, "ensure_indexes", lambda *args: calls.append(queue._lock.locked()))
+    queue.submit(strategy, START_DATE, END_DATE)
+
+    assert calls == [False, False]
+
+def test_failed_status_write_fails_the_job(monkeypatch, queue, blocked_backtests, strategy):
+    def sync(job):
+        raise ConnectionError("database unavailable")
+
+    monkeypatch.setattr(queue, "_sync", sync)
+    job, _ = queue.submit(strategy, START_DATE, END_DATE)
+    failed = wait_for(queue, job["job_id"], (FAILED, DONE))
+
+    assert failed["status"] == FAILED and failed["error"] == "database unavailable"
@@ -0,0 +1,32 @@
+from datetime import datetime
+import pytest
+from bson.objectid import ObjectId
+from src.live_engine import LiveGridEngine
+
+@pytest.fixture
+def engine():
+    # Starts in the 120-130 grid with cash for one buy and no shares
+    strategy = {"_id": ObjectId(), "symbol": "SYN", "investment_amount": 3000.0,
+                "grid_levels": [100.0, 110.0, 120.0, 130.0],
+                "initial_position": {"current_grid": 2, "cash_allocation": 1000.0, "shares": 0}}
+    return LiveGridEngine(None, None, [strategy])
+
+def tick(engine, price):
+    return [(order["type"], order["price"], order["shares"])
+            for order in engine.on_tick("SYN", datetime(2024, 1, 2, 10), price)]
+
+def test_orders_are_limited_by_cash_and_shares(engine):
+    state = next(iter(engine.states.values()))
+
+    # Only the first of the two buys is covered by the cash
+    assert tick(engine, 105.0) == [("buy", 110.0, 9.09)]
+    assert state["cash"] == pytest.approx(1000.0 - 999.9)
+    # The sell at 110 is capped at the shares bought, the one at 120 has none left
+    assert tick(engine, 125.0) == [("sell", 110.0, 9.09)]
+    assert state["shares"] == 0 and state["cash"] == pytest.approx(1000.0)
+    assert engine.stats["orders"] == 2 and engine.stats["orders_skipped"] == 2
+
+def test_prices_outside_the_grid_keep_the_current_grid(engine):
+    assert tick(engine, 140.0) == []
+    assert tick(engine, 115.0) == [("buy", 110.0, 9.09)]
+    assert engine.metrics(next(iter(engine.states)))["num_trades"] == 1
@@ -0,0 +1,74 @@
+import numpy as np
+import pytest
+from src.metrics import PerformanceAccumulator, TRADING_DAYS, CALENDAR_DAYS
+
+def batch_metrics(values, trades, investment_amount):
+    # The metrics computed over the whole history at once
+    values = np.asarray(values, dtype=np.float64)
+    returns = values[1:] / values[:-1] - 1
+    total_return = values[-1] / investment_amount - 1
+    buys = [trade for trade in trades if trade["type"] == "buy"]
+    sells = [trade for trade in trades if trade["type"] == "sell"]
+    return {
+        "initial_value": investment_amount,
+        "final_value": values[-1],
+        "total_return": total_return,
+        "total_return_pct": total_return * 100,
+        "annualized_return": (1 + total_return) ** (CALENDAR_DAYS / len(values)) - 1,
+        "annualized_return_pct": ((1 + total_return) ** (CALENDAR_DAYS / len(values)) - 1) * 100,
+        "max_drawdown": np.max(1 - values / np.maximum.accumulate(values)),
+        "max_drawdown_pct": np.max(1 - values / np.maximum.accumulate(values)) * 100,
+        "sharpe_ratio": np.sqrt(TRADING_DAYS) * returns.mean() / returns.std(ddof=1),
+        "num_trades": len(trades),
+        "buy_trades": len(buys),
+        "sell_trades": len(sells),
+        "trade_profit": sum(trade["amount"] for trade in sells) - sum(trade["amount"] for trade in buys)
+    }
+
+@pytest.fixture
+def values():
+    rng = np.random.default_rng(3)
+    return 10000 * np.exp(np.cumsum(rng.normal(0, 0.01, 750)))
+
+@pytest.fixture
+def trades():
+    rng = np.random.default_rng(4)
+    return [{"type": "buy" if rng.random() < 0.5 else "sell", "amount": float(rng.uniform(10, 500))}
+            for _ in range(200)]
+
+def test_add_values_matches_batch_metrics(values, trades):
+    accumulator = PerformanceAccumulator(10000.0)
+    accumulator.add_values(values)
+    accumulator.add_trades(trades)
+
+    assert accumulator.snapshot() == pytest.approx(batch_metrics(values, trades, 10000.0), rel=1e-12)
+
+def test_add_value_matches_batch_metrics(values, trades):
+    accumulator = PerformanceAccumulator(10000.0)
+    for value in values:
+        accumulator.add_value(value)
+    accumulator.add_trades(trades)
+
+    assert accumulator.snapshot() == pytest.approx(batch_metrics(values, trades, 10000.0), rel=1e-9)
+
+def test_split_add_values_matches_one_call(values):
+    whole = PerformanceAccumulator(10000.0)
+    whole.add_values(values)
+    split = PerformanceAccumulator(10000.0)
+    for part in np.array_split(values, 7):
+        split.add_values(part)
+
+    assert split.snapshot() == pytest.approx(whole.snapshot(), rel=1e-12)
+
+def test_snapshot_includes_current_value_without_recording_it(values):
+    accumulator = PerformanceAccumulator(10000.0)
+    accumulator.add_values(values[:-1])
+    recorded = PerformanceAccumulator(10000.0)
+    recorded.add_values(values)
+
+    assert accumulator.snapshot(current_value=values[-1]) == pytest.approx(recorded.snapshot(), rel=1e-9)
+    assert accumulator.bars == len(values) - 1
+
+def test_snapshot_without_values_raises():
+    with pytest.raises(ValueError):
+        PerformanceAccumulator(10000.0).snapshot()
@@ -0,0 +1,42 @@
+import os
+import pytest
+from conftest import START_DATE, END_DATE
+from src.backtest import run_backtest
+from src.fills import FillModel
+from src.monte_carlo import run_monte_carlo
+
+# Enough paths of the 500-bar history to need two chunks
+NUM_PATHS = 2500
+
+@pytest.mark.parametrize("method", ["bootstrap", "gbm"])
+def test_seed_gives_same_results_for_any_worker_count(monkeypatch, price_store, strategy, method):
+    # Let the pool start several processes on machines with fewer CPUs
+    monkeypatch.setattr(os, "cpu_count", lambda: 4)
+    fill_model = FillModel(fee_pct=0.001, slippage_range=0.1)
+
+    results = [
+        run_monte_carlo(strategy, START_DATE, END_DATE, num_paths=NUM_PATHS, method=method, seed=42,
+                        max_workers=max_workers, fill_model=fill_model)
+        for max_workers in (1, 2)
+    ]
+
+    assert results[0]["chunks"] > 1
+    assert results[0]["distribution"] == results[1]["distribution"]
+    assert results[0]["probability_of_loss"] == results[1]["probability_of_loss"]
+
+def test_different_seeds_give_different_paths(price_store, strategy):
+    results = [run_monte_carlo(strategy, START_DATE, END_DATE, num_paths=200, seed=seed, max_workers=1)
+               for seed in (1, 2)]
+
+    assert results[0]["distribution"] != results[1]["distribution"]
+
+def test_historical_metrics_match_backtest(price_store, strategy):
+    result = run_monte_carlo(strategy, START_DATE, END_DATE, num_paths=10, seed=0, max_workers=1)
+    backtest = run_backtest(strategy, START_DATE, END_DATE, engine="vectorized")
+
+    assert result["historical"]["final_value"] == pytest.approx(backtest["metrics"]["final_value"], rel=1e-9)
+    assert result["historical"]["num_trades"] == backtest["metrics"]["num_trades"]
+
+def test_rejects_blocks_longer_than_half_the_history(price_store, strategy):
+    with pytest.raises(ValueError):
+        run_monte_carlo(strategy, START_DATE, END_DATE, num_paths=10, block_bars=400, seed=0, max_workers=1)
@@ -0,0 +1,62 @@
+import os
+import pandas as pd
+import pytest
+from benchmarks.synthetic import synthetic_ohlcv, synthetic_provider
+from src.price_store import PriceStore, INTRADAY_LOOKBACK_DAYS
+
+# Minute bars from 2000-01-03 through early February 2000
+MINUTE_BARS = 60000
+
+# Current time of the store, inside the minute history
+NOW = pd.Timestamp("2000-01-20")
+
+@pytest.fixture
+def requests():
+    return []
+
+@pytest.fixture
+def store(tmp_path, history, requests):
+    provider = synthetic_provider({"SYN": history, "MIN": synthetic_ohlcv(MINUTE_BARS, seed=3)})
+
+    def recording_provider(ticker, interval, period=None, start=None):
+        requests.append((interval, period, start))
+        return provider(ticker, interval, period=period, start=start)
+
+    return PriceStore(str(tmp_path / "prices"), recording_provider, clock=NOW.timestamp)
+
+def test_intraday_fetch_is_clamped_to_the_provider_window(store, requests):
+    earliest = NOW - pd.Timedelta(days=INTRADAY_LOOKBACK_DAYS["1m"] - 1)
+
+    frame = store.get_history("MIN", "1m", period="max")
+    store.get_history("MIN", "1m", start=pd.Timestamp("2000-01-03"))
+    store.get_history("MIN", "1m", period="1mo")
+
+    assert requests == [("1m", None, earliest)]
+    assert frame["Date"].iloc[0] >= earliest
+
+def test_intraday_backfill_is_clamped_to_the_provider_window(store, requests):
+    earliest = NOW - pd.Timedelta(days=INTRADAY_LOOKBACK_DAYS["1m"] - 1)
+
+    store.get_history("MIN", "1m", period="1d")
+    store.get_history("MIN", "1m", period="max")
+    store.get_history("MIN", "1m", period="max")
+
+    assert requests == [("1m", None, NOW - pd.Timedelta(days=1)), ("1m", None, earliest)]
+
+def test_daily_bars_are_fetched_in_full_once(store, requests, history):
+    frame = store.get_history("SYN", "1d", start=history.index[100])
+    store.get_history("SYN", "1d", period="max")
+
+    assert requests == [("1d", "max", None)]
+    assert len(frame) == len(history) - 100
+
+def test_refresh_keeps_only_the_current_and_replaced_versions(store):
+    versions = []
+    for day in range(3):
+        store.clock = lambda: NOW.timestamp() + day * 24 * 3600
+        versions.append(store.version("SYN", "1d"))
+    series_dir = os.path.dirname(store._version_dir("SYN", "1d", store._read_meta("SYN", "1d")))
+
+    assert len(set(versions)) == 3
+    # Readers may still be mapping the version replaced last
+    assert {entry for entry in os.listdir(series_dir) if entry in versions} == set(versions[1:])
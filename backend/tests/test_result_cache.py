@@ -0,0 +1,70 @@
+import pytest
+from bson.objectid import ObjectId
+from benchmarks.synthetic import synthetic_provider
+from conftest import SYMBOL, START_DATE, END_DATE
+from src.data_fetcher import resolve_ticker
+from src.result_cache import BacktestCache, backtest_cache_key, backtest_data_version
+from src.result_store import save_backtest_result
+
+@pytest.fixture
+def stored(db):
+    # A stored backtest result and its cache key
+    result = {"strategy": {"symbol": SYMBOL}, "metrics": {"total_return": 0.1},
+              "daily_values": [{"date": "1970-01-01", "value": 1.0}], "trades": []}
+    return save_backtest_result(db, result), result
+
+def test_key_depends_on_strategy_id_fill_model_and_data(strategy):
+    key = backtest_cache_key(strategy, START_DATE, END_DATE, "loop", "1m", "v1")
+    twin = dict(strategy, _id=ObjectId())
+
+    assert key == backtest_cache_key(dict(strategy), START_DATE, END_DATE, "loop", "1m", "v1")
+    assert key != backtest_cache_key(twin, START_DATE, END_DATE, "loop", "1m", "v1")
+    assert key != backtest_cache_key(strategy, START_DATE, END_DATE, "loop", "1m", "v2")
+    # The interval only matters to the intrabar engine
+    assert key == backtest_cache_key(strategy, START_DATE, END_DATE, "loop", "5m", "v1")
+    assert (backtest_cache_key(strategy, START_DATE, END_DATE, "intrabar", "1m", "v1") !=
+            backtest_cache_key(strategy, START_DATE, END_DATE, "intrabar", "5m", "v1"))
+
+def test_data_version_changes_with_the_cached_bars(price_store, strategy, history):
+    version = backtest_data_version(strategy, START_DATE, END_DATE, "loop", "1m")
+    early = backtest_data_version(strategy, START_DATE, "1970-06-30", "loop", "1m")
+    assert version == backtest_data_version(strategy, START_DATE, END_DATE, "loop", "1m")
+
+    changed = history.copy()
+    changed.iloc[-10, changed.columns.get_loc("Close")] += 1.0
+    price_store.provider = synthetic_provider({resolve_ticker(SYMBOL): changed})
+    price_store.invalidate(resolve_ticker(SYMBOL), "1d")
+
+    assert backtest_data_version(strategy, START_DATE, END_DATE, "loop", "1m") != version
+    # A change outside a range leaves the version of that range alone
+    assert backtest_data_version(strategy, START_DATE, "1970-06-30", "loop", "1m") == early
+
+def test_results_are_served_from_memory_then_the_database(db, stored):
+    backtest_id, result = stored
+    cache = BacktestCache(db, max_entries=1)
+    cache.put("a", backtest_id, result)
+    cache.put("b", backtest_id, result)
+
+    # "a" was evicted from memory and is loaded from the stored backtest
+    assert cache.get("b") is result
+    loaded = cache.get("a")
+    assert loaded["_id"] == str(backtest_id) and loaded["metrics"] == result["metrics"]
+    assert cache.get("c") is None
+
+def test_clear_and_expiry_invalidate_entries(db, stored):
+    backtest_id, result = stored
+    cache = BacktestCache(db)
+    cache.put("a", backtest_id, result)
+    cache.clear()
+    assert cache.get("a") is None
+
+    expired = BacktestCache(db, ttl_seconds=-1)
+    expired.put("a", backtest_id, result)
+    assert expired.get("a") is None
+
+def test_removed_backtest_is_a_miss(db, stored):
+    backtest_id, result = stored
+    BacktestCache(db).put("a", backtest_id, result)
+    db.backtests.delete_many({})
+
+    assert BacktestCache(db).get("a") is None
@@ -0,0 +1,57 @@
+import mongomock
+import numpy as np
+import pytest
+from bson.objectid import ObjectId
+from pymongo.errors import DuplicateKeyError
+import src.result_store as result_store
+from conftest import assert_records_equal
+from src.database import init_db
+from src.result_store import save_backtest_result, load_backtest_result, iter_backtest_records
+
+@pytest.fixture
+def db():
+    return init_db(mongomock.MongoClient())
+
+@pytest.fixture
+def result():
+    dates = np.datetime_as_string(np.datetime64("1970-01-01") + np.arange(50), unit="D")
+    return {
+        "strategy": {"symbol": "SYN", "num_grids": 5},
+        "metrics": {"total_return": 0.05},
+        "daily_values": [{"date": str(date), "price": 100.0 + i, "value": 1000.0 + i * 0.5}
+                         for i, date in enumerate(dates)],
+        "trades": [{"date": str(date), "type": "buy" if i % 2 else "sell", "price": 100.0 + i,
+                    "shares": i, "amount": (100.0 + i) * i}
+                   for i, date in enumerate(dates[::7])]
+    }
+
+def test_series_round_trip_through_chunks(monkeypatch, db, result):
+    monkeypatch.setattr(result_store, "CHUNK_ROWS", 8)
+    backtest_id = save_backtest_result(db, result)
+
+    assert db.backtest_series.count_documents({"backtest_id": backtest_id, "kind": "daily_values"}) == 7
+    loaded = load_backtest_result(db, str(backtest_id))
+    assert loaded["metrics"] == result["metrics"]
+    assert_records_equal(loaded["daily_values"], result["daily_values"])
+    assert_records_equal(loaded["trades"], result["trades"])
+
+def test_series_date_range_reads_overlapping_chunks(monkeypatch, db, result):
+    monkeypatch.setattr(result_store, "CHUNK_ROWS", 8)
+    backtest_id = save_backtest_result(db, result)
+
+    expected = [record for record in result["daily_values"] if "1970-01-10" <= record["date"] <= "1970-01-20"]
+    assert_records_equal(list(iter_backtest_records(db, str(backtest_id), "daily_values",
+                                                    "1970-01-10", "1970-01-20")), expected)
+    columns = load_backtest_result(db, str(backtest_id), start="1970-01-10", end="1970-01-20", layout="columns")
+    assert columns["daily_values"]["columns"] == ["date", "price", "value"]
+    assert columns["daily_values"]["data"][0] == [record["date"] for record in expected]
+
+def test_failed_summary_write_removes_written_chunks(monkeypatch, db, result):
+    backtest_id = ObjectId()
+    monkeypatch.setattr(result_store, "ObjectId", lambda: backtest_id)
+    # A summary already stored under the same id makes the last write fail
+    db.backtests.insert_one({"_id": backtest_id})
+
+    with pytest.raises(DuplicateKeyError):
+        save_backtest_result(db, result)
+    assert db.backtest_series.count_documents({"backtest_id": backtest_id}) == 0
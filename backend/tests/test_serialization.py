@@ -0,0 +1,84 @@
+import json
+import numpy as np
+import pandas as pd
+import pytest
+from flask import Flask, request
+import src.serialization as serialization
+from conftest import SYMBOL
+from src.serialization import (FormatNotAvailable, dumps, get_response_format, frame_to_columns,
+                               frame_to_records, records_to_columns)
+
+DOCUMENT = {
+    "metrics": {"sharpe_ratio": float("nan"), "profit_factor": float("inf"), "total_return": 0.25},
+    "values": np.array([1.0, np.nan, 3.0]),
+    "count": np.int64(3),
+    "rows": [{"value": float("-inf")}, {"value": 2.5}]
+}
+
+EXPECTED = {
+    "metrics": {"sharpe_ratio": None, "profit_factor": None, "total_return": 0.25},
+    "values": [1.0, None, 3.0],
+    "count": 3,
+    "rows": [{"value": None}, {"value": 2.5}]
+}
+
+@pytest.fixture(params=["orjson", "json"])
+def encoder(request, monkeypatch):
+    # Encode with orjson when installed, and with the standard library
+    if request.param == "orjson":
+        pytest.importorskip("orjson")
+    else:
+        monkeypatch.setattr(serialization, "orjson", None)
+    return request.param
+
+def test_dumps_writes_nan_and_infinity_as_null(encoder):
+    assert json.loads(dumps(DOCUMENT)) == EXPECTED
+    assert json.loads(dumps({"value": 1.5})) == {"value": 1.5}
+
+def test_frame_layouts_keep_missing_values_as_null():
+    frame = pd.DataFrame({"Date": pd.to_datetime(["2024-01-02", "2024-01-03"]),
+                          "Close": [10.5, np.nan]})
+
+    assert frame_to_records(frame, "%Y-%m-%d") == [{"Date": "2024-01-02", "Close": 10.5},
+                                                   {"Date": "2024-01-03", "Close": None}]
+    assert frame_to_columns(frame, native=False) == {"columns": ["Date", "Close"],
+                                                     "data": [["2024-01-02 00:00:00", "2024-01-03 00:00:00"],
+                                                              [10.5, None]]}
+    assert records_to_columns([{"a": 1}, {"b": 2}]) == {"columns": ["a", "b"], "data": [[1, None], [None, 2]]}
+
+@pytest.mark.parametrize("query, accept, expected", [
+    ("", "", "json"),
+    ("?format=columnar", "application/x-msgpack", "columnar"),
+    ("", "application/x-msgpack, application/json", "msgpack"),
+    ("", "application/x-ndjson", "ndjson"),
+    ("?format=chunked", "", "chunked")
+])
+def test_response_format_from_query_then_accept(query, accept, expected):
+    pytest.importorskip("msgpack")
+    with Flask(__name__).test_request_context(f"/{query}", headers={"Accept": accept}):
+        assert get_response_format(request) == expected
+
+def test_msgpack_without_the_package(monkeypatch):
+    monkeypatch.setattr(serialization, "msgpack", None)
+
+    with Flask(__name__).test_request_context("/", headers={"Accept": "application/x-msgpack"}):
+        assert get_response_format(request) == "json"
+    with Flask(__name__).test_request_context("/?format=msgpack"):
+        with pytest.raises(FormatNotAvailable):
+            get_response_format(request)
+    with Flask(__name__).test_request_context("/?format=xml"):
+        with pytest.raises(ValueError):
+            get_response_format(request)
+
+def test_stock_route_negotiates_msgpack(monkeypatch, client, price_store):
+    msgpack = pytest.importorskip("msgpack")
+    response = client.get(f"/api/stock/{SYMBOL}?period=1mo", headers={"Accept": "application/x-msgpack"})
+    document = msgpack.unpackb(response.get_data())
+    columnar = client.get(f"/api/stock/{SYMBOL}?period=1mo&format=columnar").get_json()
+
+    assert response.mimetype == "application/x-msgpack"
+    assert document["symbol"] == SYMBOL and document["data"] == columnar["data"]
+    assert document["data"]["columns"][0] == "Date" and len(document["data"]["data"][0]) > 0
+
+    monkeypatch.setattr(serialization, "msgpack", None)
+    assert client.get(f"/api/stock/{SYMBOL}?format=msgpack").status_code == 406
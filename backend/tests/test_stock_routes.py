@@ -0,0 +1,47 @@
+import json
+import pytest
+import src.routes as routes
+from conftest import SYMBOL, NUM_BARS
+from src.price_store import PriceStore
+from src.streaming import STREAM_CHUNK_ROWS
+
+@pytest.fixture
+def read_chunks(monkeypatch, price_store):
+    # Rows of every DataFrame built from the store's columns
+    sizes = []
+    frame_from_columns = PriceStore._frame_from_columns
+
+    def record(store, columns, first, last):
+        sizes.append(last - first)
+        return frame_from_columns(store, columns, first, last)
+
+    monkeypatch.setattr(PriceStore, "_frame_from_columns", record)
+    return sizes
+
+@pytest.fixture
+def no_full_history(monkeypatch):
+    def get_price_history(*args, **kwargs):
+        raise AssertionError("the full history was read")
+
+    monkeypatch.setattr(routes, "get_price_history", get_price_history)
+
+def test_ndjson_stream_reads_the_store_in_chunks(monkeypatch, client, read_chunks, no_full_history):
+    monkeypatch.setattr(routes, "STREAM_CHUNK_ROWS", 64)
+    response = client.get(f"/api/stock/{SYMBOL}?period=max&format=ndjson")
+    rows = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+    assert response.status_code == 200
+    assert len(rows) == NUM_BARS and "error" not in rows[-1]
+    assert rows[0]["Date"] == "1970-01-01 00:00:00"
+    assert sum(read_chunks) == NUM_BARS and max(read_chunks) == 64
+
+def test_chunked_stream_applies_the_period(client, read_chunks, no_full_history):
+    full = client.get(f"/api/stock/{SYMBOL}?period=max&format=json").get_json()["data"]
+    del read_chunks[:]
+    response = client.get(f"/api/stock/{SYMBOL}?period=1y&format=chunked")
+    document = json.loads(response.get_data(as_text=True))
+
+    assert document["period"] == "1y"
+    assert 0 < len(document["data"]) < len(full)
+    assert document["data"] == full[-len(document["data"]):]
+    assert max(read_chunks) <= STREAM_CHUNK_ROWS
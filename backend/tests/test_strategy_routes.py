@@ -0,0 +1,22 @@
+import pytest
+import src.routes as routes
+
+@pytest.fixture
+def quotes(monkeypatch):
+    monkeypatch.setattr(routes, "get_quotes", lambda symbols: {
+        symbol: {"price": 110.0, "source": "live", "as_of": 0.0} for symbol in symbols})
+
+def test_bulk_create_reports_partial_insert_failures(db, client, quotes):
+    db.strategies.create_index("symbol", unique=True)
+    item = {"upper_price": 120, "lower_price": 100, "num_grids": 5, "investment_amount": 1000}
+    items = [dict(item, symbol="AAA"), dict(item, symbol="AAA"), {"symbol": "CCC"}, dict(item, symbol="BBB")]
+
+    response = client.post("/api/strategies", json={"strategies": items})
+    body = response.get_json()
+
+    assert response.status_code == 200
+    assert [created["index"] for created in body["created"]] == [0, 3]
+    assert sorted(str(strategy["_id"]) for strategy in db.strategies.find()) == \
+        sorted(created["strategy_id"] for created in body["created"])
+    assert [error["index"] for error in body["errors"]] == [1, 2]
+    assert "Duplicate" in body["errors"][0]["error"]
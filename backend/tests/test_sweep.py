@@ -0,0 +1,69 @@
+import math
+import os
+import pytest
+from conftest import SYMBOL, START_DATE, END_DATE
+from src.backtest import run_backtest
+from src.grid_trading import calculate_grid_levels
+from src.sweep import (MAX_SWEEP_COMBINATIONS, expand_range, build_parameter_grid, rank_results,
+                       run_parameter_sweep, pool_workers)
+
+def test_expand_range():
+    assert expand_range({"start": 1, "stop": 2, "step": 0.25}) == [1.0, 1.25, 1.5, 1.75, 2.0]
+    assert expand_range([10, 20], cast=int) == [10, 20]
+    assert expand_range(5) == [5.0]
+    with pytest.raises(ValueError):
+        expand_range({"start": 1, "stop": 2, "step": 0})
+
+def test_build_parameter_grid_skips_invalid_bounds():
+    combinations = build_parameter_grid([100, 120], [110], [5, 1])
+
+    assert combinations == [{"upper_price": 120.0, "lower_price": 110.0, "num_grids": 5}]
+    with pytest.raises(ValueError):
+        build_parameter_grid(100, 110, 5)
+    with pytest.raises(ValueError):
+        build_parameter_grid({"start": 200, "stop": 200 + MAX_SWEEP_COMBINATIONS, "step": 1}, 100, [5, 10])
+
+def test_pool_workers_is_capped_by_cpus_and_tasks(monkeypatch):
+    monkeypatch.setattr(os, "cpu_count", lambda: 4)
+
+    assert pool_workers(None, 10) == 4
+    assert pool_workers(64, 10) == 4
+    assert pool_workers(8, 2) == 2
+    assert pool_workers(0, 0) == 1
+
+@pytest.mark.parametrize("max_workers", [1, 2])
+def test_sweep_matches_single_backtests(monkeypatch, price_store, strategy, max_workers):
+    # Let the pool start several processes on machines with fewer CPUs
+    monkeypatch.setattr(os, "cpu_count", lambda: 4)
+    param_ranges = {
+        "upper_price": [strategy["upper_price"], strategy["upper_price"] * 1.1],
+        "lower_price": strategy["lower_price"],
+        "num_grids": [5, 20]
+    }
+
+    results = run_parameter_sweep(SYMBOL, 10000, START_DATE, END_DATE, param_ranges, max_workers=max_workers)
+
+    assert [row["rank"] for row in results] == [1, 2, 3, 4]
+    assert [row["total_return"] for row in results] == sorted((row["total_return"] for row in results), reverse=True)
+    for row in results:
+        single = run_backtest({
+            "symbol": SYMBOL,
+            "upper_price": row["upper_price"],
+            "lower_price": row["lower_price"],
+            "num_grids": row["num_grids"],
+            "investment_amount": 10000.0,
+            "grid_levels": calculate_grid_levels(row["upper_price"], row["lower_price"], row["num_grids"])
+        }, START_DATE, END_DATE, engine="vectorized")
+        assert {key: row[key] for key in single["metrics"]} == pytest.approx(single["metrics"], rel=1e-12)
+
+def test_rank_results_orders_drawdowns_ascending_and_undefined_last():
+    rows = [{"max_drawdown": 0.2, "sharpe_ratio": float("nan")},
+            {"max_drawdown": 0.1, "sharpe_ratio": 1.5},
+            {"max_drawdown": 0.3, "sharpe_ratio": 0.5}]
+
+    assert [row["max_drawdown"] for row in rank_results([dict(row) for row in rows], "max_drawdown")] == [0.1, 0.2, 0.3]
+    by_sharpe = rank_results([dict(row) for row in rows], "sharpe_ratio")
+    assert [row["sharpe_ratio"] for row in by_sharpe[:2]] == [1.5, 0.5]
+    assert math.isnan(by_sharpe[2]["sharpe_ratio"]) and by_sharpe[2]["rank"] == 3
+    with pytest.raises(ValueError):
+        rank_results(rows, "luck")
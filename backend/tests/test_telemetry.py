@@ -0,0 +1,45 @@
+import json
+import pytest
+from flask import Flask
+from src.telemetry import MAX_PROFILE_HEADER_BYTES, MAX_PROFILE_SPANS, instrument_app, render_metrics, span, set_enabled
+
+@pytest.fixture
+def client():
+    set_enabled(True)
+    app = Flask(__name__)
+    instrument_app(app)
+
+    @app.route("/spans/<int:count>")
+    def spans(count):
+        with span("test.outer"):
+            for _ in range(count):
+                with span("test.inner"):
+                    pass
+        return "ok"
+
+    return app.test_client()
+
+def test_profile_headers_list_the_spans(client):
+    response = client.get("/spans/3", headers={"X-Debug-Profile": "1"})
+    spans = json.loads(response.headers["X-Profile"])
+
+    assert [(item["name"], item["depth"]) for item in spans] == [("test.inner", 1)] * 3 + [("test.outer", 0)]
+    assert response.headers["Server-Timing"].startswith("test-inner;dur=")
+    assert "X-Profile-Dropped" not in response.headers
+    assert "X-Profile" not in client.get("/spans/3").headers
+
+def test_profile_header_is_capped_in_bytes(client):
+    response = client.get("/spans/1000", headers={"X-Debug-Profile": "1"})
+    header = response.headers["X-Profile"]
+    spans = json.loads(header)
+
+    assert len(header.encode()) <= MAX_PROFILE_HEADER_BYTES
+    assert 0 < len(spans) < MAX_PROFILE_SPANS
+    assert int(response.headers["X-Profile-Dropped"]) == 1001 - len(spans)
+    # Server-Timing still totals every span
+    assert "test-outer;dur=" in response.headers["Server-Timing"]
+
+def test_requests_are_counted_per_endpoint(client):
+    client.get("/spans/1")
+
+    assert 'endpoint="/spans/<int:count>"' in render_metrics()
@@ -0,0 +1,68 @@
+import os
+import numpy as np
+import pytest
+from conftest import SYMBOL, START_DATE, END_DATE, assert_records_equal
+from src.fills import FillModel
+from src.walk_forward import build_walk_forward_windows, score_equity, run_walk_forward
+
+# Bounds relative to each train window's high and low
+PARAM_SPACE = {"upper_pct": [0, 0.05], "lower_pct": [0, 0.05], "num_grids": [5, 10]}
+
+def walk_forward(fill_model=None, max_workers=1):
+    return run_walk_forward(SYMBOL, 10000, START_DATE, END_DATE, 120, 60, PARAM_SPACE,
+                            max_workers=max_workers, fill_model=fill_model)
+
+def test_windows_tile_the_history():
+    assert build_walk_forward_windows(10, 4, 3) == [(0, 4, 4, 7), (3, 7, 7, 10)]
+    assert build_walk_forward_windows(9, 4, 3)[-1] == (3, 7, 7, 9)
+    with pytest.raises(ValueError):
+        build_walk_forward_windows(4, 4, 1)
+
+def test_score_equity():
+    values = np.array([100.0, 110.0, 99.0])
+
+    assert score_equity(values, 100.0, "total_return") == pytest.approx(-0.01)
+    assert score_equity(values, 100.0, "max_drawdown") == pytest.approx(0.1)
+    returns = np.array([0.1, -0.1])
+    assert score_equity(values, 100.0, "sharpe_ratio") == pytest.approx(
+        np.sqrt(252) * returns.mean() / returns.std(ddof=1))
+
+def test_windows_close_their_position_through_the_fill_model(price_store):
+    fill_model = FillModel(fee_pct=0.01, slippage_pct=0.01)
+    result = walk_forward(fill_model)
+
+    equity = 10000.0
+    for window in result["windows"]:
+        days = [day for day in result["daily_values"] if day["window"] == window["window"]]
+        assert days[-1]["shares"] == 0
+        assert window["test_return"] == pytest.approx(days[-1]["value"] / equity - 1)
+        equity = days[-1]["value"]
+    assert result["metrics"]["final_value"] == pytest.approx(equity)
+
+    closing = [trade for trade in result["trades"] if trade["grid_level"] is None]
+    assert len(closing) > 0
+    for trade in closing:
+        assert trade["amount"] == pytest.approx(trade["shares"] * trade["price"] - trade["fee"])
+
+def test_costless_fill_model_matches_no_fill_model(price_store):
+    plain = walk_forward()
+    costless = walk_forward(FillModel())
+
+    assert_records_equal(costless["daily_values"], plain["daily_values"])
+    assert [window["params"] for window in costless["windows"]] == [window["params"] for window in plain["windows"]]
+
+def test_worker_processes_give_the_same_result(monkeypatch, price_store):
+    monkeypatch.setattr(os, "cpu_count", lambda: 4)
+
+    assert walk_forward(max_workers=2)["windows"] == walk_forward()["windows"]
+
+def test_route_takes_bar_counts(client, price_store):
+    request = dict(PARAM_SPACE, symbol=SYMBOL, investment_amount=10000, start_date=START_DATE,
+                   end_date=END_DATE, train_bars=120, test_bars=60, max_workers=1)
+    response = client.post("/api/backtest/walk-forward", json=request)
+
+    assert response.status_code == 200
+    assert (response.get_json()["train_bars"], response.get_json()["test_bars"]) == (120, 60)
+    del request["train_bars"]
+    assert client.post("/api/backtest/walk-forward", json=request).get_json()["error"] == \
+        "Missing required field: train_bars"
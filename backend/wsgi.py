@@ -0,0 +1,20 @@
+"""
+WSGI entry point for production servers
+
+    cd backend
+    gunicorn -c gunicorn.conf.py wsgi:application
+
+Importing this module builds the app and loads the modules the app imports
+lazily (pandas and the data providers), so with preload_app the server pays
+for them once in the master process and its forked workers share them,
+instead of each worker loading them on its first request.
+"""
+from app import app
+from src.lazy import preload
+
+# Lazily imported modules loaded before the server forks its workers
+PRELOAD_MODULES = ("pandas", "yfinance")
+
+preload(*PRELOAD_MODULES)
+
+application = app
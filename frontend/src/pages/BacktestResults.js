@@ -1,7 +1,7 @@
-import React, { useState, useEffect } from 'react';
-import { Card, Table, Alert, Spinner, Row, Col, Badge } from 'react-bootstrap';
+import React, { useState, useEffect, useRef } from 'react';
+import { Card, Table, Alert, Spinner, Row, Col, Badge, Form } from 'react-bootstrap';
 import { useParams, Link, useLocation } from 'react-router-dom';
-import { getBacktestResult } from '../services/api';
+import { getBacktestResult, getBacktestTrades, getBacktestChart, columnsToRows, chartPoints } from '../services/api';
 import { Line } from 'react-chartjs-2';
 import { Chart as ChartJS, CategoryScale, LinearScale, PointElement, LineElement, Title, Tooltip, Legend } from 'chart.js';
 import GridTradeChart from '../components/GridTradeChart';
@@ -16,15 +16,24 @@ const BacktestResults = () => {
   const symbol = queryParams.get('symbol');
   
   const [result, setResult] = useState(null);
+  const [trades, setTrades] = useState([]);
+  const [dailyValues, setDailyValues] = useState(null);
+  const [range, setRange] = useState({ start: '', end: '' });
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState(null);
+  const chartContainer = useRef(null);
 
   useEffect(() => {
     const fetchData = async () => {
       try {
-        // Fetch backtest results, passing the symbol parameter
-        const data = await getBacktestResult(id, symbol);
+        // Fetch the metrics and trades; the daily values are fetched per chart below
+        const [data, tradeData] = await Promise.all([
+          getBacktestResult(id, symbol, { view: 'summary' }),
+          getBacktestTrades(id, symbol)
+        ]);
         setResult(data);
+        setTrades(tradeData);
+        setRange({ start: data.backtest_period.start_date, end: data.backtest_period.end_date });
         setLoading(false);
       } catch (err) {
         console.error('Error fetching data:', err);
@@ -36,13 +45,36 @@ const BacktestResults = () => {
     fetchData();
   }, [id, symbol]);
 
+  useEffect(() => {
+    if (!result) {
+      return;
+    }
+
+    const fetchChart = async () => {
+      try {
+        // Only the visible range, reduced on the server to the chart's pixel width
+        const chart = await getBacktestChart(id, symbol, {
+          start: range.start || undefined,
+          end: range.end || undefined,
+          points: chartPoints(chartContainer.current)
+        });
+        setDailyValues(columnsToRows(chart.daily_values));
+      } catch (err) {
+        console.error('Error fetching chart data:', err);
+        setError('Failed to fetch backtest chart. Please try again.');
+      }
+    };
+
+    fetchChart();
+  }, [id, symbol, result, range]);
+
   // Prepare portfolio value chart data
-  const portfolioChartData = result ? {
-    labels: result.daily_values.map(d => d.date),
+  const portfolioChartData = dailyValues ? {
+    labels: dailyValues.map(d => d.date),
     datasets: [
       {
         label: 'Portfolio Value ($)',
-        data: result.daily_values.map(d => d.value),
+        data: dailyValues.map(d => d.value),
         borderColor: 'rgb(75, 192, 192)',
         backgroundColor: 'rgba(75, 192, 192, 0.5)',
         tension: 0.1
@@ -50,29 +82,10 @@ const BacktestResults = () => {
     ],
   } : null;
 
-  // Prepare stock price chart data
-  const priceChartData = result ? {
-    labels: result.daily_values.map(d => d.date),
-    datasets: [
-      {
-        label: `${result.strategy.symbol} Price ($)`,
-        data: result.daily_values.map(d => d.close),
-        borderColor: 'rgb(53, 162, 235)',
-        backgroundColor: 'rgba(53, 162, 235, 0.5)',
-        yAxisID: 'y'
-      },
-      ...result.strategy.grid_levels.map((level, index) => ({
-        label: `Grid Level ${index}`,
-        data: result.daily_values.map(() => level),
-        borderColor: `rgba(255, 99, ${index * 20}, 0.8)`,
-        borderDash: [5, 5],
-        borderWidth: 1,
-        pointRadius: 0,
-        fill: false,
-        yAxisID: 'y'
-      }))
-    ],
-  } : null;
+  // Trades inside the visible range, marked on the price chart
+  const visibleTrades = trades.filter(trade =>
+    (!range.start || trade.date >= range.start) && (!range.end || trade.date <= range.end)
+  );
 
   const chartOptions = {
     responsive: true,
@@ -175,7 +188,33 @@ const BacktestResults = () => {
         <Col>
           <Card>
             <Card.Header as="h5">Portfolio Value Over Time</Card.Header>
-            <Card.Body>
+            <Card.Body ref={chartContainer}>
+              <Row className="mb-3">
+                <Col md={3}>
+                  <Form.Group>
+                    <Form.Label>From</Form.Label>
+                    <Form.Control
+                      type="date"
+                      value={range.start}
+                      min={result.backtest_period.start_date}
+                      max={range.end || result.backtest_period.end_date}
+                      onChange={(e) => setRange({ ...range, start: e.target.value })}
+                    />
+                  </Form.Group>
+                </Col>
+                <Col md={3}>
+                  <Form.Group>
+                    <Form.Label>To</Form.Label>
+                    <Form.Control
+                      type="date"
+                      value={range.end}
+                      min={range.start || result.backtest_period.start_date}
+                      max={result.backtest_period.end_date}
+                      onChange={(e) => setRange({ ...range, end: e.target.value })}
+                    />
+                  </Form.Group>
+                </Col>
+              </Row>
               {portfolioChartData && (
                 <Line options={chartOptions} data={portfolioChartData} height={60} />
               )}
@@ -189,17 +228,17 @@ const BacktestResults = () => {
           <Card className="w-100">
             <Card.Header as="h5">Stock Price with Grid Levels</Card.Header>
             <Card.Body style={{ height: '900px' }}>
-              {result && (
+              {dailyValues && (
                 <GridTradeChart 
                   stockData={{
                     symbol: result.strategy.symbol,
-                    data: result.daily_values.map(d => ({
+                    data: dailyValues.map(d => ({
                       Date: new Date(d.date).toISOString().split('T')[0],
                       Close: d.close
                     }))
                   }}
                   gridLevels={result.strategy.grid_levels}
-                  trades={result.trades.map(trade => ({
+                  trades={visibleTrades.map(trade => ({
                     ...trade,
                     date: new Date(trade.date).toISOString().split('T')[0]
                   }))}
@@ -289,7 +328,7 @@ const BacktestResults = () => {
       <Card>
         <Card.Header as="h5">Trade History</Card.Header>
         <Card.Body>
-          {result.trades.length > 0 ? (
+          {trades.length > 0 ? (
             <Table striped responsive>
               <thead>
                 <tr>
@@ -302,7 +341,7 @@ const BacktestResults = () => {
                 </tr>
               </thead>
               <tbody>
-                {result.trades.map((trade, index) => (
+                {trades.map((trade, index) => (
                   <tr key={index}>
                     <td>{trade.date}</td>
                     <td>
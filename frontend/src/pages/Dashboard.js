@@ -1,7 +1,7 @@
 import React, { useState, useEffect } from 'react';
 import { Row, Col, Card, Table, Alert, Spinner } from 'react-bootstrap';
 import { Link } from 'react-router-dom';
-import { getAllStrategies, getStockData } from '../services/api';
+import { getAllStrategies, getStockChart, columnsToRows, chartPoints } from '../services/api';
 import { Line } from 'react-chartjs-2';
 import { Chart as ChartJS, CategoryScale, LinearScale, PointElement, LineElement, Title, Tooltip, Legend } from 'chart.js';
 
@@ -24,9 +24,14 @@ const Dashboard = () => {
         const strategiesData = await getAllStrategies();
         setStrategies(strategiesData);
         
-        // Fetch stock data for example stock
-        const stockResult = await getStockData(exampleStock, '6mo', '1d');
-        setStockData(stockResult);
+        // Fetch stock data for example stock, reduced on the server to the window's pixel width
+        const stockResult = await getStockChart(exampleStock, {
+          period: '6mo',
+          interval: '1d',
+          method: 'lttb',
+          points: chartPoints()
+        });
+        setStockData({ symbol: stockResult.symbol, data: columnsToRows(stockResult.data) });
         
         setLoading(false);
       } catch (err) {
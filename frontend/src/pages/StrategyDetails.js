@@ -1,7 +1,7 @@
 import React, { useState, useEffect } from 'react';
 import { Card, Table, Alert, Spinner, Button, Row, Col } from 'react-bootstrap';
 import { useParams, Link, useNavigate } from 'react-router-dom';
-import { getStrategy, getStockData } from '../services/api';
+import { getStrategy, getStockChart, columnsToRows, chartPoints } from '../services/api';
 import { Line } from 'react-chartjs-2';
 import { Chart as ChartJS, CategoryScale, LinearScale, PointElement, LineElement, Title, Tooltip, Legend } from 'chart.js';
 
@@ -24,9 +24,14 @@ const StrategyDetails = () => {
         const strategyData = await getStrategy(id);
         setStrategy(strategyData);
         
-        // Fetch stock data
-        const stockResult = await getStockData(strategyData.symbol, '3mo', '1d');
-        setStockData(stockResult);
+        // Fetch stock data, reduced on the server to the window's pixel width
+        const stockResult = await getStockChart(strategyData.symbol, {
+          period: '3mo',
+          interval: '1d',
+          method: 'lttb',
+          points: chartPoints()
+        });
+        setStockData({ symbol: stockResult.symbol, data: columnsToRows(stockResult.data) });
         
         setLoading(false);
       } catch (err) {
@@ -131,7 +131,7 @@ export const runBacktest = async (backtestData) => {
   }
 };
 
-export const getBacktestResult = async (backtestId, symbol) => {
+export const getBacktestResult = async (backtestId, symbol, options = {}) => {
   if (USE_MOCK_DATA) {
     // Directly use the symbol parameter to determine which backtest result to return
     if (symbol === 'MSFT') {
@@ -153,7 +153,93 @@ export const getBacktestResult = async (backtestId, symbol) => {
   }
   
   try {
-    const response = await api.get(`/backtest/${backtestId}`);
+    // options: view ('full' or 'summary' without the daily values and trades)
+    const response = await api.get(`/backtest/${backtestId}`, { params: options });
+    return response.data;
+  } catch (error) {
+    throw error;
+  }
+};
+
+export const getBacktestTrades = async (backtestId, symbol) => {
+  if (USE_MOCK_DATA) {
+    const result = await getBacktestResult(backtestId, symbol);
+    return result.trades;
+  }
+  
+  try {
+    const response = await api.get(`/backtest/${backtestId}/series`, {
+      params: { kind: 'trades', format: 'chunked' }
+    });
+    return response.data.data;
+  } catch (error) {
+    throw error;
+  }
+};
+
+// Chart series API calls (downsampled on the server to the points the chart can show)
+const rowsToColumns = (rows) => {
+  const columns = rows.length > 0 ? Object.keys(rows[0]) : [];
+  return { columns, data: columns.map(name => rows.map(row => row[name])) };
+};
+
+export const columnsToRows = (table) => {
+  const length = table.data.length > 0 ? table.data[0].length : 0;
+  return Array.from({ length }, (_, row) =>
+    Object.fromEntries(table.columns.map((name, column) => [name, table.data[column][row]]))
+  );
+};
+
+// Most points the chart endpoints return (MAX_CHART_POINTS on the server)
+const MAX_CHART_POINTS = 20000;
+
+// Points a chart can draw: one per device pixel of its width
+export const chartPoints = (element) => {
+  const width = element ? element.clientWidth : window.innerWidth;
+  const points = Math.round(width * (window.devicePixelRatio || 1));
+  return Math.min(Math.max(points, 4), MAX_CHART_POINTS);
+};
+
+export const getStockChart = async (symbol, options = {}) => {
+  if (USE_MOCK_DATA) {
+    console.log('Using mock stock chart');
+    return {
+      symbol: mockStockData.symbol,
+      interval: mockStockData.interval,
+      method: 'ohlc',
+      bars: mockStockData.data.length,
+      points: mockStockData.data.length,
+      data: rowsToColumns(mockStockData.data)
+    };
+  }
+  
+  try {
+    // options: period, interval, start, end, points, method ('ohlc', 'lttb' or 'minmax')
+    const response = await api.get(`/stock/${symbol}/chart`, { params: options });
+    return response.data;
+  } catch (error) {
+    throw error;
+  }
+};
+
+export const getBacktestChart = async (backtestId, symbol, options = {}) => {
+  if (USE_MOCK_DATA) {
+    const result = await getBacktestResult(backtestId, symbol);
+    const dailyValues = result.daily_values.filter(d =>
+      (!options.start || d.date >= options.start) && (!options.end || d.date <= options.end)
+    );
+    return {
+      backtest_id: backtestId,
+      method: 'lttb',
+      days: dailyValues.length,
+      points: dailyValues.length,
+      daily_values: rowsToColumns(dailyValues)
+    };
+  }
+  
+  try {
+    // options: start, end, points, method ('lttb' or 'minmax')
+    const response = await api.get(`/backtest/${backtestId}/chart`, { params: options });
     return response.data;
   } catch (error) {
     throw error;
@@ -167,7 +253,10 @@ const apiService = {
   getStrategy,
   getAllStrategies,
   runBacktest,
-  getBacktestResult
+  getBacktestResult,
+  getBacktestTrades,
+  getStockChart,
+  getBacktestChart
 };
 
 export default apiService;